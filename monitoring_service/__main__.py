@@ -7,7 +7,22 @@ from web3 import HTTPProvider, Web3
 from monitoring_service import MonitoringService
 from monitoring_service.api.rest import ServiceApi
 from monitoring_service.blockchain import BlockchainMonitor
+from monitoring_service.constants import (
+    DEFAULT_CHANNEL_BURST,
+    DEFAULT_CHANNEL_RATE_LIMIT,
+    DEFAULT_MAX_CONCURRENT_TRANSACTIONS,
+    DEFAULT_MIN_PROFIT_MARGIN,
+    DEFAULT_PENDING_REQUEST_CHANNELS,
+    DEFAULT_PENDING_REQUEST_TTL,
+    DEFAULT_SEEN_MESSAGE_CACHE_SIZE,
+    DEFAULT_SIGNER_BURST,
+    DEFAULT_SIGNER_RATE_LIMIT,
+    DEFAULT_VALIDATION_POOL_SIZE,
+    DEFAULT_VALIDATION_QUEUE_SIZE,
+)
+from monitoring_service.metrics import rpc_metrics_middleware
 from monitoring_service.state_db import StateDB
+from monitoring_service.validation_pool import OverflowPolicy
 from raiden_contracts.contract_manager import ContractManager, contracts_precompiled_path
 from raiden_libs.transport import MatrixTransport
 
@@ -65,6 +80,115 @@ from raiden_libs.transport import MatrixTransport
     type=str,
     help='state DB to save received balance proofs to',
 )
+@click.option(
+    '--validation-workers',
+    default=DEFAULT_VALIDATION_POOL_SIZE,
+    type=int,
+    help='Number of monitor requests validated in parallel',
+)
+@click.option(
+    '--validation-queue-size',
+    default=DEFAULT_VALIDATION_QUEUE_SIZE,
+    type=int,
+    help='Number of monitor requests waiting for validation',
+)
+@click.option(
+    '--validation-overflow',
+    default=OverflowPolicy.DROP_OLDEST.value,
+    type=click.Choice([policy.value for policy in OverflowPolicy]),
+    help='What to do with incoming monitor requests when the validation queue is full',
+)
+@click.option(
+    '--max-concurrent-transactions',
+    default=DEFAULT_MAX_CONCURRENT_TRANSACTIONS,
+    type=int,
+    help='Number of monitoring transactions submitted in parallel',
+)
+@click.option(
+    '--max-gas-price',
+    default=None,
+    type=int,
+    help='Highest gas price (in wei) paid for transactions, even when escalating',
+)
+@click.option(
+    '--token-price-in-wei',
+    default=None,
+    type=int,
+    help='Value of one reward token unit in wei. Enables rejecting unprofitable requests',
+)
+@click.option(
+    '--min-profit-margin',
+    default=DEFAULT_MIN_PROFIT_MARGIN,
+    type=float,
+    help='Fraction by which the reward must exceed the gas costs',
+)
+@click.option(
+    '--signature-workers',
+    default=0,
+    type=int,
+    help='Number of processes recovering signatures (0 recovers them in the main process)',
+)
+@click.option(
+    '--token-network-registry-address',
+    default=None,
+    type=str,
+    help='Address of the TokenNetworkRegistry whose token networks are verified at startup',
+)
+@click.option(
+    '--signer-rate-limit',
+    default=DEFAULT_SIGNER_RATE_LIMIT,
+    type=float,
+    help='Monitor requests per second accepted from a single signer',
+)
+@click.option(
+    '--signer-burst',
+    default=DEFAULT_SIGNER_BURST,
+    type=int,
+    help='Monitor requests accepted at once from a single signer',
+)
+@click.option(
+    '--channel-rate-limit',
+    default=DEFAULT_CHANNEL_RATE_LIMIT,
+    type=float,
+    help='Monitor requests per second accepted for a single channel',
+)
+@click.option(
+    '--channel-burst',
+    default=DEFAULT_CHANNEL_BURST,
+    type=int,
+    help='Monitor requests accepted at once for a single channel',
+)
+@click.option(
+    '--seen-message-cache-size',
+    default=DEFAULT_SEEN_MESSAGE_CACHE_SIZE,
+    type=int,
+    help='Number of recently received messages whose copies are dropped',
+)
+@click.option(
+    '--seen-message-bloom-capacity',
+    default=0,
+    type=int,
+    help='Stored messages remembered in a Bloom filter to drop their copies (0 disables it)',
+)
+@click.option(
+    '--pending-request-ttl',
+    default=DEFAULT_PENDING_REQUEST_TTL,
+    type=float,
+    help='Seconds a monitor request waits for its channel to be opened',
+)
+@click.option(
+    '--pending-request-channels',
+    default=DEFAULT_PENDING_REQUEST_CHANNELS,
+    type=int,
+    help='Number of not yet opened channels for which monitor requests are held',
+)
+@click.option(
+    '--api-token',
+    'api_tokens',
+    multiple=True,
+    envvar='MS_API_TOKENS',
+    help='Token allowing to submit monitor requests over the REST API (can be repeated)',
+)
 def main(
     private_key,
     monitoring_channel,
@@ -75,6 +199,24 @@ def main(
     rest_port,
     eth_rpc,
     state_db,
+    validation_workers,
+    validation_queue_size,
+    validation_overflow,
+    max_concurrent_transactions,
+    max_gas_price,
+    token_price_in_wei,
+    min_profit_margin,
+    signature_workers,
+    token_network_registry_address,
+    signer_rate_limit,
+    signer_burst,
+    channel_rate_limit,
+    channel_burst,
+    seen_message_cache_size,
+    seen_message_bloom_capacity,
+    pending_request_ttl,
+    pending_request_channels,
+    api_tokens,
 ):
     app_dir = click.get_app_dir('raiden-monitoring-service')
     if os.path.isdir(app_dir) is False:
@@ -86,6 +228,7 @@ def main(
         monitoring_channel,
     )
     web3 = Web3(HTTPProvider(eth_rpc))
+    web3.middleware_stack.add(rpc_metrics_middleware)
     contract_manager = ContractManager(contracts_precompiled_path())
     blockchain = BlockchainMonitor(web3, contract_manager)
     db = StateDB(state_db)
@@ -96,9 +239,26 @@ def main(
         state_db=db,
         transport=transport,
         blockchain=blockchain,
+        validation_pool_size=validation_workers,
+        validation_queue_size=validation_queue_size,
+        overflow_policy=OverflowPolicy(validation_overflow),
+        max_concurrent_transactions=max_concurrent_transactions,
+        max_gas_price=max_gas_price,
+        token_price_in_wei=token_price_in_wei,
+        min_profit_margin=min_profit_margin,
+        signature_workers=signature_workers,
+        token_network_registry_address=token_network_registry_address,
+        signer_rate_limit=signer_rate_limit,
+        signer_burst=signer_burst,
+        channel_rate_limit=channel_rate_limit,
+        channel_burst=channel_burst,
+        seen_message_cache_size=seen_message_cache_size,
+        seen_message_bloom_capacity=seen_message_bloom_capacity,
+        pending_request_ttl=pending_request_ttl,
+        pending_request_channels=pending_request_channels,
     )
 
-    api = ServiceApi(monitor, blockchain)
+    api = ServiceApi(monitor, blockchain, api_tokens=api_tokens)
     api.run(rest_host, rest_port)
 
     monitor.run()
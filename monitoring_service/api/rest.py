@@ -1,25 +1,435 @@
+import hashlib
+import hmac
+import json
+import os
+import zlib
+from collections import OrderedDict
+from typing import Iterator, List, NamedTuple, Optional, Sequence, Tuple
+from urllib.parse import urlencode
+
 import gevent
-from flask import Flask, request
-from flask_restful import Api, Resource
+import jsonschema
+from eth_utils import is_checksum_address
+from flask import Flask, Response, request
+from flask_restful import Api, Resource, abort
 from gevent.pywsgi import WSGIServer
 
 from monitoring_service import MonitoringService
 from monitoring_service.blockchain import BlockchainMonitor
+from monitoring_service.constants import MAX_MONITOR_REQUEST_BATCH_SIZE
+from monitoring_service.exceptions import InvalidEvents
+from monitoring_service.metrics import CONTENT_TYPE, REGISTRY, render, stats_gauges
+from raiden_libs.exceptions import MessageFormatError
+from raiden_libs.messages import MonitorRequest
+from raiden_libs.types import ChannelIdentifier
+from raiden_libs.utils import is_channel_identifier
 
 API_PATH = '/api/1'
+# number of monitor requests returned per page, unless requested otherwise
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+# number of monitor requests read from the state DB at once when exporting
+EXPORT_PAGE_SIZE = 500
+NDJSON_MIMETYPE = 'application/x-ndjson'
+# number of serialized responses cached per state DB version
+RESPONSE_CACHE_SIZE = 128
+
+
+def serialize_monitor_request(monitor_request) -> dict:
+    """State DBs return either monitor request messages or DB rows"""
+    if isinstance(monitor_request, MonitorRequest):
+        return monitor_request.serialize_data()
+    return monitor_request
+
+
+def encode_cursor(key: Tuple[int, str]) -> str:
+    return '%d:%s' % key
+
+
+def decode_cursor(cursor: str) -> Tuple[int, str]:
+    try:
+        encoded_channel_id, signer = cursor.split(':')
+        channel_id = int(encoded_channel_id)
+    except ValueError:
+        abort(400, message='Invalid cursor')
+    if not is_checksum_address(signer):
+        abort(400, message='Invalid cursor')
+    return channel_id, signer
+
+
+def channel_id_param(value: str) -> ChannelIdentifier:
+    """Channel id in a URL path, in decimal or 0x-prefixed hex"""
+    try:
+        channel_id = int(value, 0)
+    except ValueError:
+        abort(400, message='Invalid channel identifier')
+    if not is_channel_identifier(channel_id):
+        abort(400, message='Invalid channel identifier')
+    return channel_id
+
+
+def int_arg(name: str, minimum: int = 0) -> Optional[int]:
+    raw_value = request.args.get(name)
+    if raw_value is None:
+        return None
+    try:
+        value = int(raw_value)
+    except ValueError:
+        abort(400, message='%s must be an integer' % name)
+    if value < minimum:
+        abort(400, message='%s must be at least %d' % (name, minimum))
+    return value
+
+
+def limit_arg() -> int:
+    """Page size, at most MAX_PAGE_SIZE"""
+    limit = int_arg('limit', minimum=1)
+    if limit is None:
+        return DEFAULT_PAGE_SIZE
+    return min(limit, MAX_PAGE_SIZE)
+
+
+def address_arg(name: str) -> Optional[str]:
+    value = request.args.get(name)
+    if value is not None and not is_checksum_address(value):
+        abort(400, message='%s must be a checksummed address' % name)
+    return value
+
+
+def check_api_token(api_tokens: Sequence[str]) -> None:
+    """Abort unless the request carries one of `api_tokens` as bearer token"""
+    if len(api_tokens) == 0:
+        abort(403, message='Submitting monitor requests is disabled')
+    scheme, _, token = request.headers.get('Authorization', '').partition(' ')
+    if scheme.lower() != 'bearer' or not any(
+        hmac.compare_digest(token.encode(), x.encode()) for x in api_tokens
+    ):
+        abort(401, message='Invalid API token')
+
+
+def read_monitor_requests() -> List[MonitorRequest]:
+    """Monitor requests in the request body, either a single one or a list"""
+    try:
+        data = json.loads(request.get_data(as_text=True))
+    except ValueError:
+        abort(400, message='Invalid JSON')
+    if isinstance(data, dict):
+        data = [data]
+    if not isinstance(data, list) or not 0 < len(data) <= MAX_MONITOR_REQUEST_BATCH_SIZE:
+        abort(
+            400,
+            message='Expected a monitor request or a list of at most %d' %
+            MAX_MONITOR_REQUEST_BATCH_SIZE,
+        )
+    monitor_requests = []
+    for i, item in enumerate(data):
+        try:
+            monitor_requests.append(MonitorRequest.deserialize(item))
+        except (
+            jsonschema.exceptions.ValidationError,
+            MessageFormatError,
+            # raised by the MonitorRequest constructor for invalid values
+            AssertionError,
+        ) as e:
+            abort(400, message='Monitor request %d: %s' % (i, getattr(e, 'message', str(e))))
+    return monitor_requests
+
+
+class CachedResponse(NamedTuple):
+    body: str
+    headers: dict
+
+
+class ResponseCache:
+    """Serialized responses for the current version of the state DB, keyed by
+    query. Entries of older versions are dropped once the version changes.
+
+    ETags are derived from the version and the query only, so a client
+    polling a resource that hasn't changed is answered without touching the
+    state DB. They include a random prefix, as the version starts from zero
+    again when the service is restarted.
+    """
+    def __init__(self, max_size: int = RESPONSE_CACHE_SIZE) -> None:
+        assert max_size > 0
+        self.max_size = max_size
+        self.prefix = os.urandom(4).hex()
+        self.version: Optional[int] = None
+        self.responses: OrderedDict = OrderedDict()
+
+        # metrics
+        self.hits = 0
+        self.misses = 0
+        self.not_modified = 0
+
+    def etag(self, version: int, key: tuple) -> str:
+        query_hash = hashlib.sha256(repr(key).encode()).hexdigest()[:16]
+        return '%s-%d-%s' % (self.prefix, version, query_hash)
+
+    def get(self, version: int, key: tuple) -> Optional[CachedResponse]:
+        if version != self.version:
+            self.version = version
+            self.responses.clear()
+        response = self.responses.get(key)
+        if response is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.responses.move_to_end(key)
+        return response
+
+    def put(self, version: int, key: tuple, response: CachedResponse) -> None:
+        if version != self.version:
+            return
+        self.responses[key] = response
+        if len(self.responses) > self.max_size:
+            self.responses.popitem(last=False)
+
+    def stats(self) -> dict:
+        return {
+            'size': len(self.responses),
+            'version': self.version,
+            'hits': self.hits,
+            'misses': self.misses,
+            'not_modified': self.not_modified,
+        }
 
 
 class MonitorRequestsResource(Resource):
+    """Stored monitor requests, one page at a time.
+
+    Query parameters:
+        limit: page size (at most MAX_PAGE_SIZE)
+        cursor: value of the X-Next-Cursor header of the previous page
+        token_network_address, signer: only return matching requests
+        min_nonce, max_nonce: only return requests within this nonce range
+    If there are more results, the response has an X-Next-Cursor header and a
+    Link header pointing to the next page.
+
+    Responses have an ETag which changes whenever monitor requests are stored
+    or deleted. Requests with a matching If-None-Match header get a 304.
+
+    POST submits a monitor request, or a list of them, and returns the status
+    of each one once it has been validated. Requires an API token.
+    """
+    def __init__(self, monitor=None, cache=None, api_tokens=()):
+        super().__init__()
+        assert isinstance(monitor, MonitoringService)
+        assert isinstance(cache, ResponseCache)
+        self.monitor = monitor
+        self.cache = cache
+        self.api_tokens = api_tokens
+
+    def post(self):
+        check_api_token(self.api_tokens)
+        monitor_requests = read_monitor_requests()
+        results = self.monitor.submit_monitor_requests(monitor_requests)
+        return [
+            {
+                'channel_identifier': monitor_request.balance_proof.channel_identifier,
+                'nonce': monitor_request.balance_proof.nonce,
+                'status': status.value,
+            }
+            for monitor_request, status in zip(monitor_requests, results)
+        ]
+
+    def get(self):
+        # read the version first, so a change made while the page is read
+        # results in a new ETag on the next request
+        version = self.monitor.state_db.version
+        key = tuple(sorted(request.args.items(multi=True)))
+        etag = self.cache.etag(version, key)
+        if request.if_none_match.contains(etag):
+            self.cache.not_modified += 1
+            response = Response(status=304)
+        else:
+            cached = self.cache.get(version, key)
+            if cached is None:
+                cached = self.read_page()
+                self.cache.put(version, key, cached)
+            response = Response(cached.body, mimetype='application/json', headers=cached.headers)
+        response.set_etag(etag)
+        return response
+
+    def read_page(self) -> CachedResponse:
+        limit = limit_arg()
+        cursor = request.args.get('cursor')
+        page = self.monitor.state_db.get_monitor_requests(
+            after=decode_cursor(cursor) if cursor is not None else None,
+            # fetch one more to find out if there is a next page
+            limit=limit + 1,
+            token_network_address=address_arg('token_network_address'),
+            non_closing_signer=address_arg('signer'),
+            min_nonce=int_arg('min_nonce'),
+            max_nonce=int_arg('max_nonce'),
+        )
+        headers = {}
+        if len(page) > limit:
+            page = page[:limit]
+            next_cursor = encode_cursor(page[-1][0])
+            args = dict(request.args.items(), cursor=next_cursor)
+            headers['X-Next-Cursor'] = next_cursor
+            headers['Link'] = '<%s?%s>; rel="next"' % (request.base_url, urlencode(args))
+        body = json.dumps([serialize_monitor_request(x) for _, x in page])
+        return CachedResponse(body, headers)
+
+
+class MonitorRequestsExportResource(Resource):
+    """All stored monitor requests as newline delimited JSON, streamed page by
+    page so memory use doesn't depend on the number of requests.
+
+    Each line is {"cursor": ..., "monitor_request": ...}. An interrupted
+    export can be resumed by passing the cursor of the last line received.
+    Takes the same filters as MonitorRequestsResource. The response is gzip
+    compressed if the client accepts it.
+
+    Each page is read consistently, but requests stored during the export
+    may or may not be included. A read transaction over the whole export
+    would block writers for its duration.
+    """
     def __init__(self, monitor=None):
         super().__init__()
         assert isinstance(monitor, MonitoringService)
         self.monitor = monitor
 
     def get(self):
-        return [
-            x.serialize_data()
-            for x in self.monitor.monitor_requests.values()
+        cursor = request.args.get('cursor')
+        lines = self.lines(
+            after=decode_cursor(cursor) if cursor is not None else None,
+            token_network_address=address_arg('token_network_address'),
+            non_closing_signer=address_arg('signer'),
+            min_nonce=int_arg('min_nonce'),
+            max_nonce=int_arg('max_nonce'),
+        )
+        headers = {}
+        # a quality of 0 means gzip is not acceptable
+        if request.accept_encodings['gzip']:
+            lines = gzip_chunks(lines)
+            headers['Content-Encoding'] = 'gzip'
+        return Response(lines, mimetype=NDJSON_MIMETYPE, headers=headers)
+
+    def lines(self, after: Optional[Tuple[int, str]], **filters) -> Iterator[bytes]:
+        """One chunk of NDJSON lines per page"""
+        while True:
+            page = self.monitor.state_db.get_monitor_requests(
+                after=after,
+                limit=EXPORT_PAGE_SIZE,
+                **filters,
+            )
+            if len(page) == 0:
+                return
+            yield ''.join(
+                json.dumps({
+                    'cursor': encode_cursor(key),
+                    'monitor_request': serialize_monitor_request(x),
+                }) + '\n'
+                for key, x in page
+            ).encode()
+            after = page[-1][0]
+            # let the service run between pages
+            gevent.sleep(0)
+
+
+def gzip_chunks(chunks: Iterator[bytes]) -> Iterator[bytes]:
+    """Compress a stream of chunks. Each chunk is flushed, so the client can
+    decompress it as soon as it arrives."""
+    compressor = zlib.compressobj(wbits=16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        yield compressor.compress(chunk) + compressor.flush(zlib.Z_SYNC_FLUSH)
+    yield compressor.flush()
+
+
+class ChannelMonitorRequestsResource(Resource):
+    """Monitor requests stored for a channel, or the one of a single
+    non-closing signer. Answered from the primary key index, so the time
+    doesn't depend on the number of stored requests."""
+    def __init__(self, monitor=None):
+        super().__init__()
+        assert isinstance(monitor, MonitoringService)
+        self.monitor = monitor
+
+    def get(self, channel_id, signer=None):
+        channel_id = channel_id_param(channel_id)
+        if signer is not None and not is_checksum_address(signer):
+            abort(400, message='signer must be a checksummed address')
+        monitor_requests = [
+            serialize_monitor_request(x)
+            for _, x in self.monitor.state_db.get_monitor_requests(
+                channel_id=channel_id,
+                non_closing_signer=signer,
+            )
         ]
+        if signer is None:
+            return monitor_requests
+        if len(monitor_requests) == 0:
+            abort(404, message='No monitor request stored')
+        return monitor_requests[0]
+
+
+class ChannelResource(Resource):
+    """What the service knows about a channel: whether its ChannelOpened event
+    was seen, stored and held monitor requests and the transactions sent for
+    it. Only indexed lookups are done."""
+    def __init__(self, monitor=None):
+        super().__init__()
+        assert isinstance(monitor, MonitoringService)
+        self.monitor = monitor
+
+    def get(self, channel_id):
+        channel_id = channel_id_param(channel_id)
+        monitor_requests = self.monitor.state_db.get_monitor_requests(channel_id=channel_id)
+        transactions = self.monitor.state_db.get_transactions(channel_id)
+        result = {
+            'channel_identifier': channel_id,
+            'open': channel_id in self.monitor.open_channels,
+            'settle_timeout': self.monitor.settle_timeouts.get(channel_id),
+            'pending_requests': self.monitor.pending_requests.count(channel_id),
+            'monitor_requests': [serialize_monitor_request(x) for _, x in monitor_requests],
+            'transactions': [
+                {
+                    'tx_hash': tx['tx_hash'],
+                    'kind': tx['kind'],
+                    'nonce': tx['nonce'],
+                    'status': tx['status'],
+                }
+                for tx in transactions
+            ],
+        }
+        if not (
+            result['open'] or
+            result['pending_requests'] > 0 or
+            len(monitor_requests) > 0 or
+            len(transactions) > 0
+        ):
+            abort(404, message='Unknown channel')
+        return result
+
+
+class TransactionQueueResource(Resource):
+    def __init__(self, monitor=None):
+        super().__init__()
+        assert isinstance(monitor, MonitoringService)
+        self.monitor = monitor
+
+    def get(self):
+        return self.monitor.scheduler.pending()
+
+
+def read_events() -> List[dict]:
+    try:
+        if request.mimetype == NDJSON_MIMETYPE:
+            return [
+                json.loads(line.decode())
+                for line in request.stream
+                if len(line.strip()) > 0
+            ]
+        events = json.loads(request.get_data(as_text=True))
+    except ValueError:
+        abort(400, message='Invalid JSON')
+    if isinstance(events, dict):
+        return [events]
+    if not isinstance(events, list):
+        abort(400, message='Expected an event or a list of events')
+    return events
 
 
 class BlockchainEvents(Resource):
@@ -29,19 +439,51 @@ class BlockchainEvents(Resource):
         self.blockchain = blockchain
 
     def put(self):
-        json_data = request.get_json()
-        self.blockchain.handle_event(json_data)
+        """Dispatch blockchain events, in order. The body is a single event, a
+        list of events or a stream of events, one per line (NDJSON)."""
+        events = read_events()
+        try:
+            dispatched = self.blockchain.dispatch_events(events)
+        except InvalidEvents as e:
+            abort(400, message=str(e))
+        return {'received': len(events), 'dispatched': dispatched}
 
 
 class ServiceApi:
-    def __init__(self, monitor, blockchain):
+    def __init__(self, monitor, blockchain, api_tokens: Sequence[str] = ()):
         self.flask_app = Flask(__name__)
         self.api = Api(self.flask_app)
+        self.response_cache = ResponseCache()
         self.api.add_resource(BlockchainEvents, API_PATH + "/events",
                               resource_class_kwargs={'blockchain': blockchain})
         self.api.add_resource(MonitorRequestsResource, API_PATH + "/monitor_requests",
+                              resource_class_kwargs={
+                                  'monitor': monitor,
+                                  'cache': self.response_cache,
+                                  'api_tokens': tuple(api_tokens),
+                              })
+        self.api.add_resource(MonitorRequestsExportResource,
+                              API_PATH + "/monitor_requests/export",
+                              resource_class_kwargs={'monitor': monitor})
+        self.api.add_resource(ChannelMonitorRequestsResource,
+                              API_PATH + "/monitor_requests/<channel_id>",
+                              API_PATH + "/monitor_requests/<channel_id>/<signer>",
                               resource_class_kwargs={'monitor': monitor})
+        self.api.add_resource(ChannelResource, API_PATH + "/channels/<channel_id>",
+                              resource_class_kwargs={'monitor': monitor})
+        self.api.add_resource(TransactionQueueResource, API_PATH + "/transaction_queue",
+                              resource_class_kwargs={'monitor': monitor})
+        self.flask_app.add_url_rule('/metrics', 'metrics', lambda: self.metrics(monitor))
+
+    def metrics(self, monitor) -> Response:
+        """All metrics in the Prometheus text format"""
+        metrics = list(REGISTRY.metrics.values()) + monitor.metrics()
+        metrics += stats_gauges('ms_response_cache', self.response_cache.stats())
+        return Response(render(metrics), content_type=CONTENT_TYPE)
 
     def run(self, host, port):
         self.rest_server = WSGIServer((host, port), self.flask_app)
         self.server_greenlet = gevent.spawn(self.rest_server.serve_forever)
+
+    def stop(self):
+        self.rest_server.stop()
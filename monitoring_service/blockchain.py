@@ -1,12 +1,61 @@
 import logging
-from typing import Callable
+from typing import Callable, Dict, List
 
+import jsonschema
+from hexbytes import HexBytes
+
+from monitoring_service.exceptions import InvalidEvents
+from monitoring_service.metrics import BLOCKCHAIN_EVENTS
+from monitoring_service.utils import rpc_batch
 from raiden_contracts.contract_manager import ContractManager
 from raiden_libs.blockchain import BlockchainListener
 from raiden_libs.utils import decode_contract_call
 
 log = logging.getLogger(__name__)
 
+# events as returned by web3 filters
+EVENT_SCHEMA = {
+    'type': 'object',
+    'required': ['event', 'args', 'transactionHash', 'blockNumber', 'address'],
+    'properties': {
+        'event': {
+            'type': 'string',
+        },
+        'args': {
+            'type': 'object',
+        },
+        'transactionHash': {
+            'type': 'string',
+            'pattern': '^0x[0-9a-fA-F]{64}$',
+        },
+        'blockNumber': {
+            'type': 'integer',
+            'minimum': 0,
+        },
+        # the contract that emitted the event
+        'address': {
+            'type': 'string',
+            'pattern': '^0x[0-9a-fA-F]{40}$',
+        },
+        # the transaction that emitted the event, if the node doesn't know it
+        'transaction': {
+            'type': 'object',
+            'required': ['input'],
+            'properties': {
+                'input': {
+                    'type': 'string',
+                    'pattern': '^0x([0-9a-fA-F]{2})*$',
+                },
+            },
+        },
+    },
+}
+
+
+def transaction_input(tx) -> str:
+    """Call data of a transaction. Nodes call it `input`, eth-tester `data`."""
+    return HexBytes(tx['input'] if 'input' in tx else tx['data']).hex()
+
 
 class BlockchainMonitor(BlockchainListener):
     def __init__(
@@ -23,21 +72,63 @@ class BlockchainMonitor(BlockchainListener):
             **kwargs,
         )
         self.contract_manager = contract_manager
+        # event name => callback taking the event and the decoded call
+        self.event_callbacks: Dict[str, Callable] = {}
 
     def add_confirmed_listener(self, event_name: str, callback: Callable):
         """ Add a callback to listen for confirmed events. """
+        self.event_callbacks[event_name] = callback
         return super().add_confirmed_listener(
             event_name,
             lambda event: self.handle_event(event, callback),
         )
 
-    def handle_event(self, event, callback: Callable):
-        tx = self.web3.eth.getTransaction(event['transactionHash'])
+    def handle_event(self, event, callback: Callable, tx=None):
+        if tx is None:
+            tx = self.web3.eth.getTransaction(event['transactionHash'])
         log.info(str(event) + str(tx))
         abi = self.contract_manager.get_contract_abi('TokenNetwork')
         assert abi is not None
-        method_params = decode_contract_call(abi, tx['data'])
+        method_params = decode_contract_call(abi, transaction_input(tx))
         if method_params is not None:
+            BLOCKCHAIN_EVENTS.inc(event=event['event'])
             return callback(event, method_params)
         else:
             return None
+
+    def dispatch_events(self, events: List[dict]) -> int:
+        """Run the confirmed listeners for events that come from outside
+        (e.g. a test harness), in order.
+
+        All events are validated before any is dispatched. Events can carry
+        the transaction that emitted them, the other transactions are fetched
+        in one batch. Events whose transaction is unknown are skipped.
+        Returns the number of dispatched events.
+        """
+        for i, event in enumerate(events):
+            try:
+                jsonschema.validate(event, EVENT_SCHEMA)
+            except jsonschema.exceptions.ValidationError as e:
+                raise InvalidEvents('Event %d: %s' % (i, e.message))
+            if event['event'] not in self.event_callbacks:
+                raise InvalidEvents('Event %d: no listener for %s' % (i, event['event']))
+
+        tx_hashes = list({
+            event['transactionHash'] for event in events if 'transaction' not in event
+        })
+        transactions = dict(zip(
+            tx_hashes,
+            rpc_batch(self.web3, [('eth_getTransactionByHash', [x]) for x in tx_hashes]),
+        ))
+        dispatched = 0
+        for event in events:
+            tx = event.get('transaction') or transactions[event['transactionHash']]
+            if tx is None:
+                log.warning('Skipping %s event of unknown transaction %s' % (
+                    event['event'],
+                    event['transactionHash'],
+                ))
+                continue
+            self.handle_event(event, self.event_callbacks[event['event']], tx)
+            dispatched += 1
+        return dispatched
@@ -1,2 +1,45 @@
 # balance proof must not be older than this to be accepted
 MAX_BALANCE_PROOF_AGE = 60 * 60
+
+# number of greenlets validating incoming monitor requests in parallel
+DEFAULT_VALIDATION_POOL_SIZE = 16
+# number of monitor requests waiting for validation before the overflow policy kicks in
+DEFAULT_VALIDATION_QUEUE_SIZE = 1000
+# number of monitoring transactions that are submitted in parallel
+DEFAULT_MAX_CONCURRENT_TRANSACTIONS = 8
+# assumed settle timeout for channels whose ChannelOpened event we haven't seen
+DEFAULT_SETTLE_TIMEOUT = 500
+# seconds between checks for a new block when waiting for transaction receipts
+DEFAULT_RECEIPT_POLL_INTERVAL = 1
+# seconds between checks for a new block when refreshing cached deposits
+DEFAULT_DEPOSIT_POLL_INTERVAL = 1
+# seconds a task waits for its transaction to be mined
+DEFAULT_RECEIPT_TIMEOUT = 15 * 60
+# number of blocks whose gas prices are used to suggest a gas price
+DEFAULT_GAS_PRICE_HISTORY_BLOCKS = 20
+# percentile of recent gas prices to pay for new transactions
+DEFAULT_GAS_PRICE_PERCENTILE = 60
+# blocks to wait for a deadline-critical transaction before raising its gas price
+DEFAULT_GAS_ESCALATION_BLOCKS = 3
+# reward must exceed the gas cost of monitoring by this fraction
+DEFAULT_MIN_PROFIT_MARGIN = 0.1
+# number of signatures recovered by a worker process at once
+DEFAULT_SIGNATURE_BATCH_SIZE = 64
+# monitor requests per second (and burst) accepted from a single signer
+DEFAULT_SIGNER_RATE_LIMIT = 2.0
+DEFAULT_SIGNER_BURST = 20
+# monitor requests per second (and burst) accepted for a single channel
+DEFAULT_CHANNEL_RATE_LIMIT = 4.0
+DEFAULT_CHANNEL_BURST = 40
+# number of recently seen messages whose copies are dropped without validation
+DEFAULT_SEEN_MESSAGE_CACHE_SIZE = 100000
+# most monitor requests accepted in a single MonitorRequestBatch message
+MAX_MONITOR_REQUEST_BATCH_SIZE = 500
+# seconds monitor requests are held until the ChannelOpened event of their channel is confirmed
+DEFAULT_PENDING_REQUEST_TTL = 10 * 60
+# number of not yet opened channels for which monitor requests are held
+DEFAULT_PENDING_REQUEST_CHANNELS = 10000
+# number of monitor requests held per not yet opened channel
+DEFAULT_PENDING_REQUESTS_PER_CHANNEL = 4
+# seconds a REST submission waits for its monitor requests to be validated
+DEFAULT_SUBMISSION_TIMEOUT = 30
@@ -0,0 +1,70 @@
+import logging
+from typing import Dict
+
+from eth_utils import decode_hex, encode_hex, event_abi_to_log_topic, keccak
+from web3 import Web3
+from web3.utils.events import get_event_data
+
+from raiden_contracts.contract_manager import ContractManager
+from raiden_libs.types import Address
+
+log = logging.getLogger(__name__)
+
+
+class ContractCodeCache:
+    """Remembers which addresses hold a TokenNetwork contract.
+
+    The code at an address is compared to the runtime bytecode of the
+    TokenNetwork contract from the ContractManager. Deployed code doesn't
+    change, so the result is cached and only the first request for a token
+    network needs an RPC call. Addresses without code aren't cached, since a
+    contract may still be deployed there.
+    """
+    def __init__(self, web3: Web3, contract_manager: ContractManager) -> None:
+        self.web3 = web3
+        self.contract_manager = contract_manager
+        runtime_code = contract_manager.get_contract('TokenNetwork')['bin-runtime']
+        self.expected_code_hash = keccak(decode_hex(runtime_code))
+        # address => True if it holds a TokenNetwork contract
+        self.verified: Dict[Address, bool] = {}
+
+        # metrics
+        self.hits = 0
+        self.misses = 0
+
+    def is_token_network(self, address: Address) -> bool:
+        if address in self.verified:
+            self.hits += 1
+            return self.verified[address]
+        self.misses += 1
+        code = self.web3.eth.getCode(address)
+        if len(code) == 0:
+            return False
+        self.verified[address] = keccak(code) == self.expected_code_hash
+        if not self.verified[address]:
+            log.warning('Contract at %s is not a TokenNetwork' % address)
+        return self.verified[address]
+
+    def prewarm(self, registry_address: Address) -> int:
+        """Verify all token networks created by the TokenNetworkRegistry at
+        `registry_address`. Returns the number of verified token networks."""
+        event_abi = self.contract_manager.get_event_abi(
+            'TokenNetworkRegistry',
+            'TokenNetworkCreated',
+        )
+        logs = self.web3.eth.getLogs({
+            'fromBlock': 0,
+            'toBlock': 'latest',
+            'address': registry_address,
+            'topics': [encode_hex(event_abi_to_log_topic(event_abi))],
+        })
+        token_networks = [
+            get_event_data(event_abi, entry)['args']['token_network_address']
+            for entry in logs
+        ]
+        verified = sum(self.is_token_network(address) for address in token_networks)
+        log.info(
+            'Verified %d of %d token networks of registry %s' %
+            (verified, len(token_networks), registry_address),
+        )
+        return verified
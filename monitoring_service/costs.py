@@ -0,0 +1,92 @@
+import logging
+from collections import Counter
+
+from eth_utils import function_abi_to_4byte_selector
+
+from monitoring_service.constants import DEFAULT_MIN_PROFIT_MARGIN
+from monitoring_service.gas import GasEstimateCache
+from monitoring_service.tasks.on_channel_close import MONITOR_GAS_LIMIT
+from monitoring_service.tasks.on_channel_settle import CLAIM_REWARD_GAS_LIMIT
+from monitoring_service.transactions import TransactionManager
+
+log = logging.getLogger(__name__)
+
+
+class CostModel:
+    """Decides whether acting on a monitor request pays off.
+
+    Acting on a request costs the gas of monitor() plus claimReward(). The
+    cached gas estimates are used if these calls have been sent before, the
+    default gas limits otherwise, and the gas price is the last one suggested
+    for new transactions, so no RPC calls are needed. The reward is converted
+    to wei using `token_price_in_wei` and must exceed the cost by at least
+    `min_margin` (0.1 means 10%).
+
+    Without a token price rewards can't be compared to gas costs, so every
+    request is considered profitable.
+    """
+    def __init__(
+        self,
+        monitor_contract,
+        tx_manager: TransactionManager,
+        token_price_in_wei: int = None,
+        min_margin: float = DEFAULT_MIN_PROFIT_MARGIN,
+    ) -> None:
+        assert min_margin >= 0
+        self.monitor_contract = monitor_contract
+        self.tx_manager = tx_manager
+        self.token_price_in_wei = token_price_in_wei
+        self.min_margin = min_margin
+
+        # metrics
+        self.checked = 0
+        # stage => number of requests rejected as unprofitable
+        self.rejected: Counter = Counter()
+
+    @property
+    def enabled(self) -> bool:
+        return self.token_price_in_wei is not None
+
+    def gas_cost(self) -> int:
+        """Cost of monitor() and claimReward() in wei"""
+        gas = (
+            self._gas_limit('monitor', MONITOR_GAS_LIMIT) +
+            self._gas_limit('claimReward', CLAIM_REWARD_GAS_LIMIT)
+        )
+        return gas * self.tx_manager.gas_price_oracle.cached_price()
+
+    def is_profitable(self, reward_amount: int, stage: str) -> bool:
+        """Check if `reward_amount` covers the gas cost plus the minimum margin.
+        `stage` names the point at which the check is done, for the metrics."""
+        token_price_in_wei = self.token_price_in_wei
+        if token_price_in_wei is None:
+            return True
+        self.checked += 1
+        reward = reward_amount * token_price_in_wei
+        cost = self.gas_cost()
+        if reward >= cost + int(cost * self.min_margin):
+            return True
+        self.rejected[stage] += 1
+        log.info(
+            'Unprofitable monitor request at %s: reward %d wei, cost %d wei' %
+            (stage, reward, cost),
+        )
+        return False
+
+    def stats(self) -> dict:
+        return {
+            'enabled': self.enabled,
+            'checked': self.checked,
+            'rejected': dict(self.rejected),
+        }
+
+    def _gas_limit(self, function_name: str, default: int) -> int:
+        function_abi = next(
+            x for x in self.monitor_contract.abi
+            if x['type'] == 'function' and x['name'] == function_name
+        )
+        call_shape = GasEstimateCache.call_shape({
+            'to': self.monitor_contract.address,
+            'data': function_abi_to_4byte_selector(function_abi),
+        })
+        return self.tx_manager.gas_estimates.cached(call_shape, default)
@@ -0,0 +1,120 @@
+import hashlib
+import json
+import logging
+import math
+from collections import OrderedDict
+
+from raiden_libs.messages import Message
+
+log = logging.getLogger(__name__)
+
+
+def message_digest(message: Message) -> bytes:
+    """Digest of a message's content. Copies of the same message have the same
+    digest, no matter how often they were sent."""
+    data = json.dumps(
+        dict(message.serialize_data(), message_type=type(message).__name__),
+        sort_keys=True,
+    )
+    return hashlib.blake2b(data.encode(), digest_size=16).digest()
+
+
+class BloomFilter:
+    """Set of digests with false positives, but no false negatives.
+
+    Sized for `capacity` digests at a false positive rate of `error_rate`.
+    Once full, the filter is cleared to keep the error rate bounded.
+    """
+    def __init__(self, capacity: int, error_rate: float = 0.001) -> None:
+        assert capacity > 0
+        assert 0 < error_rate < 1
+        self.capacity = capacity
+        self.size = math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2)
+        self.hash_count = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, digest: bytes):
+        # double hashing, the digest is already uniformly distributed
+        h1 = int.from_bytes(digest[:8], 'big')
+        h2 = int.from_bytes(digest[8:], 'big') | 1
+        return ((h1 + i * h2) % self.size for i in range(self.hash_count))
+
+    def add(self, digest: bytes) -> None:
+        if self.count >= self.capacity:
+            log.debug('Bloom filter is full, clearing it')
+            self.bits = bytearray(len(self.bits))
+            self.count = 0
+        for position in self._positions(digest):
+            self.bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, digest: bytes) -> bool:
+        return all(
+            self.bits[position >> 3] & (1 << (position & 7))
+            for position in self._positions(digest)
+        )
+
+
+class SeenMessageCache:
+    """Remembers digests of messages that were already handled, so copies
+    of them can be dropped before doing any work.
+
+    The last `max_size` digests are kept in an exact LRU. Digests of messages
+    that were processed successfully can additionally be kept in a Bloom
+    filter with room for `bloom_capacity` digests. This remembers far more
+    messages per byte, but a false positive drops a new message, so the
+    filter is disabled by default.
+    """
+    def __init__(
+        self,
+        max_size: int,
+        bloom_capacity: int = 0,
+        bloom_error_rate: float = 0.001,
+    ) -> None:
+        assert max_size > 0
+        self.max_size = max_size
+        self.digests: OrderedDict = OrderedDict()
+        self.bloom = BloomFilter(bloom_capacity, bloom_error_rate) if bloom_capacity else None
+
+        # metrics
+        self.lookups = 0
+        self.hits = 0
+        self.bloom_hits = 0
+
+    def seen(self, digest: bytes) -> bool:
+        """Check if a message with this digest was seen before"""
+        self.lookups += 1
+        if digest in self.digests:
+            self.digests.move_to_end(digest)
+            self.hits += 1
+            return True
+        if self.bloom is not None and digest in self.bloom:
+            self.bloom_hits += 1
+            return True
+        return False
+
+    def add(self, digest: bytes) -> None:
+        """Mark a message as seen"""
+        self.digests[digest] = None
+        self.digests.move_to_end(digest)
+        if len(self.digests) > self.max_size:
+            self.digests.popitem(last=False)
+
+    def forget(self, digest: bytes) -> None:
+        """Accept copies of a message again, e.g. because handling it failed"""
+        self.digests.pop(digest, None)
+
+    def confirm(self, digest: bytes) -> None:
+        """Remember a successfully processed message beyond the LRU"""
+        if self.bloom is not None:
+            self.bloom.add(digest)
+
+    def stats(self) -> dict:
+        return {
+            'lookups': self.lookups,
+            'hits': self.hits,
+            'bloom_hits': self.bloom_hits,
+            'hit_rate': (self.hits + self.bloom_hits) / self.lookups if self.lookups else 0.0,
+            'size': len(self.digests),
+        }
@@ -0,0 +1,94 @@
+import logging
+from collections import OrderedDict
+from typing import Optional
+
+import gevent
+import gevent.event
+from hexbytes import HexBytes
+
+from monitoring_service.constants import DEFAULT_DEPOSIT_POLL_INTERVAL
+from monitoring_service.utils import rpc_batch
+from raiden_libs.types import Address
+
+log = logging.getLogger(__name__)
+
+
+class DepositCache(gevent.Greenlet):
+    """Caches the reward deposits of raiden nodes in the MSC.
+
+    The first lookup of an owner's deposit asks the node. After that the
+    owner is watched: the deposits of all watched owners are refreshed with
+    one batch of eth_calls whenever a new block is seen. Lookups of known
+    owners don't make any RPC calls and are at most one block old.
+
+    At most `max_owners` owners are watched, the least recently looked up
+    ones are dropped first.
+    """
+    def __init__(
+        self,
+        monitor_contract,
+        poll_interval: float = DEFAULT_DEPOSIT_POLL_INTERVAL,
+        max_owners: int = 10000,
+    ) -> None:
+        super().__init__()
+        self.monitor_contract = monitor_contract
+        self.web3 = monitor_contract.web3
+        self.poll_interval = poll_interval
+        self.max_owners = max_owners
+        self.stop_event = gevent.event.Event()
+        # owner => deposit
+        self.deposits: OrderedDict = OrderedDict()
+        self.last_block: Optional[int] = None
+
+        # metrics
+        self.hits = 0
+        self.misses = 0
+        self.refreshes = 0
+
+    def _run(self):
+        while not self.stop_event.is_set():
+            self.refresh()
+            self.stop_event.wait(self.poll_interval)
+
+    def stop(self) -> None:
+        self.stop_event.set()
+
+    def deposit(self, owner: Address) -> int:
+        """Return the amount deposited by `owner` for rewards"""
+        if owner in self.deposits:
+            self.hits += 1
+            self.deposits.move_to_end(owner)
+            return self.deposits[owner]
+        self.misses += 1
+        self.deposits[owner] = self.monitor_contract.functions.balances(owner).call()
+        if len(self.deposits) > self.max_owners:
+            self.deposits.popitem(last=False)
+        return self.deposits[owner]
+
+    def refresh(self) -> None:
+        """Reload all watched deposits if there's a new block"""
+        block_number = self.web3.eth.blockNumber
+        if block_number == self.last_block:
+            return
+        self.last_block = block_number
+        owners = list(self.deposits)
+        if len(owners) == 0:
+            return
+        results = rpc_batch(self.web3, [
+            (
+                'eth_call',
+                [
+                    {
+                        'to': self.monitor_contract.address,
+                        'data': self.monitor_contract.encodeABI('balances', args=[owner]),
+                    },
+                    hex(block_number),
+                ],
+            )
+            for owner in owners
+        ])
+        self.refreshes += 1
+        for owner, result in zip(owners, results):
+            # the owner may have been dropped while waiting for the results
+            if owner in self.deposits:
+                self.deposits[owner] = int.from_bytes(HexBytes(result), 'big')
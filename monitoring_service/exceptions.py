@@ -9,3 +9,11 @@ class ServiceNotRegistered(MonitoringServiceException):
 
 class StateDBInvalid(MonitoringServiceException):
     """Raised if state DB metadata do not match current setup"""
+
+
+class ReceiptTrackerStopped(MonitoringServiceException):
+    """Raised to tasks waiting for a receipt when the receipt tracker is stopped"""
+
+
+class InvalidEvents(MonitoringServiceException):
+    """Raised if events submitted for dispatching are malformed"""
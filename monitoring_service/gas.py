@@ -0,0 +1,147 @@
+import logging
+from collections import deque
+from itertools import chain
+from typing import Deque, Dict, List, Optional, Tuple
+
+from hexbytes import HexBytes
+from web3 import Web3
+
+from monitoring_service.constants import (
+    DEFAULT_GAS_PRICE_HISTORY_BLOCKS,
+    DEFAULT_GAS_PRICE_PERCENTILE,
+)
+from monitoring_service.utils import rpc_batch
+
+log = logging.getLogger(__name__)
+
+# safety margin added on top of the gas estimate
+GAS_ESTIMATE_MARGIN = 1.2
+# nodes only accept a replacement transaction if it pays at least this much more
+# (12.5% for parity, 10% for geth)
+MIN_GAS_PRICE_BUMP = 0.125
+
+
+class GasPriceOracle:
+    """Suggests gas prices based on the prices paid in recent blocks.
+
+    The prices of all transactions in the last `history_blocks` blocks are
+    kept; the suggested price is their `percentile`th percentile. New blocks
+    are fetched in one batch when a price is requested. If there are no
+    recent transactions, the node's gas price is used.
+
+    The suggested price is computed once per block. `cached_price()` returns
+    it without asking the node, as long as someone (e.g. the receipt tracker)
+    calls `update()` whenever there's a new block.
+    """
+    def __init__(
+        self,
+        web3: Web3,
+        percentile: int = DEFAULT_GAS_PRICE_PERCENTILE,
+        history_blocks: int = DEFAULT_GAS_PRICE_HISTORY_BLOCKS,
+        max_gas_price: int = None,
+    ) -> None:
+        assert 0 <= percentile <= 100
+        assert history_blocks > 0
+        self.web3 = web3
+        self.percentile = percentile
+        self.max_gas_price = max_gas_price
+        self.history_blocks = history_blocks
+        # gas prices of recent blocks, oldest first
+        self.blocks: Deque[List[int]] = deque(maxlen=history_blocks)
+        self.last_block: Optional[int] = None
+        # suggested price as of `last_block`, before applying `max_gas_price`
+        self.price: Optional[int] = None
+
+    def update(self, block_number: int = None) -> None:
+        """Fetch the gas prices of blocks mined since the last update, up to
+        `block_number` (default: the node's latest block)"""
+        latest_block = self.web3.eth.blockNumber if block_number is None else block_number
+        first_block = latest_block - self.history_blocks + 1
+        if self.last_block is not None:
+            first_block = max(first_block, self.last_block + 1)
+        first_block = max(first_block, 0)
+        if first_block > latest_block:
+            return
+        blocks = rpc_batch(self.web3, [
+            ('eth_getBlockByNumber', [hex(block_number), True])
+            for block_number in range(first_block, latest_block + 1)
+        ])
+        for block in blocks:
+            if block is None:
+                continue
+            self.blocks.append([
+                tx['gasPrice'] for tx in block['transactions'] if 'gasPrice' in tx
+            ])
+        self.last_block = latest_block
+        prices = sorted(chain.from_iterable(self.blocks))
+        if len(prices) > 0:
+            index = min(len(prices) - 1, len(prices) * self.percentile // 100)
+            self.price = prices[index]
+        else:
+            self.price = self.web3.eth.gasPrice
+
+    def suggest(self) -> int:
+        """Return the gas price for a new transaction"""
+        self.update()
+        return self.cached_price()
+
+    def cached_price(self) -> int:
+        """Return the gas price suggested at the last update. Only the first
+        call (before any update) asks the node."""
+        if self.price is None:
+            self.update()
+        gas_price = self.price
+        assert gas_price is not None
+        if self.max_gas_price is not None:
+            gas_price = min(gas_price, self.max_gas_price)
+        return gas_price
+
+    def replacement_price(self, gas_price: int) -> Optional[int]:
+        """Return the gas price for a transaction replacing one that pays
+        `gas_price`, or None if the price can't be raised any further"""
+        bumped_price = max(int(gas_price * (1 + MIN_GAS_PRICE_BUMP)) + 1, self.suggest())
+        if self.max_gas_price is not None:
+            bumped_price = min(bumped_price, self.max_gas_price)
+        if bumped_price <= gas_price:
+            return None
+        return bumped_price
+
+
+class GasEstimateCache:
+    """Caches gas estimates per call shape, i.e. per receiving contract and
+    called function. Calls of the same function cost about the same gas, so
+    only the first one has to be estimated by the node."""
+    def __init__(self, web3: Web3, margin: float = GAS_ESTIMATE_MARGIN) -> None:
+        self.web3 = web3
+        self.margin = margin
+        self.estimates: Dict[Tuple[str, str], int] = {}
+        # metrics
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def call_shape(transaction: Dict) -> Tuple[str, str]:
+        selector = HexBytes(transaction.get('data', b''))[:4]
+        return (transaction.get('to', ''), selector.hex())
+
+    def cached(self, call_shape: Tuple[str, str], default: int) -> int:
+        """Return the cached estimate for `call_shape` without asking the node"""
+        return self.estimates.get(call_shape, default)
+
+    def estimate(self, transaction: Dict, default: int = None) -> int:
+        """Return the gas limit for `transaction`. If the node can't estimate it
+        (e.g. because the call would fail right now), `default` is returned."""
+        key = self.call_shape(transaction)
+        if key in self.estimates:
+            self.hits += 1
+            return self.estimates[key]
+        self.misses += 1
+        try:
+            estimate = self.web3.eth.estimateGas(transaction)
+        except Exception as e:
+            if default is None:
+                raise
+            log.warning('Estimating gas for %s failed (%s), using %d' % (key, e, default))
+            return default
+        self.estimates[key] = int(estimate * self.margin)
+        return self.estimates[key]
@@ -0,0 +1,91 @@
+import json
+import logging
+from typing import Callable, List
+
+import jsonschema
+
+from monitoring_service.constants import MAX_MONITOR_REQUEST_BATCH_SIZE
+from raiden_libs.exceptions import MessageFormatError
+from raiden_libs.messages import Message, MonitorRequest
+from raiden_libs.messages.json_schema import MONITOR_REQUEST_SCHEMA
+from raiden_libs.transport import Transport
+
+log = logging.getLogger(__name__)
+
+MONITOR_REQUEST_BATCH_SCHEMA = {
+    'type': 'object',
+    'required': ['message_type', 'monitor_requests'],
+    'properties': {
+        'message_type': {
+            'type': 'string',
+            'enum': ['MonitorRequestBatch'],
+        },
+        'monitor_requests': {
+            'type': 'array',
+            'minItems': 1,
+            'maxItems': MAX_MONITOR_REQUEST_BATCH_SIZE,
+            'items': MONITOR_REQUEST_SCHEMA,
+        },
+    },
+}
+
+
+class MonitorRequestBatch(Message):
+    """Many monitor requests sent in a single message, e.g. by a Raiden node
+    with many channels"""
+    _type = 'MonitorRequestBatch'
+
+    def __init__(self, monitor_requests: List[MonitorRequest]) -> None:
+        assert 0 < len(monitor_requests) <= MAX_MONITOR_REQUEST_BATCH_SIZE
+        assert all(isinstance(x, MonitorRequest) for x in monitor_requests)
+        self.monitor_requests = monitor_requests
+
+    def serialize_data(self) -> dict:
+        return {
+            'monitor_requests': [x.serialize_data() for x in self.monitor_requests],
+        }
+
+    @classmethod
+    def deserialize(cls, data):
+        if isinstance(data, str):
+            data = json.loads(data)
+        jsonschema.validate(data, MONITOR_REQUEST_BATCH_SCHEMA)
+        return cls([MonitorRequest.deserialize(x) for x in data['monitor_requests']])
+
+
+def intercept_batches(
+    transport: Transport,
+    callback: Callable[[MonitorRequestBatch], None],
+) -> None:
+    """Pass MonitorRequestBatch messages received by `transport` to `callback`.
+
+    raiden_libs doesn't know this message type, so batches are picked out
+    before the transport deserializes the data. Everything else is handled
+    by the transport as before.
+    """
+    run_message_callbacks = transport.run_message_callbacks
+
+    def run_callbacks(data):
+        # cheap check first, most messages aren't batches
+        if MonitorRequestBatch._type not in data:
+            return run_message_callbacks(data)
+        try:
+            json_msg = json.loads(data)
+        except json.decoder.JSONDecodeError as ex:
+            log.error('Error when reading JSON: %s', str(ex))
+            return
+        if not isinstance(json_msg, dict) or json_msg.get('message_type') != 'MonitorRequestBatch':
+            return run_message_callbacks(data)
+        try:
+            batch = MonitorRequestBatch.deserialize(json_msg)
+        except (
+            jsonschema.exceptions.ValidationError,
+            MessageFormatError,
+            # raised by the MonitorRequest constructor for invalid values
+            AssertionError,
+        ) as ex:
+            log.error('Error when deserializing message batch: %s', str(ex))
+            return
+        callback(batch)
+
+    transport.run_message_callbacks = run_callbacks
@@ -0,0 +1,259 @@
+import bisect
+import functools
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterable, Iterator, List, Sequence, Tuple, TypeVar
+
+# upper bounds of histogram buckets, in seconds
+DEFAULT_BUCKETS = (
+    0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0,
+)
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+def escape_label_value(value) -> str:
+    return str(value).replace('\\', r'\\').replace('\n', r'\n').replace('"', r'\"')
+
+
+def format_labels(labels: Iterable[Tuple[str, str]]) -> str:
+    labels = list(labels)
+    if len(labels) == 0:
+        return ''
+    return '{%s}' % ','.join('%s="%s"' % (k, escape_label_value(v)) for k, v in labels)
+
+
+def format_value(value: float) -> str:
+    if isinstance(value, bool):
+        return str(int(value))
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metric:
+    """A metric in the Prometheus data model. Values are kept per
+    combination of label values."""
+    type = ''
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+
+    def _key(self, labels: dict) -> tuple:
+        assert set(labels) == set(self.labelnames), 'Labels must be %s' % (self.labelnames,)
+        return tuple(str(labels[x]) for x in self.labelnames)
+
+    def samples(self) -> Iterator[Tuple[str, List[Tuple[str, str]], float]]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        lines = [
+            '# HELP %s %s' % (self.name, self.documentation),
+            '# TYPE %s %s' % (self.name, self.type),
+        ]
+        for name, labels, value in self.samples():
+            lines.append('%s%s %s' % (name, format_labels(labels), format_value(value)))
+        return '\n'.join(lines) + '\n'
+
+
+class SimpleMetric(Metric):
+    """A metric with a single number per combination of label values"""
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> None:
+        super().__init__(name, documentation, labelnames)
+        self.values: Dict[tuple, float] = {}
+
+    def samples(self) -> Iterator[Tuple[str, List[Tuple[str, str]], float]]:
+        for key, value in sorted(self.values.items()):
+            yield self.name, list(zip(self.labelnames, key)), value
+
+
+class Counter(SimpleMetric):
+    type = 'counter'
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        assert amount >= 0
+        key = self._key(labels)
+        self.values[key] = self.values.get(key, 0) + amount
+
+    def get(self, **labels) -> float:
+        return self.values.get(self._key(labels), 0)
+
+
+class Gauge(SimpleMetric):
+    type = 'gauge'
+
+    def set(self, value: float, **labels) -> None:
+        self.values[self._key(labels)] = value
+
+    def get(self, **labels) -> float:
+        return self.values.get(self._key(labels), 0)
+
+
+class HistogramValue:
+    def __init__(self, buckets: Sequence[float]) -> None:
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+
+class Histogram(Metric):
+    type = 'histogram'
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ) -> None:
+        super().__init__(name, documentation, labelnames)
+        assert list(buckets) == sorted(buckets)
+        self.buckets = tuple(buckets)
+        self.values: Dict[tuple, HistogramValue] = {}
+
+    def observe(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        histogram = self.values.get(key)
+        if histogram is None:
+            histogram = self.values[key] = HistogramValue(self.buckets)
+        histogram.counts[bisect.bisect_left(self.buckets, value)] += 1
+        histogram.sum += value
+        histogram.count += 1
+
+    @contextmanager
+    def time(self, **labels) -> Iterator[None]:
+        """Observe the time spent in the `with` block"""
+        started_at = time.monotonic()
+        try:
+            yield
+        finally:
+            self.observe(time.monotonic() - started_at, **labels)
+
+    def get(self, **labels) -> HistogramValue:
+        return self.values.get(self._key(labels), HistogramValue(self.buckets))
+
+    def samples(self) -> Iterator[Tuple[str, List[Tuple[str, str]], float]]:
+        for key, histogram in sorted(self.values.items()):
+            labels = list(zip(self.labelnames, key))
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), histogram.counts):
+                cumulative += count
+                yield self.name + '_bucket', labels + [('le', format_value(bound))], cumulative
+            yield self.name + '_sum', labels, histogram.sum
+            yield self.name + '_count', labels, histogram.count
+
+
+M = TypeVar('M', bound=Metric)
+
+
+class MetricsRegistry:
+    def __init__(self) -> None:
+        self.metrics: Dict[str, Metric] = {}
+
+    def register(self, metric: M) -> M:
+        assert metric.name not in self.metrics, 'Metric %s already registered' % metric.name
+        self.metrics[metric.name] = metric
+        return metric
+
+    def counter(self, *args, **kwargs) -> Counter:
+        return self.register(Counter(*args, **kwargs))
+
+    def gauge(self, *args, **kwargs) -> Gauge:
+        return self.register(Gauge(*args, **kwargs))
+
+    def histogram(self, *args, **kwargs) -> Histogram:
+        return self.register(Histogram(*args, **kwargs))
+
+
+def render(metrics: Iterable[Metric]) -> str:
+    """Metrics in the Prometheus text exposition format"""
+    return ''.join(metric.render() for metric in metrics)
+
+
+def stats_gauges(name: str, stats: dict, labels: Dict[str, str] = None) -> List[Gauge]:
+    """Gauges for the numeric values of a component's `stats()`. Nested dicts
+    become a gauge labeled by their keys."""
+    labels = labels or {}
+    gauges = []
+    for key, value in sorted(stats.items()):
+        if isinstance(value, dict):
+            nested = {k: v for k, v in value.items() if isinstance(v, (int, float))}
+            gauge = Gauge('%s_%s' % (name, key), '%s of %s' % (key, name), list(labels) + ['key'])
+            for k, v in nested.items():
+                gauge.set(v, key=k, **labels)
+        elif isinstance(value, (int, float)):
+            gauge = Gauge('%s_%s' % (name, key), '%s of %s' % (key, name), list(labels))
+            gauge.set(value, **labels)
+        else:
+            continue
+        gauges.append(gauge)
+    return gauges
+
+
+# metrics collected over the whole process
+REGISTRY = MetricsRegistry()
+MONITOR_REQUESTS_RECEIVED = REGISTRY.counter(
+    'ms_monitor_requests_received_total',
+    'Monitor requests received over the transport',
+    ['source'],
+)
+VALIDATION_SECONDS = REGISTRY.histogram(
+    'ms_validation_seconds',
+    'Time spent validating (and storing) monitor requests',
+    ['kind'],
+)
+DB_OPERATION_SECONDS = REGISTRY.histogram(
+    'ms_db_operation_seconds',
+    'Time spent in state DB operations',
+    ['operation'],
+)
+RPC_REQUESTS = REGISTRY.counter(
+    'ms_rpc_requests_total',
+    'JSON-RPC requests sent to the ethereum node',
+    ['method'],
+)
+RPC_ERRORS = REGISTRY.counter(
+    'ms_rpc_errors_total',
+    'JSON-RPC requests that failed',
+    ['method'],
+)
+RPC_SECONDS = REGISTRY.histogram(
+    'ms_rpc_seconds',
+    'Latency of JSON-RPC requests. Batches are observed as method "batch"',
+    ['method'],
+)
+BLOCKCHAIN_EVENTS = REGISTRY.counter(
+    'ms_blockchain_events_total',
+    'Confirmed blockchain events handled',
+    ['event'],
+)
+MONITOR_TRANSACTION_LATENCY = REGISTRY.histogram(
+    'ms_monitor_transaction_latency_seconds',
+    'Time from handling a ChannelClosed event until monitor() was sent',
+)
+
+
+def timed_db_operation(function):
+    """Decorator observing the duration of a state DB method"""
+    @functools.wraps(function)
+    def wrap(*args, **kwargs):
+        with DB_OPERATION_SECONDS.time(operation=function.__name__):
+            return function(*args, **kwargs)
+    return wrap
+
+
+def rpc_metrics_middleware(make_request, web3):
+    """web3 middleware counting and timing JSON-RPC requests per method"""
+    def middleware(method, params):
+        RPC_REQUESTS.inc(method=method)
+        with RPC_SECONDS.time(method=method):
+            try:
+                response = make_request(method, params)
+            except Exception:
+                RPC_ERRORS.inc(method=method)
+                raise
+        if 'error' in response:
+            RPC_ERRORS.inc(method=method)
+        return response
+    return middleware
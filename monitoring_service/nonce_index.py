@@ -0,0 +1,64 @@
+import logging
+from typing import Dict
+
+from monitoring_service.state_db import StateDB
+from raiden_libs.types import Address, ChannelIdentifier
+
+log = logging.getLogger(__name__)
+
+
+class NonceIndex:
+    """Balance proof nonce of the stored monitor request per channel and
+    non-closing signer.
+
+    A monitor request whose nonce isn't higher than the stored one can't
+    replace it, so it can be rejected without any validation. The index is
+    loaded from the state DB and has to be updated whenever a monitor request
+    is stored or deleted.
+    """
+    def __init__(self) -> None:
+        # channel_id => non-closing signer => nonce
+        self.nonces: Dict[ChannelIdentifier, Dict[Address, int]] = {}
+
+        # metrics
+        self.stale = 0
+
+    def __len__(self) -> int:
+        return sum(len(x) for x in self.nonces.values())
+
+    def load(self, state_db: StateDB) -> None:
+        self.nonces = {}
+        for (channel_id, non_closing_signer), nonce in state_db.get_latest_nonces().items():
+            self.update(channel_id, non_closing_signer, nonce)
+        log.info('Loaded nonces of %d monitor requests' % len(self))
+
+    def is_stale(
+        self,
+        channel_id: ChannelIdentifier,
+        non_closing_signer: Address,
+        nonce: int,
+    ) -> bool:
+        """Check if a monitor request with a nonce as high as `nonce` is stored"""
+        latest = self.nonces.get(channel_id, {}).get(non_closing_signer)
+        if latest is not None and nonce <= latest:
+            self.stale += 1
+            return True
+        return False
+
+    def update(
+        self,
+        channel_id: ChannelIdentifier,
+        non_closing_signer: Address,
+        nonce: int,
+    ) -> None:
+        signers = self.nonces.setdefault(channel_id, {})
+        signers[non_closing_signer] = max(nonce, signers.get(non_closing_signer, nonce))
+
+    def remove_channel(self, channel_id: ChannelIdentifier) -> None:
+        self.nonces.pop(channel_id, None)
+
+    def stats(self) -> dict:
+        return {
+            'entries': len(self),
+            'stale': self.stale,
+        }
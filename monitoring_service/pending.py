@@ -0,0 +1,101 @@
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, List, NamedTuple
+
+log = logging.getLogger(__name__)
+
+
+class PendingItems(NamedTuple):
+    expires_at: float
+    # item id => item
+    items: OrderedDict
+
+
+class PendingBuffer:
+    """Holds items for keys that can't be handled yet, e.g. monitor requests
+    for channels whose ChannelOpened event isn't confirmed yet.
+
+    Items of a key are kept for `ttl` seconds after the last item was added.
+    At most `max_keys` keys with `max_items_per_key` items each are held, the
+    oldest keys and items are evicted first. Items with the same id are only
+    held once.
+    """
+    def __init__(
+        self,
+        ttl: float,
+        max_keys: int,
+        max_items_per_key: int,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        assert ttl > 0
+        assert max_keys > 0
+        assert max_items_per_key > 0
+        self.ttl = ttl
+        self.max_keys = max_keys
+        self.max_items_per_key = max_items_per_key
+        self.clock = clock
+        self.pending: OrderedDict = OrderedDict()
+
+        # metrics
+        self.buffered = 0
+        self.replayed = 0
+        self.expired = 0
+        self.evicted = 0
+
+    def __len__(self) -> int:
+        return sum(len(x.items) for x in self.pending.values())
+
+    def add(self, key: Hashable, item_id: Hashable, item: Any) -> bool:
+        """Hold `item` until `key` is popped. Returns False if it's already held."""
+        now = self.clock()
+        self.expire(now)
+        entry = self.pending.pop(key, None)
+        items = entry.items if entry is not None else OrderedDict()
+        self.pending[key] = PendingItems(now + self.ttl, items)
+        if item_id in items:
+            return False
+        items[item_id] = item
+        self.buffered += 1
+        if len(items) > self.max_items_per_key:
+            items.popitem(last=False)
+            self.evicted += 1
+        if len(self.pending) > self.max_keys:
+            _, evicted = self.pending.popitem(last=False)
+            self.evicted += len(evicted.items)
+        return True
+
+    def pop(self, key: Hashable) -> List[Any]:
+        """Remove and return the items held for `key`, oldest first"""
+        self.expire(self.clock())
+        entry = self.pending.pop(key, None)
+        if entry is None:
+            return []
+        self.replayed += len(entry.items)
+        return list(entry.items.values())
+
+    def count(self, key: Hashable) -> int:
+        """Number of items held for `key`"""
+        self.expire(self.clock())
+        entry = self.pending.get(key)
+        return len(entry.items) if entry is not None else 0
+
+    def expire(self, now: float) -> None:
+        # keys are ordered by their expiry, since adding an item moves the key to the end
+        while len(self.pending) > 0:
+            key, entry = next(iter(self.pending.items()))
+            if entry.expires_at > now:
+                break
+            del self.pending[key]
+            self.expired += len(entry.items)
+            log.debug('Pending items of %s expired' % (key,))
+
+    def stats(self) -> dict:
+        return {
+            'keys': len(self.pending),
+            'items': len(self),
+            'buffered': self.buffered,
+            'replayed': self.replayed,
+            'expired': self.expired,
+            'evicted': self.evicted,
+        }
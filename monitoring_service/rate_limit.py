@@ -0,0 +1,80 @@
+import logging
+import time
+from collections import OrderedDict
+from typing import Callable, Hashable
+
+log = logging.getLogger(__name__)
+
+
+class TokenBucket:
+    """Holds up to `capacity` tokens, refilled at `rate` tokens per second"""
+    __slots__ = ('rate', 'capacity', 'tokens', 'updated_at')
+
+    def __init__(self, rate: float, capacity: float, now: float) -> None:
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated_at = now
+
+    def consume(self, now: float, amount: float = 1) -> bool:
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+        if self.tokens < amount:
+            return False
+        self.tokens -= amount
+        return True
+
+
+class RateLimiter:
+    """Token-bucket rate limit per key, e.g. per signer or per channel.
+
+    Each key may do `burst` requests at once and `rate` requests per second
+    on average. Buckets of the least recently seen keys are forgotten when
+    there are more than `max_keys`. Forgetting a bucket only resets its key
+    to a full burst.
+    """
+    def __init__(
+        self,
+        name: str,
+        rate: float,
+        burst: int,
+        max_keys: int = 100000,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        assert rate > 0
+        assert burst >= 1
+        self.name = name
+        self.rate = rate
+        self.burst = burst
+        self.max_keys = max_keys
+        self.clock = clock
+        self.buckets: OrderedDict = OrderedDict()
+
+        # metrics
+        self.allowed = 0
+        self.dropped = 0
+
+    def allow(self, key: Hashable) -> bool:
+        """Take a token for `key`. Returns False if the key is over its limit."""
+        now = self.clock()
+        bucket = self.buckets.get(key)
+        if bucket is None:
+            bucket = TokenBucket(self.rate, self.burst, now)
+            self.buckets[key] = bucket
+            if len(self.buckets) > self.max_keys:
+                self.buckets.popitem(last=False)
+        else:
+            self.buckets.move_to_end(key)
+        if bucket.consume(now):
+            self.allowed += 1
+            return True
+        self.dropped += 1
+        log.debug('Rate limit of %s exceeded by %s' % (self.name, key))
+        return False
+
+    def stats(self) -> dict:
+        return {
+            'allowed': self.allowed,
+            'dropped': self.dropped,
+            'keys': len(self.buckets),
+        }
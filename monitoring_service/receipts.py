@@ -0,0 +1,206 @@
+import logging
+import time
+from collections import deque
+from typing import Deque, Dict, NamedTuple, Optional
+
+import gevent
+import gevent.event
+from hexbytes import HexBytes
+from web3 import Web3
+
+from monitoring_service.constants import (
+    DEFAULT_GAS_ESCALATION_BLOCKS,
+    DEFAULT_RECEIPT_POLL_INTERVAL,
+)
+from monitoring_service.exceptions import ReceiptTrackerStopped
+from monitoring_service.state_db import StateDB
+from monitoring_service.transactions import (
+    TransactionManager,
+    TransactionStatus,
+    receipt_status,
+)
+from monitoring_service.utils import get_transaction_receipts
+
+log = logging.getLogger(__name__)
+
+
+class TrackedTransaction(NamedTuple):
+    result: gevent.event.AsyncResult
+    tracked_at: float
+    tracked_block: int
+    # block at which this version of the transaction was sent
+    sent_block: int
+    # block by which the transaction must be mined, if it's deadline-critical
+    deadline: Optional[int] = None
+
+
+class InclusionLatency(NamedTuple):
+    tx_hash: str
+    seconds: float
+    blocks: int
+
+
+class ReceiptTracker(gevent.Greenlet):
+    """Waits for the receipts of sent transactions.
+
+    Instead of every task polling for its own receipt, the hashes of all
+    outstanding transactions are fetched in a single JSON-RPC batch whenever
+    a new block is seen. Tasks get an AsyncResult which is resolved with the
+    receipt once the transaction is mined.
+
+    If a `state_db` is given, the outbox status of mined transactions is
+    updated as well.
+
+    If a `tx_manager` is given, its gas price oracle is updated on every new
+    block and mined transactions are removed from its pending transactions.
+    Transactions with a deadline that aren't mined within `escalation_blocks`
+    blocks are replaced by the same transaction paying a higher gas price.
+    All versions of the transaction are tracked until one of them is mined.
+    """
+    def __init__(
+        self,
+        web3: Web3,
+        state_db: StateDB = None,
+        poll_interval: float = DEFAULT_RECEIPT_POLL_INTERVAL,
+        history_size: int = 1000,
+        tx_manager: TransactionManager = None,
+        escalation_blocks: int = DEFAULT_GAS_ESCALATION_BLOCKS,
+    ) -> None:
+        super().__init__()
+        self.web3 = web3
+        self.state_db = state_db
+        self.poll_interval = poll_interval
+        self.tx_manager = tx_manager
+        self.escalation_blocks = escalation_blocks
+        self.stop_event = gevent.event.Event()
+        self.tracked: Dict[str, TrackedTransaction] = {}
+        self.last_block: Optional[int] = None
+        # metrics
+        self.latencies: Deque[InclusionLatency] = deque(maxlen=history_size)
+        self.batches = 0
+        self.escalations = 0
+
+    def _run(self):
+        while not self.stop_event.is_set():
+            try:
+                self.poll()
+            except Exception:
+                # e.g. the node is unavailable, the block is polled again next time
+                log.exception('Polling receipts failed')
+            self.stop_event.wait(self.poll_interval)
+
+    def stop(self) -> None:
+        """Stop polling. Tasks still waiting for a receipt are woken up
+        with ReceiptTrackerStopped."""
+        self.stop_event.set()
+        for tracked in self.tracked.values():
+            tracked.result.set_exception(ReceiptTrackerStopped())
+        self.tracked.clear()
+
+    def track(self, tx_hash: HexBytes, deadline: int = None) -> gevent.event.AsyncResult:
+        """Start waiting for the receipt of `tx_hash`. If a `deadline` block is
+        given, its gas price is raised when it takes too long to be mined."""
+        key = HexBytes(tx_hash).hex()
+        if key not in self.tracked:
+            block_number = self.last_block
+            if block_number is None:
+                # not polled yet
+                block_number = self.web3.eth.blockNumber
+            self.tracked[key] = TrackedTransaction(
+                gevent.event.AsyncResult(),
+                time.monotonic(),
+                block_number,
+                block_number,
+                deadline,
+            )
+        return self.tracked[key].result
+
+    def wait(self, tx_hash: HexBytes, timeout: float = None) -> dict:
+        """Block until `tx_hash` is mined and return its receipt"""
+        return self.track(tx_hash).get(timeout=timeout)
+
+    def poll(self) -> None:
+        """Fetch receipts of all tracked transactions if there's a new block"""
+        block_number = self.web3.eth.blockNumber
+        if block_number == self.last_block:
+            return
+        if self.tx_manager is not None:
+            self.tx_manager.gas_price_oracle.update(block_number)
+        if len(self.tracked) == 0:
+            self.last_block = block_number
+            return
+
+        tx_hashes = list(self.tracked)
+        receipts = get_transaction_receipts(self.web3, tx_hashes)
+        self.batches += 1
+        now = time.monotonic()
+        for tx_hash, receipt in zip(tx_hashes, receipts):
+            if receipt is None or tx_hash not in self.tracked:
+                continue
+            tracked = self.tracked.pop(tx_hash)
+            latency = InclusionLatency(
+                tx_hash,
+                now - tracked.tracked_at,
+                max(receipt['blockNumber'] - tracked.tracked_block, 0),
+            )
+            self.latencies.append(latency)
+            log.debug('Transaction %s mined after %.3fs' % (tx_hash, latency.seconds))
+            if self.state_db is not None:
+                self.state_db.update_transaction_status(tx_hash, receipt_status(receipt).value)
+            if self.tx_manager is not None:
+                self.tx_manager.forget_transaction(HexBytes(tx_hash))
+            # other versions of the same transaction will never be mined
+            for other_hash, other in list(self.tracked.items()):
+                if other.result is tracked.result:
+                    del self.tracked[other_hash]
+                    if self.state_db is not None:
+                        self.state_db.update_transaction_status(
+                            other_hash,
+                            TransactionStatus.REPLACED.value,
+                        )
+                    if self.tx_manager is not None:
+                        self.tx_manager.forget_transaction(HexBytes(other_hash))
+            tracked.result.set(receipt)
+
+        self.escalate(block_number)
+        # only now, so that a failed poll is retried
+        self.last_block = block_number
+
+    def escalate(self, block_number: int) -> None:
+        """Raise the gas price of deadline-critical transactions that have been
+        waiting for `escalation_blocks` blocks"""
+        if self.tx_manager is None:
+            return
+        for tx_hash, tracked in list(self.tracked.items()):
+            if tracked.deadline is None:
+                continue
+            if block_number - tracked.sent_block < self.escalation_blocks:
+                continue
+            if block_number >= tracked.deadline:
+                log.error('Transaction %s missed its deadline' % tx_hash)
+                self.tracked[tx_hash] = tracked._replace(deadline=None)
+                continue
+            new_tx_hash = self.tx_manager.replace_transaction(HexBytes(tx_hash))
+            if new_tx_hash is None:
+                if self.tx_manager.is_pending(HexBytes(tx_hash)):
+                    # the replacement was rejected, try again later
+                    self.tracked[tx_hash] = tracked._replace(sent_block=block_number)
+                else:
+                    self.tracked[tx_hash] = tracked._replace(deadline=None)
+                continue
+            # only the latest version is escalated again
+            self.tracked[tx_hash] = tracked._replace(deadline=None)
+            self.escalations += 1
+            self.tracked[new_tx_hash.hex()] = tracked._replace(sent_block=block_number)
+
+    def stats(self) -> dict:
+        mean_latency = None
+        if len(self.latencies) > 0:
+            mean_latency = sum(x.seconds for x in self.latencies) / len(self.latencies)
+        return {
+            'tracked': len(self.tracked),
+            'batches': self.batches,
+            'escalations': self.escalations,
+            'mined': len(self.latencies),
+            'mean_inclusion_latency': mean_latency,
+        }
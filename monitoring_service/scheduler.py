@@ -0,0 +1,123 @@
+import heapq
+import itertools
+import logging
+from typing import Callable, List, NamedTuple, Optional
+
+import gevent
+import gevent.pool
+
+from monitoring_service.task_registry import TaskRegistry
+
+log = logging.getLogger(__name__)
+
+
+class ScheduledTask(NamedTuple):
+    settle_block: int
+    # negated, so that higher rewards are popped first
+    priority_reward: int
+    sequence: int
+    channel_identifier: int
+    task: gevent.Greenlet
+
+    @property
+    def reward_amount(self) -> int:
+        return -self.priority_reward
+
+
+class TransactionScheduler:
+    """Starts tasks sending monitoring transactions in order of urgency.
+
+    At most `max_concurrent` tasks run at the same time. Pending tasks are
+    ordered by the block at which the channel can be settled (i.e. the
+    deadline for the monitoring transaction) and then by the reward they pay.
+    Tasks whose deadline has passed are discarded instead of wasting gas.
+    `block_number` returns None as long as no block is known.
+    """
+    def __init__(
+        self,
+        max_concurrent: int,
+        block_number: Callable[[], Optional[int]],
+        task_registry: TaskRegistry = None,
+    ) -> None:
+        assert max_concurrent > 0
+        self.pool = gevent.pool.Pool(max_concurrent)
+        self.block_number = block_number
+        self.task_registry = task_registry
+        self.queue: List[ScheduledTask] = []
+        self.sequence = itertools.count()
+
+        # metrics
+        self.scheduled = 0
+        self.missed_deadlines = 0
+        self.completed = 0
+
+    @property
+    def queue_depth(self) -> int:
+        return len(self.queue)
+
+    def schedule(
+        self,
+        task: gevent.Greenlet,
+        channel_identifier: int,
+        settle_block: int,
+        reward_amount: int,
+    ) -> None:
+        """Queue `task` and start the most urgent tasks if there's capacity"""
+        self.scheduled += 1
+        heapq.heappush(
+            self.queue,
+            ScheduledTask(
+                settle_block,
+                -reward_amount,
+                next(self.sequence),
+                channel_identifier,
+                task,
+            ),
+        )
+        self._dispatch()
+
+    def pending(self) -> List[dict]:
+        """Return the queued tasks, most urgent first. The remaining blocks are
+        None until a block is known."""
+        current_block = self.block_number()
+        return [
+            {
+                'channel_identifier': x.channel_identifier,
+                'settle_block': x.settle_block,
+                'remaining_blocks': (
+                    None if current_block is None else x.settle_block - current_block
+                ),
+                'reward_amount': x.reward_amount,
+            }
+            for x in sorted(self.queue)
+        ]
+
+    def join(self, timeout: float = None) -> None:
+        """Wait until all queued and running tasks are finished"""
+        with gevent.Timeout(timeout, False):
+            while len(self.queue) > 0 or len(self.pool) > 0:
+                self.pool.join()
+
+    def _dispatch(self) -> None:
+        current_block = None
+        while len(self.queue) > 0 and self.pool.free_count() > 0:
+            scheduled = heapq.heappop(self.queue)
+            if current_block is None:
+                current_block = self.block_number()
+            if current_block is not None and scheduled.settle_block <= current_block:
+                self.missed_deadlines += 1
+                log.error(
+                    'Missed deadline for channel %s (settle block %d, current block %d)' %
+                    (scheduled.channel_identifier, scheduled.settle_block, current_block),
+                )
+                # the task will never run, let whoever waits for it know
+                scheduled.task.kill(block=False)
+                continue
+            self.pool.start(scheduled.task)
+            scheduled.task.rawlink(self._on_task_done)
+            if self.task_registry is not None:
+                self.task_registry.track(scheduled.task)
+
+    def _on_task_done(self, task: gevent.Greenlet) -> None:
+        self.completed += 1
+        self._dispatch()
@@ -1,21 +1,59 @@
 import logging
 import sys
 import traceback
-from typing import List, Set
+from enum import Enum
+from typing import Dict, List, Optional, Set, Tuple
 
 import gevent
 from eth_utils import encode_hex, is_address, is_checksum_address, is_same_address
 
 from monitoring_service.blockchain import BlockchainMonitor
+from monitoring_service.constants import (
+    DEFAULT_CHANNEL_BURST,
+    DEFAULT_CHANNEL_RATE_LIMIT,
+    DEFAULT_MAX_CONCURRENT_TRANSACTIONS,
+    DEFAULT_MIN_PROFIT_MARGIN,
+    DEFAULT_PENDING_REQUEST_CHANNELS,
+    DEFAULT_PENDING_REQUEST_TTL,
+    DEFAULT_PENDING_REQUESTS_PER_CHANNEL,
+    DEFAULT_SEEN_MESSAGE_CACHE_SIZE,
+    DEFAULT_SETTLE_TIMEOUT,
+    DEFAULT_SIGNER_BURST,
+    DEFAULT_SIGNER_RATE_LIMIT,
+    DEFAULT_SUBMISSION_TIMEOUT,
+    DEFAULT_VALIDATION_POOL_SIZE,
+    DEFAULT_VALIDATION_QUEUE_SIZE,
+)
+from monitoring_service.contract_code import ContractCodeCache
+from monitoring_service.costs import CostModel
+from monitoring_service.dedup import SeenMessageCache, message_digest
+from monitoring_service.deposits import DepositCache
 from monitoring_service.exceptions import ServiceNotRegistered, StateDBInvalid
+from monitoring_service.gas import GasPriceOracle
+from monitoring_service.messages import MonitorRequestBatch, intercept_batches
+from monitoring_service.metrics import MONITOR_REQUESTS_RECEIVED, Gauge, Metric, stats_gauges
+from monitoring_service.nonce_index import NonceIndex
+from monitoring_service.pending import PendingBuffer
+from monitoring_service.rate_limit import RateLimiter
+from monitoring_service.receipts import ReceiptTracker
+from monitoring_service.scheduler import TransactionScheduler
+from monitoring_service.signatures import SignatureRecoveryPool, non_closing_signed_data
 from monitoring_service.state_db import StateDB
-from monitoring_service.tasks import OnChannelClose, OnChannelSettle, StoreMonitorRequest
+from monitoring_service.task_registry import TaskRegistry
+from monitoring_service.tasks import (
+    OnChannelClose,
+    OnChannelSettle,
+    ReconcileTransactions,
+    StoreMonitorRequest,
+    StoreMonitorRequestBatch,
+)
+from monitoring_service.transactions import TransactionManager, TransactionStatus
 from monitoring_service.utils import is_service_registered
+from monitoring_service.validation_pool import OverflowPolicy, ValidationPool
 from raiden_contracts.constants import ChannelEvent
 from raiden_contracts.contract_manager import ContractManager
 from raiden_libs.gevent_error_handler import register_error_handler
 from raiden_libs.messages import BalanceProof, Message, MonitorRequest
-from raiden_libs.private_contract import PrivateContract
 from raiden_libs.transport import Transport
 from raiden_libs.types import Address
 from raiden_libs.utils import is_channel_identifier, private_key_to_address
@@ -23,6 +61,22 @@ from raiden_libs.utils import is_channel_identifier, private_key_to_address
 log = logging.getLogger(__name__)
 
 
+class SubmissionStatus(str, Enum):
+    """Outcome of a monitor request submitted over the REST API"""
+    ACCEPTED = 'accepted'
+    # failed validation, e.g. reward too low or deposit missing
+    REJECTED = 'rejected'
+    DUPLICATE = 'duplicate'
+    # held until the ChannelOpened event is confirmed
+    PENDING = 'pending'
+    INVALID_SIGNATURE = 'invalid_signature'
+    STALE = 'stale'
+    RATE_LIMITED = 'rate_limited'
+    # discarded by the validation pool because its queue was full
+    DROPPED = 'dropped'
+    TIMEOUT = 'timeout'
+
+
 def order_participants(p1: str, p2: str):
     return (p1, p2) if p1 < p2 else (p2, p1)
 
@@ -46,6 +100,23 @@ class MonitoringService(gevent.Greenlet):
         blockchain: BlockchainMonitor,
         monitor_contract_address: Address,
         contract_manager: ContractManager,
+        validation_pool_size: int = DEFAULT_VALIDATION_POOL_SIZE,
+        validation_queue_size: int = DEFAULT_VALIDATION_QUEUE_SIZE,
+        overflow_policy: OverflowPolicy = OverflowPolicy.DROP_OLDEST,
+        max_concurrent_transactions: int = DEFAULT_MAX_CONCURRENT_TRANSACTIONS,
+        max_gas_price: int = None,
+        token_price_in_wei: int = None,
+        min_profit_margin: float = DEFAULT_MIN_PROFIT_MARGIN,
+        signature_workers: int = 0,
+        token_network_registry_address: Address = None,
+        signer_rate_limit: float = DEFAULT_SIGNER_RATE_LIMIT,
+        signer_burst: int = DEFAULT_SIGNER_BURST,
+        channel_rate_limit: float = DEFAULT_CHANNEL_RATE_LIMIT,
+        channel_burst: int = DEFAULT_CHANNEL_BURST,
+        seen_message_cache_size: int = DEFAULT_SEEN_MESSAGE_CACHE_SIZE,
+        seen_message_bloom_capacity: int = 0,
+        pending_request_ttl: float = DEFAULT_PENDING_REQUEST_TTL,
+        pending_request_channels: int = DEFAULT_PENDING_REQUEST_CHANNELS,
     ) -> None:
         super().__init__()
         assert isinstance(private_key, str)
@@ -59,15 +130,33 @@ class MonitoringService(gevent.Greenlet):
         self.stop_event = gevent.event.Event()
         assert is_checksum_address(private_key_to_address(self.private_key))
         self.transport.add_message_callback(lambda message: self.on_message_event(message))
+        intercept_batches(self.transport, lambda message: self.on_message_event(message))
         self.transport.privkey = lambda: self.private_key
         self.address = private_key_to_address(self.private_key)
-        self.monitor_contract = PrivateContract(
-            blockchain.web3.eth.contract(
-                abi=contract_manager.get_contract_abi('MonitoringService'),
-                address=monitor_contract_address,
-            ),
+        self.monitor_contract = blockchain.web3.eth.contract(
+            abi=contract_manager.get_contract_abi('MonitoringService'),
+            address=monitor_contract_address,
+        )
+        self.tx_manager = TransactionManager(
+            blockchain.web3,
+            self.private_key,
+            state_db,
+            GasPriceOracle(blockchain.web3, max_gas_price=max_gas_price),
+        )
+        self.cost_model = CostModel(
+            self.monitor_contract,
+            self.tx_manager,
+            token_price_in_wei,
+            min_profit_margin,
+        )
+        self.receipt_tracker = ReceiptTracker(
+            blockchain.web3,
+            state_db,
+            tx_manager=self.tx_manager,
         )
         self.open_channels: Set[int] = set()
+        # channel_id => settle timeout, as announced in the ChannelOpened event
+        self.settle_timeouts: Dict[int, int] = {}
 
         # some sanity checks
         chain_id = int(self.blockchain.web3.version.network)
@@ -79,7 +168,40 @@ class MonitoringService(gevent.Greenlet):
             raise StateDBInvalid("Monitor service address doesn't match!")
         if not is_same_address(state_db.monitoring_contract_address(), monitor_contract_address):
             raise StateDBInvalid("Monitoring contract address doesn't match!")
-        self.task_list: List[gevent.Greenlet] = []
+        self.nonce_index = NonceIndex()
+        self.nonce_index.load(state_db)
+        self.task_registry = TaskRegistry()
+        self.signature_pool = SignatureRecoveryPool(signature_workers)
+        self.code_cache = ContractCodeCache(blockchain.web3, contract_manager)
+        self.deposit_cache = DepositCache(self.monitor_contract)
+        self.signer_rate_limiter = RateLimiter('signer', signer_rate_limit, signer_burst)
+        self.channel_rate_limiter = RateLimiter('channel', channel_rate_limit, channel_burst)
+        self.seen_messages = SeenMessageCache(
+            seen_message_cache_size,
+            seen_message_bloom_capacity,
+        )
+        self.pending_requests = PendingBuffer(
+            pending_request_ttl,
+            pending_request_channels,
+            DEFAULT_PENDING_REQUESTS_PER_CHANNEL,
+        )
+        # validation task => digest of its monitor request
+        self.validated_digests: Dict[gevent.Greenlet, List[bytes]] = {}
+        # validation task => event set once it is done or discarded
+        self.validation_waiters: Dict[gevent.Greenlet, gevent.event.Event] = {}
+        self.token_network_registry_address = token_network_registry_address
+        self.validation_pool = ValidationPool(
+            validation_pool_size,
+            validation_queue_size,
+            overflow_policy,
+            task_registry=self.task_registry,
+            on_discard=self.on_monitor_request_validated,
+        )
+        self.scheduler = TransactionScheduler(
+            max_concurrent_transactions,
+            lambda: self.blockchain.unconfirmed_head_number,
+            task_registry=self.task_registry,
+        )
         if not is_service_registered(
             self.blockchain.web3,
             contract_manager,
@@ -93,6 +215,16 @@ class MonitoringService(gevent.Greenlet):
 
     def _run(self):
         register_error_handler(error_handler)
+        self.start_task(ReconcileTransactions(
+            self.blockchain.web3,
+            self.state_db,
+            self.tx_manager,
+            self.receipt_tracker,
+        ))
+        self.receipt_tracker.start()
+        self.deposit_cache.start()
+        if self.token_network_registry_address is not None:
+            self.code_cache.prewarm(self.token_network_registry_address)
         self.transport.start()
         self.blockchain.start()
         self.blockchain.add_confirmed_listener(
@@ -108,24 +240,30 @@ class MonitoringService(gevent.Greenlet):
             lambda event, tx: self.on_channel_settled(event, tx),
         )
 
-        # this loop will wait until spawned greenlets complete
-        while self.stop_event.is_set() is False:
-            tasks = gevent.wait(self.task_list, timeout=5, count=1)
-            if len(tasks) == 0:
-                gevent.sleep(1)
-                continue
-            task = tasks[0]
-            log.info('%s completed (%s)' % (task, task.value))
-            self.task_list.remove(task)
+        # spawned tasks are tracked by the task registry, nothing to do until stopped
+        self.stop_event.wait()
 
     def stop(self):
         self.blockchain.stop()
+        self.receipt_tracker.stop()
+        self.deposit_cache.stop()
+        self.signature_pool.shutdown()
         self.stop_event.set()
 
     def on_channel_open(self, event, tx):
         log.info('on channel open: event=%s tx=%s' % (event, tx))
         channel_id = event['args']['channel_identifier']
         self.open_channels.add(channel_id)
+        self.settle_timeouts[channel_id] = event['args']['settle_timeout']
+        # requests that arrived before the event was confirmed. They were
+        # admitted up to the channel checks, so they aren't counted, recovered
+        # or charged to their signer again.
+        for monitor_request, non_closing_signer, digest in self.pending_requests.pop(channel_id):
+            if digest is not None and self.seen_messages.seen(digest):
+                continue
+            if self.admit_to_open_channel(monitor_request, non_closing_signer)[0] is None:
+                continue
+            self.validate_monitor_request(monitor_request, non_closing_signer, digest)
 
     def on_channel_close(self, event, tx):
         log.info('on channel close: event=%s tx=%s' % (event, tx))
@@ -147,10 +285,36 @@ class MonitoringService(gevent.Greenlet):
         assert is_channel_identifier(channel_id)
         if channel_id not in self.state_db.monitor_requests:
             return
+        if self.has_transaction(channel_id, 'monitor'):
+            log.info('monitor() already sent for channel %s' % channel_id)
+            return
         monitor_request = self.state_db.monitor_requests[channel_id]
-        # submit monitor request
-        self.start_task(
-            OnChannelClose(self.monitor_contract, monitor_request, self.private_key),
+        # gas prices may have risen since the request was accepted
+        if not self.cost_model.is_profitable(monitor_request.reward_amount, 'close'):
+            return
+        prepared_transaction = None
+        for signer, transaction in self.state_db.get_prepared_transactions(channel_id).items():
+            if not is_same_address(signer, closing_participant):
+                prepared_transaction = transaction
+        # submit monitor request, most urgent channels first
+        settle_timeout = self.settle_timeouts.get(channel_id, DEFAULT_SETTLE_TIMEOUT)
+        settle_block = event['blockNumber'] + settle_timeout
+        task = OnChannelClose(
+            self.monitor_contract,
+            monitor_request,
+            self.tx_manager,
+            prepared_transaction,
+            self.receipt_tracker,
+            settle_block,
+        )
+        if self.task_registry.coalesce(('monitor', channel_id), task) is not task:
+            log.info('monitor() for channel %s is already in progress' % channel_id)
+            return
+        self.scheduler.schedule(
+            task,
+            channel_id,
+            settle_block,
+            monitor_request.reward_amount,
         )
         self.open_channels.discard(channel_id)
 
@@ -159,10 +323,35 @@ class MonitoringService(gevent.Greenlet):
         monitor_request = self.state_db.monitor_requests.get(channel_id, None)
         if monitor_request is None:
             return
-        self.start_task(
-            OnChannelSettle(monitor_request, self.monitor_contract, self.private_key),
+        if self.has_transaction(channel_id, 'claimReward'):
+            log.info('claimReward() already sent for channel %s' % channel_id)
+            return
+        task = OnChannelSettle(
+            monitor_request,
+            self.monitor_contract,
+            self.tx_manager,
+            self.receipt_tracker,
         )
+        if self.task_registry.coalesce(('claimReward', channel_id), task) is not task:
+            log.info('claimReward() for channel %s is already in progress' % channel_id)
+            return
+        self.start_task(task)
         self.state_db.delete_monitor_request(event['args']['channel_identifier'])
+        self.nonce_index.remove_channel(channel_id)
+        self.settle_timeouts.pop(channel_id, None)
+
+    def has_transaction(self, channel_id: int, kind: str) -> bool:
+        """Return True if the outbox contains a live transaction of `kind`
+        for the channel, so that it is not sent (and paid for) twice"""
+        live_statuses = [
+            TransactionStatus.SIGNED.value,
+            TransactionStatus.PENDING.value,
+            TransactionStatus.MINED.value,
+        ]
+        return any(
+            tx['kind'] == kind
+            for tx in self.state_db.get_transactions(channel_id, live_statuses)
+        )
 
     def check_event(self, event, balance_proof: BalanceProof):
         return False
@@ -174,31 +363,326 @@ class MonitoringService(gevent.Greenlet):
         log.info('challenging proof channel=%s BP=%s' % (channel_id, balance_proof))
 
     def on_message_event(self, message):
-        """This handles messages received over the Transport"""
+        """This handles messages received over the Transport.
+        Copies of messages that are already handled are dropped."""
         assert isinstance(message, Message)
+        if isinstance(message, MonitorRequestBatch):
+            self.on_monitor_request_batch(message)
+            return
+        digest = message_digest(message)
+        if self.seen_messages.seen(digest):
+            return
         if isinstance(message, MonitorRequest):
-            self.on_monitor_request(message)
+            MONITOR_REQUESTS_RECEIVED.inc(source='message')
+            self.on_monitor_request(message, digest)
         else:
             log.warn('Ignoring unknown message type %s' % type(message))
 
     def on_monitor_request(
         self,
         monitor_request: MonitorRequest,
+        digest: bytes = None,
     ):
         """Called whenever a monitor proof message is received.
-        This will spawn a greenlet and store its reference in an internal list.
-        Return value of the greenlet is then checked in the main loop."""
+        Validation is done by the validation pool, which limits the number of
+        concurrent validations and queues (or drops) the rest. A queued request
+        is superseded by one with a higher nonce from the same participant.
+        The request's `digest` is marked as seen while it's validated, and is
+        forgotten again if the request isn't stored. That way requests which
+        failed for temporary reasons (e.g. a missing deposit) can be resent."""
         assert isinstance(monitor_request, MonitorRequest)
+        [non_closing_signer] = self.recover_non_closing_signers([monitor_request])
+        non_closing_signer, _ = self.admit_monitor_request(
+            monitor_request,
+            non_closing_signer,
+            digest,
+        )
+        if non_closing_signer is None:
+            return
+        self.validate_monitor_request(monitor_request, non_closing_signer, digest)
+
+    def validate_monitor_request(
+        self,
+        monitor_request: MonitorRequest,
+        non_closing_signer: Address,
+        digest: bytes = None,
+    ):
+        """Submit an admitted monitor request to the validation pool"""
+        task = StoreMonitorRequest(
+            self.blockchain.web3,
+            self.state_db,
+            monitor_request,
+            self.monitor_contract,
+            self.cost_model,
+            self.signature_pool,
+            self.code_cache,
+            self.deposit_cache,
+            nonce_index=self.nonce_index,
+        )
+        if digest is not None:
+            self.track_validation(task, [digest])
         channel_id = monitor_request.balance_proof.channel_identifier
-        if channel_id not in self.open_channels:
+        self.validation_pool.submit(
+            task,
+            key=(channel_id, non_closing_signer),
+            version=monitor_request.balance_proof.nonce,
+        )
+
+    def on_monitor_request_batch(self, batch: MonitorRequestBatch):
+        """Called whenever a batch of monitor requests is received. Each request
+        is admitted like a single one, then all of them are validated and
+        stored by one task."""
+        MONITOR_REQUESTS_RECEIVED.inc(len(batch.monitor_requests), source='batch')
+        unseen = [
+            (monitor_request, message_digest(monitor_request))
+            for monitor_request in batch.monitor_requests
+        ]
+        unseen = [(x, digest) for x, digest in unseen if not self.seen_messages.seen(digest)]
+        signers = self.recover_non_closing_signers([x for x, digest in unseen])
+        admitted = []
+        digests = []
+        for (monitor_request, digest), signer in zip(unseen, signers):
+            if self.seen_messages.seen(digest):
+                continue
+            if self.admit_monitor_request(monitor_request, signer, digest)[0] is None:
+                continue
+            # mark it right away, in case the batch contains copies of it
+            self.seen_messages.add(digest)
+            admitted.append(monitor_request)
+            digests.append(digest)
+        if len(admitted) == 0:
             return
-        self.start_task(
-            StoreMonitorRequest(self.blockchain.web3, self.state_db, monitor_request),
+        task = StoreMonitorRequestBatch(
+            self.blockchain.web3,
+            self.state_db,
+            admitted,
+            self.monitor_contract,
+            self.cost_model,
+            self.signature_pool,
+            self.code_cache,
+            self.deposit_cache,
+            nonce_index=self.nonce_index,
         )
+        self.track_validation(task, digests)
+        self.validation_pool.submit(task)
+
+    def recover_non_closing_signers(
+        self,
+        monitor_requests: List[MonitorRequest],
+    ) -> List[Optional[Address]]:
+        """Recover the non-closing signers on the signature pool, so that the
+        hub isn't blocked. None for invalid signatures."""
+        return self.signature_pool.recover([non_closing_signed_data(x) for x in monitor_requests])
+
+    def admit_monitor_request(
+        self,
+        monitor_request: MonitorRequest,
+        non_closing_signer: Optional[Address],
+        digest: bytes = None,
+    ) -> Tuple[Optional[Address], Optional[SubmissionStatus]]:
+        """Checks done before a monitor request is validated. Requests with an
+        invalid signature (i.e. no `non_closing_signer`) and requests exceeding
+        the rate limit of their signer are dropped. Of the remaining ones,
+        requests for channels that aren't open are held until the channel is
+        opened. Requests that are older than the stored one and requests
+        exceeding the rate limit of their channel are dropped as well, all
+        before any RPC call is made.
+        Returns the non-closing signer of an admitted request, or the reason
+        why it wasn't admitted."""
+        if non_closing_signer is None:
+            log.info('Ignoring monitor request with invalid signature: %s' % monitor_request)
+            if digest is not None:
+                self.seen_messages.add(digest)
+            return None, SubmissionStatus.INVALID_SIGNATURE
+        # check the signer first, so that a flooding signer can neither fill the
+        # buffer of pending requests nor use up the channel's limit for its partner
+        if not self.signer_rate_limiter.allow(non_closing_signer):
+            return None, SubmissionStatus.RATE_LIMITED
+        channel_id = monitor_request.balance_proof.channel_identifier
+        if channel_id not in self.open_channels:
+            # the ChannelOpened event may not be confirmed yet
+            self.pending_requests.add(
+                channel_id,
+                digest or message_digest(monitor_request),
+                (monitor_request, non_closing_signer, digest),
+            )
+            return None, SubmissionStatus.PENDING
+        return self.admit_to_open_channel(monitor_request, non_closing_signer)
+
+    def admit_to_open_channel(
+        self,
+        monitor_request: MonitorRequest,
+        non_closing_signer: Address,
+    ) -> Tuple[Optional[Address], Optional[SubmissionStatus]]:
+        """The checks of `admit_monitor_request` done once the channel is open"""
+        channel_id = monitor_request.balance_proof.channel_identifier
+        if self.nonce_index.is_stale(
+            channel_id,
+            non_closing_signer,
+            monitor_request.balance_proof.nonce,
+        ):
+            return None, SubmissionStatus.STALE
+        if not self.channel_rate_limiter.allow(channel_id):
+            return None, SubmissionStatus.RATE_LIMITED
+        return non_closing_signer, None
+
+    def submit_monitor_requests(
+        self,
+        monitor_requests: List[MonitorRequest],
+        timeout: float = DEFAULT_SUBMISSION_TIMEOUT,
+    ) -> List[SubmissionStatus]:
+        """Validate and store monitor requests submitted over the REST API.
+
+        Requests go through the same checks and the same validation pool as
+        a MonitorRequestBatch received over the transport, but the caller
+        waits (at most `timeout` seconds) for the result of each request."""
+        MONITOR_REQUESTS_RECEIVED.inc(len(monitor_requests), source='rest')
+        results: List[Optional[SubmissionStatus]] = []
+        admitted = []
+        digests = []
+        signers = self.recover_non_closing_signers(monitor_requests)
+        for monitor_request, signer in zip(monitor_requests, signers):
+            digest = message_digest(monitor_request)
+            if self.seen_messages.seen(digest):
+                results.append(SubmissionStatus.DUPLICATE)
+                continue
+            signer, status = self.admit_monitor_request(monitor_request, signer, digest)
+            if signer is None:
+                assert status is not None
+                results.append(status)
+                continue
+            self.seen_messages.add(digest)
+            admitted.append(monitor_request)
+            digests.append(digest)
+            # filled in once validated
+            results.append(None)
+
+        validated: List[SubmissionStatus] = []
+        if len(admitted) > 0:
+            validated = self.validate_submitted(admitted, digests, timeout)
+        validated.reverse()
+        return [
+            result if result is not None else validated.pop()
+            for result in results
+        ]
+
+    def validate_submitted(
+        self,
+        monitor_requests: List[MonitorRequest],
+        digests: List[bytes],
+        timeout: float,
+    ) -> List[SubmissionStatus]:
+        """Validate admitted monitor requests in one task and wait (at most
+        `timeout` seconds) for the status of each one"""
+        task = StoreMonitorRequestBatch(
+            self.blockchain.web3,
+            self.state_db,
+            monitor_requests,
+            self.monitor_contract,
+            self.cost_model,
+            self.signature_pool,
+            self.code_cache,
+            self.deposit_cache,
+            nonce_index=self.nonce_index,
+        )
+        done = gevent.event.Event()
+        self.validation_waiters[task] = done
+        self.track_validation(task, digests)
+        self.validation_pool.submit(task)
+        done.wait(timeout)
+        self.validation_waiters.pop(task, None)
+
+        if task.successful():
+            return [
+                SubmissionStatus.ACCEPTED if valid else SubmissionStatus.REJECTED
+                for valid in task.value
+            ]
+        elif task.ready():
+            return [SubmissionStatus.REJECTED] * len(monitor_requests)
+        elif done.is_set():
+            return [SubmissionStatus.DROPPED] * len(monitor_requests)
+        return [SubmissionStatus.TIMEOUT] * len(monitor_requests)
+
+    def track_validation(self, task: gevent.Greenlet, digests: List[bytes]) -> None:
+        """Mark the monitor requests validated by `task` as seen until the
+        task is done"""
+        for digest in digests:
+            self.seen_messages.add(digest)
+        self.validated_digests[task] = digests
+        task.rawlink(self.on_monitor_request_validated)
+
+    def on_monitor_request_validated(self, task):
+        """Called when validation of monitor requests finished, or when the
+        validation pool discarded it"""
+        digests = self.validated_digests.pop(task, None)
+        if digests is None:
+            return
+        # a batch task returns one result per request
+        results = task.value if task.successful() else None
+        if not isinstance(results, list):
+            results = [results] * len(digests)
+        for digest, valid in zip(digests, results):
+            if valid is True:
+                self.seen_messages.confirm(digest)
+            else:
+                self.seen_messages.forget(digest)
+        waiter = self.validation_waiters.get(task)
+        if waiter is not None:
+            waiter.set()
+
+    def metrics(self) -> List[Metric]:
+        """Gauges describing the current state of the service"""
+        blocks = Gauge('ms_block_number', 'Latest block seen by the listener', ['head'])
+        lag = Gauge('ms_block_lag', 'Blocks between the chain head and the last confirmed block')
+        unconfirmed = self.blockchain.unconfirmed_head_number
+        confirmed = self.blockchain.confirmed_head_number
+        if unconfirmed is not None:
+            blocks.set(unconfirmed, head='unconfirmed')
+        if confirmed is not None:
+            blocks.set(confirmed, head='confirmed')
+        if unconfirmed is not None and confirmed is not None:
+            lag.set(unconfirmed - confirmed)
+        metrics: List[Metric] = [blocks, lag]
+        components = [
+            ('ms_validation_pool', self.validation_pool.stats()),
+            ('ms_scheduler', {
+                'queue_depth': self.scheduler.queue_depth,
+                'scheduled': self.scheduler.scheduled,
+                'completed': self.scheduler.completed,
+                'missed_deadlines': self.scheduler.missed_deadlines,
+            }),
+            ('ms_tasks', {
+                'running': len(self.task_registry),
+                'started': self.task_registry.started,
+                'completed': self.task_registry.completed,
+                'failed': self.task_registry.failed,
+            }),
+            ('ms_receipt_tracker', self.receipt_tracker.stats()),
+            ('ms_cost_model', self.cost_model.stats()),
+            ('ms_seen_messages', self.seen_messages.stats()),
+            ('ms_nonce_index', self.nonce_index.stats()),
+            ('ms_pending_requests', self.pending_requests.stats()),
+            ('ms_deposit_cache', {
+                'hits': self.deposit_cache.hits,
+                'misses': self.deposit_cache.misses,
+                'refreshes': self.deposit_cache.refreshes,
+            }),
+            ('ms_contract_code_cache', {
+                'hits': self.code_cache.hits,
+                'misses': self.code_cache.misses,
+            }),
+        ]
+        for name, stats in components:
+            metrics += stats_gauges(name, stats)
+        for rate_limiter in (self.signer_rate_limiter, self.channel_rate_limiter):
+            metrics += stats_gauges(
+                'ms_rate_limiter_%s' % rate_limiter.name,
+                rate_limiter.stats(),
+            )
+        return metrics
 
     def start_task(self, task):
-        task.start()
-        self.task_list.append(task)
+        self.task_registry.start(task)
 
     @property
     def monitor_requests(self):
@@ -206,7 +690,4 @@ class MonitoringService(gevent.Greenlet):
 
     def wait_tasks(self):
         """Wait until all internal tasks are finished"""
-        while True:
-            if len(self.task_list) == 0:
-                return
-            gevent.sleep(1)
+        self.task_registry.join()
@@ -0,0 +1,120 @@
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Optional, Sequence, Tuple
+
+import gevent
+import gevent.event
+from eth_utils import decode_hex, to_checksum_address
+
+from monitoring_service.constants import DEFAULT_SIGNATURE_BATCH_SIZE
+from raiden_libs.exceptions import InvalidSignature
+from raiden_libs.messages import MonitorRequest
+from raiden_libs.utils import eth_recover
+
+log = logging.getLogger(__name__)
+
+# signed data and signature
+SignedData = Tuple[bytes, bytes]
+
+
+def recover_signers(items: Sequence[SignedData]) -> List[Optional[str]]:
+    """Recover the signer of each item, None if the signature is invalid.
+    This is what runs in the worker processes."""
+    signers: List[Optional[str]] = []
+    for data, signature in items:
+        try:
+            signers.append(to_checksum_address(eth_recover(data=data, signature=signature)))
+        except InvalidSignature:
+            signers.append(None)
+    return signers
+
+
+def non_closing_signed_data(monitor_request: MonitorRequest) -> SignedData:
+    """The part of a monitor request signed by the non-closing participant"""
+    return (monitor_request.non_closing_data, decode_hex(monitor_request.non_closing_signature))
+
+
+def monitor_request_signed_data(monitor_request: MonitorRequest) -> List[SignedData]:
+    """Signed parts of a monitor request: the balance proof, the non-closing
+    signature and the reward proof"""
+    balance_proof = monitor_request.balance_proof
+    return [
+        (balance_proof.serialize_bin(), decode_hex(balance_proof.signature)),
+        non_closing_signed_data(monitor_request),
+        (
+            monitor_request.serialize_reward_proof(),
+            decode_hex(monitor_request.reward_proof_signature),
+        ),
+    ]
+
+
+class SignatureRecoveryPool:
+    """Recovers signers on a pool of worker processes.
+
+    Signature recovery is CPU-bound and would block the hub. Instead, items
+    requested by all greenlets within one iteration of the event loop are
+    collected and sent to the workers in batches of up to `batch_size`.
+    Waiting for the result only blocks the requesting greenlet.
+
+    With zero workers, signers are recovered inline.
+    """
+    def __init__(self, workers: int = 0, batch_size: int = DEFAULT_SIGNATURE_BATCH_SIZE) -> None:
+        assert workers >= 0
+        assert batch_size > 0
+        self.workers = workers
+        self.batch_size = batch_size
+        self.executor: Optional[ProcessPoolExecutor] = None
+        if workers > 0:
+            self.executor = ProcessPoolExecutor(
+                workers,
+                mp_context=multiprocessing.get_context('spawn'),
+            )
+        self.pending: List[Tuple[SignedData, gevent.event.AsyncResult]] = []
+        self.flush_scheduled = False
+
+        # metrics
+        self.recovered = 0
+        self.batches = 0
+
+    def recover(self, items: Sequence[SignedData]) -> List[Optional[str]]:
+        """Recover the signers of `items`, None for invalid signatures"""
+        self.recovered += len(items)
+        if self.executor is None:
+            return recover_signers(items)
+        results = [gevent.event.AsyncResult() for _ in items]
+        self.pending.extend(zip(items, results))
+        if not self.flush_scheduled:
+            self.flush_scheduled = True
+            gevent.spawn(self._flush)
+        return [result.get() for result in results]
+
+    def shutdown(self) -> None:
+        if self.executor is not None:
+            self.executor.shutdown(wait=False)
+
+    def _flush(self) -> None:
+        executor = self.executor
+        assert executor is not None
+        pending, self.pending = self.pending, []
+        self.flush_scheduled = False
+        batches = [
+            pending[i:i + self.batch_size]
+            for i in range(0, len(pending), self.batch_size)
+        ]
+        futures = [
+            executor.submit(recover_signers, [item for item, result in batch])
+            for batch in batches
+        ]
+        self.batches += len(batches)
+        for batch, future in zip(batches, futures):
+            # threading is monkey patched, so this only blocks the current greenlet
+            try:
+                signers = future.result()
+            except Exception as e:
+                log.error('Signature recovery failed: %s' % e)
+                for item, result in batch:
+                    result.set_exception(e)
+                continue
+            for (item, result), signer in zip(batch, signers):
+                result.set(signer)
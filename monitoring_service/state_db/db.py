@@ -1,9 +1,14 @@
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from raiden_libs.messages import MonitorRequest
 from raiden_libs.types import ChannelIdentifier
 
 
 class StateDB:
     def __init__(self):
-        pass
+        # increased whenever stored monitor requests change, so readers can
+        # tell if results they have seen before are still current
+        self.version = 0
 
     @property
     def monitor_requests(self) -> dict:
@@ -28,6 +33,50 @@ class StateDB:
     def store_monitor_request(self, monitor_request) -> None:
         raise NotImplementedError
 
+    def get_monitor_requests(
+        self,
+        after: Tuple[ChannelIdentifier, str] = None,
+        limit: int = None,
+        token_network_address: str = None,
+        non_closing_signer: str = None,
+        min_nonce: int = None,
+        max_nonce: int = None,
+        channel_id: ChannelIdentifier = None,
+    ) -> List[Tuple[Tuple[ChannelIdentifier, str], Any]]:
+        """Return up to `limit` monitor requests matching the filters, as
+        ((channel_id, non_closing_signer), monitor request) pairs ordered by
+        that key. Only requests after the key `after` are returned, so the key
+        of the last request can be used to fetch the next page. Monitor
+        requests are in the same form as the values of `monitor_requests`."""
+        raise NotImplementedError
+
+    def store_monitor_requests(
+        self,
+        monitor_requests: List[Tuple[MonitorRequest, str, Optional[dict]]],
+    ) -> None:
+        """Store many monitor requests in one transaction. Each item is a
+        monitor request, its non-closing signer and its prepared monitor()
+        transaction (if any)."""
+        raise NotImplementedError
+
+    def get_latest_nonces(self) -> Dict[Tuple[ChannelIdentifier, str], int]:
+        """Return the nonce of each stored monitor request, keyed by channel
+        and non-closing signer"""
+        raise NotImplementedError
+
+    def store_prepared_transaction(
+        self,
+        channel_id: ChannelIdentifier,
+        non_closing_signer: str,
+        transaction: dict,
+    ) -> None:
+        """Store the unsigned monitor() transaction prepared for a monitor request"""
+        raise NotImplementedError
+
+    def get_prepared_transactions(self, channel_id: ChannelIdentifier) -> Dict[str, dict]:
+        """Return prepared monitor() transactions of a channel, keyed by non-closing signer"""
+        raise NotImplementedError
+
     def chain_id(self) -> int:
         """Return ethereum chain id this database was created with."""
         raise NotImplementedError
@@ -39,3 +88,29 @@ class StateDB:
     def monitoring_contract_address(self) -> str:
         """Return ethereum address of Monitoring smart contract."""
         raise NotImplementedError
+
+    def store_transaction(
+        self,
+        tx_hash: str,
+        kind: str,
+        channel_id: ChannelIdentifier,
+        nonce: int,
+        raw_transaction: str,
+        status: str,
+        deadline: int = None,
+    ) -> None:
+        """Record a signed transaction in the outbox. `deadline` is the block
+        by which it must be mined, if any."""
+        raise NotImplementedError
+
+    def update_transaction_status(self, tx_hash: str, status: str) -> None:
+        """Update status of a transaction recorded in the outbox"""
+        raise NotImplementedError
+
+    def get_transactions(
+        self,
+        channel_id: ChannelIdentifier = None,
+        statuses: Iterable[str] = None,
+    ) -> List[dict]:
+        """Return outbox records, optionally filtered by channel and status"""
+        raise NotImplementedError
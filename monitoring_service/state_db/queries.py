@@ -40,12 +40,65 @@ INSERT INTO `syncstate` VALUES (
 );
 """
 
+# Tables and indexes added after the first release. This is run whenever the
+# database is opened, so all statements must be idempotent.
+MIGRATION_SQL = """
+CREATE INDEX IF NOT EXISTS `monitor_requests_token_network`
+    ON `monitor_requests` (`token_network_address`);
+CREATE INDEX IF NOT EXISTS `monitor_requests_signer`
+    ON `monitor_requests` (`non_closing_signer`);
+-- unsigned monitor() transactions, prepared when a monitor request is stored
+CREATE TABLE IF NOT EXISTS `prepared_transactions` (
+    `channel_identifier` CHAR(34)    NOT NULL,
+    `non_closing_signer` CHAR(42)    NOT NULL,
+    `to`                 CHAR(42)    NOT NULL,
+    `data`               TEXT        NOT NULL,
+    PRIMARY KEY (channel_identifier, non_closing_signer)
+);
+-- outbox of transactions sent by the MS
+-- kind is the contract function called (monitor, claimReward)
+-- status is one of signed, pending, mined, failed, replaced
+-- deadline is the block by which the transaction must be mined, if any
+CREATE TABLE IF NOT EXISTS `transactions` (
+    `tx_hash`            CHAR(66)    NOT NULL PRIMARY KEY,
+    `kind`               VARCHAR(32) NOT NULL,
+    `channel_identifier` CHAR(34)    NOT NULL,
+    `nonce`              INTEGER     NOT NULL,
+    `raw_transaction`    TEXT        NOT NULL,
+    `status`             VARCHAR(16) NOT NULL,
+    `deadline`           INTEGER
+);
+CREATE INDEX IF NOT EXISTS `transactions_status` ON `transactions` (`status`);
+CREATE INDEX IF NOT EXISTS `transactions_channel` ON `transactions` (`channel_identifier`);
+"""
+
 
 ADD_MONITOR_REQUEST_SQL = """
 INSERT OR REPLACE INTO `monitor_requests` VALUES (
     ?, ?, ?, ?, ?, ?, ?, ?, ?, ?
 );"""
 
+ADD_PREPARED_TRANSACTION_SQL = """
+INSERT OR REPLACE INTO `prepared_transactions` VALUES (
+    ?, ?, ?, ?
+);"""
+
+# outboxes created before deadlines were recorded
+ADD_TRANSACTION_DEADLINE_SQL = """
+ALTER TABLE `transactions` ADD COLUMN `deadline` INTEGER;
+"""
+
+ADD_TRANSACTION_SQL = """
+INSERT OR REPLACE INTO `transactions` (
+    `tx_hash`, `kind`, `channel_identifier`, `nonce`, `raw_transaction`, `status`, `deadline`
+) VALUES (
+    ?, ?, ?, ?, ?, ?, ?
+);"""
+
+UPDATE_TRANSACTION_STATUS_SQL = """
+UPDATE `transactions` SET `status` = ? WHERE `tx_hash` = ?;
+"""
+
 UPDATE_METADATA_SQL = """
 UPDATE `metadata` SET
     `chain_id` = ?,
@@ -1,13 +1,25 @@
 import os
 import sqlite3
+from typing import Any, Dict, Iterable, List, Optional, Tuple
 
 from eth_utils import is_checksum_address
 
+from monitoring_service.metrics import timed_db_operation
+from raiden_libs.messages import MonitorRequest
 from raiden_libs.types import ChannelIdentifier
 from raiden_libs.utils import is_channel_identifier
 
 from .db import StateDB
-from .queries import ADD_MONITOR_REQUEST_SQL, DB_CREATION_SQL, UPDATE_METADATA_SQL
+from .queries import (
+    ADD_MONITOR_REQUEST_SQL,
+    ADD_PREPARED_TRANSACTION_SQL,
+    ADD_TRANSACTION_DEADLINE_SQL,
+    ADD_TRANSACTION_SQL,
+    DB_CREATION_SQL,
+    MIGRATION_SQL,
+    UPDATE_METADATA_SQL,
+    UPDATE_TRANSACTION_STATUS_SQL,
+)
 
 
 def dict_factory(cursor, row):
@@ -20,11 +32,14 @@ def dict_factory(cursor, row):
 
 class StateDBSqlite(StateDB):
     def __init__(self, filename):
+        super().__init__()
         self.filename = filename
         self.conn = sqlite3.connect(self.filename, isolation_level="EXCLUSIVE")
         self.conn.row_factory = dict_factory
         if filename not in (None, ':memory:'):
             os.chmod(filename, 0o600)
+        if self.is_initialized():
+            self.migrate()
 
     def setup_db(self, network_id: int, contract_address: str, receiver: str):
         """Initialize an empty database. Call this if `is_initialized()` returns False"""
@@ -34,28 +49,130 @@ class StateDBSqlite(StateDB):
         self.conn.executescript(DB_CREATION_SQL)
         self.conn.execute(UPDATE_METADATA_SQL, [network_id, contract_address, receiver])
         self.conn.commit()
+        self.migrate()
+
+    def migrate(self):
+        """Add tables and indexes missing in databases created by older versions"""
+        self.conn.executescript(MIGRATION_SQL)
+        columns = self.conn.execute('PRAGMA table_info(`transactions`)').fetchall()
+        if 'deadline' not in [x['name'] for x in columns]:
+            self.conn.execute(ADD_TRANSACTION_DEADLINE_SQL)
+        self.conn.commit()
 
     @property
+    @timed_db_operation
     def monitor_requests(self) -> dict:
         c = self.conn.cursor()
         c.execute('SELECT * FROM `monitor_requests`')
-        ret = []
-        for x in c.fetchall():
-            for hex_key in ['reward_amount', 'nonce', 'channel_identifier']:
-                x[hex_key] = int(x[hex_key], 16)
-            ret.append(x)
+        ret = [self.decode_monitor_request(x) for x in c.fetchall()]
 
         return {
             (x['channel_identifier'], x['non_closing_signer']): x
             for x in ret
         }
 
+    @staticmethod
+    def decode_monitor_request(row: dict) -> dict:
+        for hex_key in ['reward_amount', 'nonce', 'channel_identifier']:
+            row[hex_key] = int(row[hex_key], 16)
+        return row
+
+    @timed_db_operation
+    def get_monitor_requests(
+        self,
+        after: Tuple[ChannelIdentifier, str] = None,
+        limit: int = None,
+        token_network_address: str = None,
+        non_closing_signer: str = None,
+        min_nonce: int = None,
+        max_nonce: int = None,
+        channel_id: ChannelIdentifier = None,
+    ) -> List[Tuple[Tuple[ChannelIdentifier, str], Any]]:
+        # Rows are ordered by the primary key. Channel ids are stored as hex
+        # strings, so this isn't the numeric order, but it's stable.
+        sql = 'SELECT * FROM `monitor_requests` WHERE 1'
+        params: list = []
+        if after is not None:
+            sql += (
+                ' AND (`channel_identifier` > ? OR '
+                '(`channel_identifier` = ? AND `non_closing_signer` > ?))'
+            )
+            params += [hex(after[0]), hex(after[0]), after[1]]
+        if channel_id is not None:
+            # a prefix of the primary key, so this doesn't scan the table
+            sql += ' AND `channel_identifier` = ?'
+            params.append(hex(channel_id))
+        if token_network_address is not None:
+            sql += ' AND `token_network_address` = ?'
+            params.append(token_network_address)
+        if non_closing_signer is not None:
+            sql += ' AND `non_closing_signer` = ?'
+            params.append(non_closing_signer)
+        # hex strings without leading zeros compare like numbers if the
+        # length is compared first
+        if min_nonce is not None:
+            sql += ' AND (length(`nonce`) > ? OR (length(`nonce`) = ? AND `nonce` >= ?))'
+            params += [len(hex(min_nonce)), len(hex(min_nonce)), hex(min_nonce)]
+        if max_nonce is not None:
+            sql += ' AND (length(`nonce`) < ? OR (length(`nonce`) = ? AND `nonce` <= ?))'
+            params += [len(hex(max_nonce)), len(hex(max_nonce)), hex(max_nonce)]
+        sql += ' ORDER BY `channel_identifier`, `non_closing_signer`'
+        if limit is not None:
+            sql += ' LIMIT ?'
+            params.append(limit)
+        c = self.conn.cursor()
+        c.execute(sql, params)
+        return [
+            ((x['channel_identifier'], x['non_closing_signer']), x)
+            for x in map(self.decode_monitor_request, c.fetchall())
+        ]
+
+    @timed_db_operation
     def store_monitor_request(self, monitor_request) -> None:
+        params = self.monitor_request_params(monitor_request, monitor_request.non_closing_signer)
+        self.conn.execute(ADD_MONITOR_REQUEST_SQL, params)
+        self.version += 1
+
+    @timed_db_operation
+    def store_monitor_requests(
+        self,
+        monitor_requests: List[Tuple[MonitorRequest, str, Optional[dict]]],
+    ) -> None:
+        with self.conn:
+            self.conn.executemany(ADD_MONITOR_REQUEST_SQL, [
+                self.monitor_request_params(monitor_request, non_closing_signer)
+                for monitor_request, non_closing_signer, _ in monitor_requests
+            ])
+            self.conn.executemany(ADD_PREPARED_TRANSACTION_SQL, [
+                [
+                    hex(monitor_request.balance_proof.channel_identifier),
+                    non_closing_signer,
+                    transaction['to'],
+                    transaction['data'],
+                ]
+                for monitor_request, non_closing_signer, transaction in monitor_requests
+                if transaction is not None
+            ])
+        self.version += 1
+
+    @timed_db_operation
+    def get_latest_nonces(self) -> Dict[Tuple[ChannelIdentifier, str], int]:
+        c = self.conn.cursor()
+        c.execute(
+            'SELECT `channel_identifier`, `non_closing_signer`, `nonce` FROM `monitor_requests`',
+        )
+        return {
+            (int(x['channel_identifier'], 16), x['non_closing_signer']): int(x['nonce'], 16)
+            for x in c.fetchall()
+        }
+
+    @staticmethod
+    def monitor_request_params(monitor_request, non_closing_signer: str) -> list:
         StateDBSqlite.check_monitor_request(monitor_request)
         balance_proof = monitor_request.balance_proof
-        params = [
+        return [
             hex(balance_proof.channel_identifier),
-            monitor_request.non_closing_signer,
+            non_closing_signer,
             balance_proof.balance_hash,
             hex(balance_proof.nonce),
             balance_proof.additional_hash,
@@ -65,8 +182,30 @@ class StateDBSqlite(StateDB):
             hex(monitor_request.reward_amount),
             balance_proof.token_network_address,
         ]
-        self.conn.execute(ADD_MONITOR_REQUEST_SQL, params)
 
+    @timed_db_operation
+    def store_prepared_transaction(
+        self,
+        channel_id: ChannelIdentifier,
+        non_closing_signer: str,
+        transaction: dict,
+    ) -> None:
+        assert is_channel_identifier(channel_id)
+        params = [hex(channel_id), non_closing_signer, transaction['to'], transaction['data']]
+        self.conn.execute(ADD_PREPARED_TRANSACTION_SQL, params)
+
+    @timed_db_operation
+    def get_prepared_transactions(self, channel_id: ChannelIdentifier) -> Dict[str, dict]:
+        assert is_channel_identifier(channel_id)
+        c = self.conn.cursor()
+        sql = 'SELECT * FROM `prepared_transactions` WHERE `channel_identifier` = ?'
+        c.execute(sql, [hex(channel_id)])
+        return {
+            x['non_closing_signer']: {'to': x['to'], 'data': x['data']}
+            for x in c.fetchall()
+        }
+
+    @timed_db_operation
     def get_monitor_request(self, channel_id: ChannelIdentifier) -> dict:
         assert is_channel_identifier(channel_id)
         # TODO unconfirmed topups
@@ -77,12 +216,14 @@ class StateDBSqlite(StateDB):
         assert c.fetchone() is None
         return result
 
+    @timed_db_operation
     def delete_monitor_request(self, channel_id: ChannelIdentifier) -> None:
         assert is_channel_identifier(channel_id)
         c = self.conn.cursor()
-        sql = 'DELETE FROM `monitor_requests` WHERE `channel_id` = ?'
-        c.execute(sql, [channel_id])
-        assert c.fetchone() is None
+        for table in ('monitor_requests', 'prepared_transactions'):
+            sql = 'DELETE FROM `%s` WHERE `channel_identifier` = ?' % table
+            c.execute(sql, [hex(channel_id)])
+        self.version += 1
 
     def is_initialized(self) -> bool:
         c = self.conn.cursor()
@@ -96,6 +237,50 @@ class StateDBSqlite(StateDB):
         assert is_checksum_address(balance_proof.token_network_address)
         assert is_checksum_address(monitor_request.monitor_address)
 
+    @timed_db_operation
+    def store_transaction(
+        self,
+        tx_hash: str,
+        kind: str,
+        channel_id: ChannelIdentifier,
+        nonce: int,
+        raw_transaction: str,
+        status: str,
+        deadline: int = None,
+    ) -> None:
+        assert is_channel_identifier(channel_id)
+        params = [tx_hash, kind, hex(channel_id), nonce, raw_transaction, status, deadline]
+        self.conn.execute(ADD_TRANSACTION_SQL, params)
+        # the outbox must survive a crash right after the transaction is sent
+        self.conn.commit()
+
+    @timed_db_operation
+    def update_transaction_status(self, tx_hash: str, status: str) -> None:
+        self.conn.execute(UPDATE_TRANSACTION_STATUS_SQL, [status, tx_hash])
+        self.conn.commit()
+
+    @timed_db_operation
+    def get_transactions(
+        self,
+        channel_id: ChannelIdentifier = None,
+        statuses: Iterable[str] = None,
+    ) -> List[dict]:
+        sql = 'SELECT * FROM `transactions` WHERE 1'
+        params: list = []
+        if channel_id is not None:
+            sql += ' AND `channel_identifier` = ?'
+            params.append(hex(channel_id))
+        if statuses is not None:
+            statuses = list(statuses)
+            sql += ' AND `status` IN (%s)' % ', '.join('?' * len(statuses))
+            params += statuses
+        c = self.conn.cursor()
+        c.execute(sql + ' ORDER BY `nonce`', params)
+        result = c.fetchall()
+        for x in result:
+            x['channel_identifier'] = int(x['channel_identifier'], 16)
+        return result
+
     def chain_id(self):
         c = self.conn.cursor()
         c.execute("SELECT chain_id FROM `metadata`")
@@ -0,0 +1,92 @@
+import logging
+import time
+from collections import deque
+from typing import Any, Deque, Dict, Hashable, NamedTuple
+
+import gevent
+import gevent.event
+
+log = logging.getLogger(__name__)
+
+
+class TaskResult(NamedTuple):
+    name: str
+    latency: float
+    successful: bool
+    # return value of the task, or the exception it raised
+    value: Any
+
+
+class TaskRegistry:
+    """Keeps track of running tasks.
+
+    Finished tasks are removed by a completion callback, so no polling is
+    needed and bookkeeping is O(1) per task. Latency and outcome of the most
+    recent tasks are kept in `results`.
+
+    Tasks can also be registered under a key, so that a duplicate trigger
+    (e.g. a redelivered blockchain event) joins the unfinished task instead
+    of starting a second one.
+    """
+    def __init__(self, history_size: int = 1000) -> None:
+        # task => time when it was started
+        self.running: Dict[gevent.Greenlet, float] = {}
+        # key => unfinished (running or not yet started) task
+        self.keyed: Dict[Hashable, gevent.Greenlet] = {}
+        self.results: Deque[TaskResult] = deque(maxlen=history_size)
+        self.idle = gevent.event.Event()
+        self.idle.set()
+
+        # metrics
+        self.started = 0
+        self.completed = 0
+        self.failed = 0
+        self.coalesced = 0
+
+    def __len__(self) -> int:
+        return len(self.running)
+
+    def track(self, task: gevent.Greenlet) -> None:
+        """Track a task that has been (or is about to be) started"""
+        self.started += 1
+        self.running[task] = time.monotonic()
+        self.idle.clear()
+        task.rawlink(self._on_task_done)
+
+    def start(self, task: gevent.Greenlet) -> None:
+        """Start a task and track it"""
+        self.track(task)
+        task.start()
+
+    def coalesce(self, key: Hashable, task: gevent.Greenlet) -> gevent.Greenlet:
+        """Return the unfinished task registered under `key`. If there is none,
+        `task` is registered under `key` and returned."""
+        existing = self.keyed.get(key)
+        if existing is not None and not existing.ready():
+            self.coalesced += 1
+            return existing
+        self.keyed[key] = task
+
+        def unregister(task: gevent.Greenlet) -> None:
+            if self.keyed.get(key) is task:
+                del self.keyed[key]
+        task.rawlink(unregister)
+        return task
+
+    def join(self, timeout: float = None) -> bool:
+        """Wait until there are no running tasks. Returns False on timeout."""
+        return self.idle.wait(timeout)
+
+    def _on_task_done(self, task: gevent.Greenlet) -> None:
+        latency = time.monotonic() - self.running.pop(task)
+        if task.successful():
+            self.completed += 1
+            value = task.value
+            log.info('%s completed in %.3fs (%s)' % (task, latency, value))
+        else:
+            self.failed += 1
+            value = task.exception
+            log.error('%s failed after %.3fs (%s)' % (task, latency, value))
+        self.results.append(TaskResult(type(task).__name__, latency, task.successful(), value))
+        if len(self.running) == 0:
+            self.idle.set()
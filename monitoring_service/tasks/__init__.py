@@ -1,9 +1,13 @@
 from .store_monitor_request import StoreMonitorRequest  # noqa
+from .store_monitor_request_batch import StoreMonitorRequestBatch  # noqa
 from .on_channel_close import OnChannelClose            # noqa
 from .on_channel_settle import OnChannelSettle          # noqa
+from .reconcile_transactions import ReconcileTransactions  # noqa
 
 __all__ = [
     'StoreMonitorRequest',
+    'StoreMonitorRequestBatch',
     'OnChannelClose',
     'OnChannelSettle',
+    'ReconcileTransactions',
 ]
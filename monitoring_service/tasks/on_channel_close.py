@@ -1,42 +1,117 @@
 import logging
+import time
 
 import gevent
 
+from monitoring_service.metrics import MONITOR_TRANSACTION_LATENCY
+
 log = logging.getLogger(__name__)
 
+MONITOR_GAS_LIMIT = 350000
+
+
+def monitor_call_args(monitor_request, closing_signer=None, non_closing_signer=None) -> list:
+    """Arguments of the MSC monitor() call for a monitor request. Signers that
+    are already known can be passed, so they don't have to be recovered again."""
+    balance_proof = monitor_request.balance_proof
+    return [
+        closing_signer or balance_proof.signer,
+        non_closing_signer or monitor_request.non_closing_signer,
+        balance_proof.balance_hash,
+        balance_proof.nonce,
+        balance_proof.additional_hash,
+        balance_proof.signature,
+        monitor_request.non_closing_signature,
+        monitor_request.reward_amount,
+        balance_proof.token_network_address,
+        monitor_request.reward_proof_signature,
+    ]
+
+
+def prepare_monitor_transaction(
+    contract,
+    monitor_request,
+    closing_signer=None,
+    non_closing_signer=None,
+) -> dict:
+    """Build the parts of a monitor() transaction that don't change until the
+    channel is closed, i.e. everything except nonce and gas"""
+    args = monitor_call_args(monitor_request, closing_signer, non_closing_signer)
+    return {
+        'to': contract.address,
+        'data': contract.encodeABI('monitor', args=args),
+    }
+
 
 class OnChannelClose(gevent.Greenlet):
     """Executed whenever a channel is closed and there's a monitor request
     record for this channel stored in the db.
+
+    If the monitor() transaction has been prepared when the monitor request
+    was stored, only nonce and gas have to be filled in before sending it.
+    The transaction is handed to the `receipt_tracker` (if any), but the task
+    doesn't wait for it to be mined. Its gas price is raised if it's not
+    mined soon enough before `settle_block`.
     """
-    def __init__(self, monitor_contract, monitor_request, privkey):
+    def __init__(
+        self,
+        monitor_contract,
+        monitor_request,
+        tx_manager,
+        prepared_transaction=None,
+        receipt_tracker=None,
+        settle_block=None,
+    ):
         super().__init__()
         self.monitor_contract = monitor_contract
         self.monitor_request = monitor_request
-        self.private_key = privkey
+        self.tx_manager = tx_manager
+        self.prepared_transaction = prepared_transaction
+        self.receipt_tracker = receipt_tracker
+        self.settle_block = settle_block
+        self.created_at = time.monotonic()
+        # time spent from the start of the task until the transaction was sent
+        self.latency = None
 
     def _run(self):
-        return self.submit_monitor_request(
+        started_at = time.monotonic()
+        tx_hash = self.submit_monitor_request(
             self.monitor_contract,
             self.monitor_request,
-            self.private_key,
+            self.tx_manager,
+            self.prepared_transaction,
+            self.settle_block,
+        )
+        self.latency = time.monotonic() - started_at
+        # includes the time spent waiting in the scheduler
+        MONITOR_TRANSACTION_LATENCY.observe(time.monotonic() - self.created_at)
+        if self.receipt_tracker is not None:
+            self.receipt_tracker.track(tx_hash, deadline=self.settle_block)
+        log.info(
+            'monitor() for channel %s sent in %.3fs (prepared=%s)' % (
+                self.monitor_request.balance_proof.channel_identifier,
+                self.latency,
+                self.prepared_transaction is not None,
+            ),
         )
+        return 0
 
     @staticmethod
-    def submit_monitor_request(contract, monitor_request, private_key):
-        balance_proof = monitor_request.balance_proof
-
-        tx_hash = contract.functions.monitor(
-            balance_proof.signer,
-            monitor_request.non_closing_signer,
-            balance_proof.balance_hash,
-            balance_proof.nonce,
-            balance_proof.additional_hash,
-            balance_proof.signature,
-            monitor_request.non_closing_signature,
-            monitor_request.reward_amount,
-            balance_proof.token_network_address,
-            monitor_request.reward_proof_signature,
-        ).transact({'gas_limit': 350000}, private_key=private_key)
+    def submit_monitor_request(
+        contract,
+        monitor_request,
+        tx_manager,
+        prepared_transaction=None,
+        settle_block=None,
+    ):
+        if prepared_transaction is None:
+            prepared_transaction = prepare_monitor_transaction(contract, monitor_request)
+        tx_hash = tx_manager.send_transaction(
+            dict(prepared_transaction, value=0),
+            kind='monitor',
+            channel_id=monitor_request.balance_proof.channel_identifier,
+            gas_limit=MONITOR_GAS_LIMIT,
+            deadline=settle_block,
+        )
         assert tx_hash is not None
-        return 0
+        return tx_hash
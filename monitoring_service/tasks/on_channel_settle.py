@@ -2,36 +2,59 @@ import logging
 
 import gevent
 
+from monitoring_service.constants import DEFAULT_RECEIPT_TIMEOUT
+from monitoring_service.exceptions import ReceiptTrackerStopped
+from monitoring_service.transactions import TransactionStatus, receipt_status
+
 log = logging.getLogger(__name__)
 
+# used if the gas for claimReward() can't be estimated
+CLAIM_REWARD_GAS_LIMIT = 210000
+
 
 class OnChannelSettle(gevent.Greenlet):
-    """Executed whenever a channel is settled"""
-    def __init__(self, monitor_request, monitor_contract, privkey):
+    """Executed whenever a channel is settled.
+
+    If a `receipt_tracker` is given, the task waits until the claimReward()
+    transaction is mined and returns whether it was successful. If it isn't
+    mined in time (or the tracker is stopped), None is returned; the outbox
+    is still updated by the tracker once it's mined.
+    """
+    def __init__(self, monitor_request, monitor_contract, tx_manager, receipt_tracker=None):
         super().__init__()
         self.monitor_contract = monitor_contract
         self.monitor_request = monitor_request
-        self.private_key = privkey
+        self.tx_manager = tx_manager
+        self.receipt_tracker = receipt_tracker
 
     def _run(self):
         return self.claim_reward(
             self.monitor_contract,
             self.monitor_request,
-            self.private_key,
+            self.tx_manager,
+            self.receipt_tracker,
         )
 
     @staticmethod
-    def claim_reward(contract, monitor_request, private_key):
-        web3 = contract.web3
-
-        tx_hash = contract.functions.claimReward(
+    def claim_reward(contract, monitor_request, tx_manager, receipt_tracker=None):
+        data = contract.encodeABI('claimReward', args=[
             monitor_request.balance_proof.channel_identifier,
             monitor_request.balance_proof.token_network_address,
             monitor_request.balance_proof.signer,
             monitor_request.non_closing_signer,
-        ).transact({'gas': 210000}, private_key=private_key)
-        receipt = web3.eth.getTransactionReceipt(tx_hash)
-        tx = web3.eth.getTransactionReceipt(tx_hash)
-        log.info(receipt)
-        log.info(tx)
-        return True
+        ])
+        tx_hash = tx_manager.send_transaction(
+            {'to': contract.address, 'data': data, 'value': 0},
+            kind='claimReward',
+            channel_id=monitor_request.balance_proof.channel_identifier,
+            gas_limit=CLAIM_REWARD_GAS_LIMIT,
+        )
+        if receipt_tracker is None:
+            return True
+        try:
+            receipt = receipt_tracker.wait(tx_hash, timeout=DEFAULT_RECEIPT_TIMEOUT)
+        except (gevent.Timeout, ReceiptTrackerStopped) as e:
+            log.warning('Stopped waiting for claimReward() %s: %r' % (tx_hash.hex(), e))
+            return None
+        log.info('claimReward() mined: %s' % receipt)
+        return receipt_status(receipt) == TransactionStatus.MINED
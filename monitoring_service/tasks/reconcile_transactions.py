@@ -0,0 +1,75 @@
+import logging
+from collections import Counter
+
+import gevent
+
+from monitoring_service.transactions import (
+    TransactionStatus,
+    is_known_transaction_error,
+    is_nonce_error,
+    is_underpriced_error,
+    receipt_status,
+)
+from monitoring_service.utils import get_transaction_receipts
+
+log = logging.getLogger(__name__)
+
+
+class ReconcileTransactions(gevent.Greenlet):
+    """Executed on startup. Finds out what happened to the transactions that
+    were in the outbox when the service was stopped:
+        - receipts of all unfinished transactions are fetched in one batch
+        - mined transactions are marked as mined (or failed)
+        - transactions unknown to the node are broadcast again
+        - transactions whose nonce has been used by another transaction
+          are marked as replaced
+        - transactions that are still pending are handed to the
+          `tx_manager` and `receipt_tracker` (if given), so that their status
+          is updated once mined and their gas price can be raised
+    Return:
+        number of transactions per resulting status
+    """
+    def __init__(self, web3, state_db, tx_manager=None, receipt_tracker=None):
+        super().__init__()
+        self.web3 = web3
+        self.state_db = state_db
+        self.tx_manager = tx_manager
+        self.receipt_tracker = receipt_tracker
+
+    def _run(self):
+        outbox = self.state_db.get_transactions(statuses=[
+            TransactionStatus.SIGNED.value,
+            TransactionStatus.PENDING.value,
+        ])
+        receipts = get_transaction_receipts(self.web3, [tx['tx_hash'] for tx in outbox])
+        result: Counter = Counter()
+        for tx, receipt in zip(outbox, receipts):
+            if receipt is not None:
+                status = receipt_status(receipt).value
+            else:
+                status = self.rebroadcast(tx)
+            if status != tx['status']:
+                self.state_db.update_transaction_status(tx['tx_hash'], status)
+            if status == TransactionStatus.PENDING.value:
+                self.resume(tx)
+            result[status] += 1
+        log.info('Reconciled %d outbox transactions: %s' % (len(outbox), dict(result)))
+        return dict(result)
+
+    def resume(self, tx) -> None:
+        if self.tx_manager is not None:
+            self.tx_manager.resume_transaction(tx)
+        if self.receipt_tracker is not None:
+            self.receipt_tracker.track(tx['tx_hash'], deadline=tx['deadline'])
+
+    def rebroadcast(self, tx) -> str:
+        try:
+            self.web3.eth.sendRawTransaction(tx['raw_transaction'])
+        except Exception as e:
+            if is_known_transaction_error(e):
+                return TransactionStatus.PENDING.value
+            if is_nonce_error(e) or is_underpriced_error(e):
+                return TransactionStatus.REPLACED.value
+            raise
+        log.info('Rebroadcast transaction %s (nonce=%d)' % (tx['tx_hash'], tx['nonce']))
+        return TransactionStatus.PENDING.value
@@ -1,10 +1,12 @@
 import logging
+import time
 
 import gevent
-from eth_utils import is_address
 from hexbytes import HexBytes
 
-from raiden_libs.exceptions import InvalidSignature
+from monitoring_service.metrics import VALIDATION_SECONDS
+from monitoring_service.signatures import monitor_request_signed_data, recover_signers
+from monitoring_service.tasks.on_channel_close import prepare_monitor_transaction
 from raiden_libs.messages import MonitorRequest
 
 log = logging.getLogger(__name__)
@@ -12,50 +14,137 @@ log = logging.getLogger(__name__)
 
 class StoreMonitorRequest(gevent.Greenlet):
     """Validate & store submitted monitor request. This consists of:
+            - check if the reward covers the transaction costs
             - check of bp & reward proof signature
             - check if contracts contain code
             - check if there's enough tokens for the payout
+        Checks stop at the first failure. Signers are recovered by the
+        `signature_pool` and contract code is checked by the `code_cache`, if
+        they are given. The reward deposit is only checked if a
+        `deposit_cache` is given. With a `nonce_index`, requests whose nonce
+        isn't higher than the stored one's are rejected. Signers that were
+        already recovered (e.g. for a whole batch of requests) can be passed
+        as `signers`.
+        If `monitor_contract` is given, the monitor() transaction for a valid
+        request is prepared and stored next to it, so that it can be sent
+        quickly once the channel is closed.
         Return:
             True if monitor request is valid
     """
-    def __init__(self, web3, state_db, monitor_request):
+    def __init__(
+        self,
+        web3,
+        state_db,
+        monitor_request,
+        monitor_contract=None,
+        cost_model=None,
+        signature_pool=None,
+        code_cache=None,
+        deposit_cache=None,
+        signers=None,
+        nonce_index=None,
+    ):
         super().__init__()
         assert isinstance(monitor_request, MonitorRequest)
         self.msg = monitor_request
         self.state_db = state_db
         self.web3 = web3
+        self.monitor_contract = monitor_contract
+        self.cost_model = cost_model
+        self.signature_pool = signature_pool
+        self.code_cache = code_cache
+        self.deposit_cache = deposit_cache
+        self.nonce_index = nonce_index
+        # closing, non-closing and reward proof signer, once recovered
+        self.signers = signers
 
     def _run(self):
+        started_at = time.monotonic()
+        # a newer request may have been stored while this one was validated
+        valid = self.validate() and self.check_nonce(self.msg)
+        VALIDATION_SECONDS.observe(time.monotonic() - started_at, kind='single')
+        if valid:
+            # the request and its monitor() transaction are stored atomically
+            self.state_db.store_monitor_requests([
+                (self.msg, self.signers[1], self.prepare_transaction()),
+            ])
+            self.update_nonce_index()
+        return valid
+
+    def validate(self) -> bool:
         checks = [
+            self.check_reward,
             self.check_signatures,
             self.verify_contract_code,
             self.check_balance,
         ]
-        results = [
+        return all(
             check(self.msg)
             for check in checks
-        ]
-        if not (False in results):
-            self.state_db.store_monitor_request(self.msg)
-        return not (False in results)
+        )
+
+    def prepare_transaction(self):
+        """Prepare the monitor() transaction of a valid request"""
+        if self.monitor_contract is None:
+            return None
+        closing_signer, non_closing_signer, _ = self.signers
+        return prepare_monitor_transaction(
+            self.monitor_contract,
+            self.msg,
+            closing_signer,
+            non_closing_signer,
+        )
+
+    def check_nonce(self, monitor_request):
+        """Check if the request is newer than the stored one of the same
+        non-closing participant. Needs the recovered signers."""
+        if self.nonce_index is None:
+            return True
+        balance_proof = monitor_request.balance_proof
+        return not self.nonce_index.is_stale(
+            balance_proof.channel_identifier,
+            self.signers[1],
+            balance_proof.nonce,
+        )
+
+    def update_nonce_index(self):
+        if self.nonce_index is None:
+            return
+        balance_proof = self.msg.balance_proof
+        self.nonce_index.update(
+            balance_proof.channel_identifier,
+            self.signers[1],
+            balance_proof.nonce,
+        )
+
+    def check_reward(self, monitor_request):
+        """Check if the reward is worth the transaction costs"""
+        if self.cost_model is None:
+            return True
+        return self.cost_model.is_profitable(monitor_request.reward_amount, 'admission')
 
     def verify_contract_code(self, monitor_request):
-        """Verify if address set in token_network_address field contains code"""
+        """Verify if address set in token_network_address field contains code.
+        With a `code_cache`, the code must be the TokenNetwork contract's."""
         balance_proof = monitor_request.balance_proof
+        if self.code_cache is not None:
+            return self.code_cache.is_token_network(balance_proof.token_network_address)
         return self.web3.eth.getCode(balance_proof.token_network_address) != HexBytes('0x')
 
     def check_signatures(self, monitor_request):
         """Check if signatures set in the message are correct"""
-        balance_proof = monitor_request.balance_proof
-        try:
-            return (
-                is_address(monitor_request.reward_proof_signer) and
-                is_address(balance_proof.signer) and
-                is_address(monitor_request.non_closing_signer)
-            )
-        except InvalidSignature:
-            return False
+        if self.signers is None:
+            signed_data = monitor_request_signed_data(monitor_request)
+            if self.signature_pool is not None:
+                self.signers = self.signature_pool.recover(signed_data)
+            else:
+                self.signers = recover_signers(signed_data)
+        return None not in self.signers
 
     def check_balance(self, monitor_request):
         """Check if there is enough tokens to pay out reward amount"""
-        return True
+        if self.deposit_cache is None:
+            return True
+        # the reward is paid from the deposit of the non-closing participant
+        _, reward_sender, _ = self.signers
+        return self.deposit_cache.deposit(reward_sender) >= monitor_request.reward_amount
@@ -0,0 +1,96 @@
+import logging
+import time
+from typing import Dict, List, Tuple
+
+import gevent
+
+from monitoring_service.metrics import VALIDATION_SECONDS
+from monitoring_service.signatures import monitor_request_signed_data, recover_signers
+from monitoring_service.tasks.store_monitor_request import StoreMonitorRequest
+from raiden_libs.messages import MonitorRequest
+
+log = logging.getLogger(__name__)
+
+
+class StoreMonitorRequestBatch(gevent.Greenlet):
+    """Validate & store a batch of monitor requests.
+
+    Each request is checked like in `StoreMonitorRequest`, but the
+    signatures of all requests are recovered at once and all valid requests
+    are stored in a single DB transaction. If the batch contains several
+    requests of the same participant for a channel, only the newest is
+    stored.
+    Return:
+        list telling for each monitor request if it was valid
+    """
+    def __init__(
+        self,
+        web3,
+        state_db,
+        monitor_requests: List[MonitorRequest],
+        monitor_contract=None,
+        cost_model=None,
+        signature_pool=None,
+        code_cache=None,
+        deposit_cache=None,
+        nonce_index=None,
+    ):
+        super().__init__()
+        self.monitor_requests = monitor_requests
+        self.state_db = state_db
+        self.web3 = web3
+        self.monitor_contract = monitor_contract
+        self.cost_model = cost_model
+        self.signature_pool = signature_pool
+        self.code_cache = code_cache
+        self.deposit_cache = deposit_cache
+        self.nonce_index = nonce_index
+
+    def _run(self):
+        started_at = time.monotonic()
+        signed_data = [
+            item
+            for monitor_request in self.monitor_requests
+            for item in monitor_request_signed_data(monitor_request)
+        ]
+        if self.signature_pool is not None:
+            signers = self.signature_pool.recover(signed_data)
+        else:
+            signers = recover_signers(signed_data)
+
+        tasks = [
+            StoreMonitorRequest(
+                self.web3,
+                self.state_db,
+                monitor_request,
+                self.monitor_contract,
+                self.cost_model,
+                code_cache=self.code_cache,
+                deposit_cache=self.deposit_cache,
+                signers=signers[3 * i:3 * i + 3],
+                nonce_index=self.nonce_index,
+            )
+            for i, monitor_request in enumerate(self.monitor_requests)
+        ]
+        valid = [task.validate() for task in tasks]
+        VALIDATION_SECONDS.observe(time.monotonic() - started_at, kind='batch')
+
+        # (channel_id, non-closing signer) => newest valid task
+        newest: Dict[Tuple[int, str], StoreMonitorRequest] = {}
+        for task, task_valid in zip(tasks, valid):
+            if not task_valid or not task.check_nonce(task.msg):
+                continue
+            balance_proof = task.msg.balance_proof
+            key = (balance_proof.channel_identifier, task.signers[1])
+            if key not in newest or newest[key].msg.balance_proof.nonce < balance_proof.nonce:
+                newest[key] = task
+        if len(newest) > 0:
+            self.state_db.store_monitor_requests([
+                (task.msg, task.signers[1], task.prepare_transaction())
+                for task in newest.values()
+            ])
+            for task in newest.values():
+                task.update_nonce_index()
+        log.info('Stored %d of %d batched monitor requests' % (len(newest), len(tasks)))
+        stored = set(newest.values())
+        return [task in stored for task in tasks]
@@ -20,3 +20,18 @@ def contract_deployer_address(faucet_address):
 @pytest.fixture
 def monitoring_service_contract(monitoring_service_external):
     return monitoring_service_external
+
+
+@pytest.fixture
+def deposit_reward(monitoring_service_contract, custom_token):
+    """Factory function to deposit tokens of a raiden client in the MSC, so
+    the client can pay rewards."""
+    def f(client, amount: int):
+        custom_token.functions.approve(
+            monitoring_service_contract.address,
+            amount,
+        ).transact({'from': client.address})
+        monitoring_service_contract.functions.deposit(
+            client.address, amount,
+        ).transact({'from': client.address})
+    return f
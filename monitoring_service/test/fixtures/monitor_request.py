@@ -23,6 +23,7 @@ def get_monitor_request_for_same_channel(
             reward_amount=0,
             bad_key_for_bp=False,
             bad_key_for_non_closing=False,
+            nonce=0,
     ):
         if user == 0:
             privkey = keys[0]
@@ -34,22 +35,21 @@ def get_monitor_request_for_same_channel(
             channel_id,
             token_network_address,
             balance_hash=encode_hex(sha3(balance_hash_data.encode())),
+            nonce=nonce,
         )
         balance_proof.signature = encode_hex(eth_sign(
             privkey if not bad_key_for_bp else keys[2],
             balance_proof.serialize_bin(),
         ))
-        non_closing_signature = encode_hex(eth_sign(
-            privkey_non_closing if not bad_key_for_non_closing else keys[2],
-            balance_proof.serialize_bin(),
-        ))
-
         monitor_request = MonitorRequest(
             balance_proof,
-            non_closing_signature,
             reward_amount=reward_amount,
             monitor_address=get_random_address(),
         )
+        monitor_request.non_closing_signature = encode_hex(eth_sign(
+            privkey_non_closing if not bad_key_for_non_closing else keys[2],
+            monitor_request.non_closing_data,
+        ))
         monitor_request.reward_proof_signature = encode_hex(
             eth_sign(privkey, monitor_request.serialize_reward_proof()),
         )
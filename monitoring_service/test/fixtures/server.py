@@ -73,6 +73,7 @@ def monitoring_service(
 
 @pytest.fixture
 def rest_api(monitoring_service, blockchain, rest_host, rest_port):
-    api = ServiceApi(monitoring_service, blockchain)
+    api = ServiceApi(monitoring_service, blockchain, api_tokens=['test-token'])
     api.run(rest_host, rest_port)
-    return api
+    yield api
+    api.stop()
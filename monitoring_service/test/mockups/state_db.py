@@ -1,3 +1,5 @@
+from typing import Dict, Iterable, List
+
 from monitoring_service.state_db.db import StateDB
 
 
@@ -9,6 +11,8 @@ class StateDBMock(StateDB):
         self._chain_id = None
         self._server_address = None
         self._contract_address = None
+        self._transactions = {}
+        self._prepared_transactions = {}
 
     @property
     def monitor_requests(self) -> dict:
@@ -31,6 +35,8 @@ class StateDBMock(StateDB):
             del self._monitor_requests[channel_id]
         except KeyError:
             pass
+        self._prepared_transactions.pop(channel_id, None)
+        self.version += 1
 
     def is_initialized(self) -> bool:
         return self._is_initialized
@@ -39,6 +45,57 @@ class StateDBMock(StateDB):
         self._monitor_requests[
             monitor_request.balance_proof.channel_identifier
         ] = monitor_request
+        self.version += 1
+
+    def store_monitor_requests(self, monitor_requests) -> None:
+        for monitor_request, non_closing_signer, transaction in monitor_requests:
+            self.store_monitor_request(monitor_request)
+            if transaction is not None:
+                channel_id = monitor_request.balance_proof.channel_identifier
+                self.store_prepared_transaction(channel_id, non_closing_signer, transaction)
+
+    def get_monitor_requests(
+        self,
+        after=None,
+        limit=None,
+        token_network_address=None,
+        non_closing_signer=None,
+        min_nonce=None,
+        max_nonce=None,
+        channel_id=None,
+    ) -> list:
+        result = []
+        for x in self._monitor_requests.values():
+            balance_proof = x.balance_proof
+            key = (balance_proof.channel_identifier, x.non_closing_signer)
+            if (
+                (after is None or key > after) and
+                channel_id in (None, key[0]) and
+                token_network_address in (None, balance_proof.token_network_address) and
+                non_closing_signer in (None, key[1]) and
+                (min_nonce is None or balance_proof.nonce >= min_nonce) and
+                (max_nonce is None or balance_proof.nonce <= max_nonce)
+            ):
+                result.append((key, x))
+        result.sort(key=lambda x: x[0])
+        return result[:limit]
+
+    def get_latest_nonces(self) -> dict:
+        return {
+            (x.balance_proof.channel_identifier, x.non_closing_signer): x.balance_proof.nonce
+            for x in self._monitor_requests.values()
+        }
+
+    def store_prepared_transaction(
+        self,
+        channel_id: int,
+        non_closing_signer: str,
+        transaction: dict,
+    ) -> None:
+        self._prepared_transactions.setdefault(channel_id, {})[non_closing_signer] = transaction
+
+    def get_prepared_transactions(self, channel_id: int) -> Dict[str, dict]:
+        return dict(self._prepared_transactions.get(channel_id, {}))
 
     def chain_id(self) -> int:
         return self._chain_id
@@ -48,3 +105,43 @@ class StateDBMock(StateDB):
 
     def monitoring_contract_address(self) -> str:
         return self._contract_address
+
+    def store_transaction(
+        self,
+        tx_hash: str,
+        kind: str,
+        channel_id: int,
+        nonce: int,
+        raw_transaction: str,
+        status: str,
+        deadline: int = None,
+    ) -> None:
+        self._transactions[tx_hash] = {
+            'tx_hash': tx_hash,
+            'kind': kind,
+            'channel_identifier': channel_id,
+            'nonce': nonce,
+            'raw_transaction': raw_transaction,
+            'status': status,
+            'deadline': deadline,
+        }
+
+    def update_transaction_status(self, tx_hash: str, status: str) -> None:
+        if tx_hash in self._transactions:
+            self._transactions[tx_hash]['status'] = status
+
+    def get_transactions(
+        self,
+        channel_id: int = None,
+        statuses: Iterable[str] = None,
+    ) -> List[dict]:
+        if statuses is not None:
+            statuses = list(statuses)
+        return sorted(
+            [
+                dict(x) for x in self._transactions.values()
+                if channel_id in (None, x['channel_identifier']) and
+                (statuses is None or x['status'] in statuses)
+            ],
+            key=lambda x: x['nonce'],
+        )
@@ -1,5 +1,8 @@
+import gevent
+
+from monitoring_service.receipts import ReceiptTracker
 from monitoring_service.tasks import OnChannelSettle
-from raiden_libs.private_contract import PrivateContract
+from monitoring_service.transactions import TransactionManager
 from raiden_libs.utils import private_key_to_address
 
 
@@ -25,8 +28,34 @@ def test_on_channel_settle(
 
     task = OnChannelSettle(
         monitor_request,
-        PrivateContract(monitoring_service_contract),
-        ms_privkey,
+        monitoring_service_contract,
+        TransactionManager(web3, ms_privkey),
     )
 
     assert task._run() is True
+
+    receipt_tracker = ReceiptTracker(web3, poll_interval=0.01)
+    receipt_tracker.start()
+    task = OnChannelSettle(
+        monitor_request,
+        monitoring_service_contract,
+        TransactionManager(web3, ms_privkey),
+        receipt_tracker,
+    )
+    task.start()
+    # the channel hasn't been settled, so claimReward() fails
+    assert task.get(timeout=5) is False
+    receipt_tracker.stop()
+
+    # the task ends quietly if the tracker is stopped while it's waiting
+    receipt_tracker = ReceiptTracker(web3)
+    task = OnChannelSettle(
+        monitor_request,
+        monitoring_service_contract,
+        TransactionManager(web3, ms_privkey),
+        receipt_tracker,
+    )
+    task.start()
+    gevent.sleep(0)
+    receipt_tracker.stop()
+    assert task.get(timeout=5) is None
@@ -0,0 +1,96 @@
+from hexbytes import HexBytes
+
+from monitoring_service.receipts import ReceiptTracker
+from monitoring_service.tasks import ReconcileTransactions
+from monitoring_service.transactions import TransactionManager
+from raiden_libs.utils import private_key_to_address
+
+
+def test_reconcile_transactions(
+        web3,
+        get_random_privkey,
+        get_random_address,
+        send_funds,
+        state_db_sqlite,
+):
+    private_key = get_random_privkey()
+    send_funds(private_key_to_address(private_key))
+    tx_manager = TransactionManager(web3, private_key, state_db_sqlite)
+    receiver = get_random_address()
+    transfer = {'to': receiver, 'value': 1, 'gas': 21000, 'gasPrice': web3.eth.gasPrice}
+
+    # a transaction that was sent and mined while the MS was down
+    mined_hash = tx_manager.send_transaction(transfer, kind='monitor', channel_id=1)
+    assert state_db_sqlite.get_transactions(1)[0]['status'] == 'pending'
+
+    # a transaction that was signed, but never sent because the MS crashed
+    nonce = tx_manager.reserve_nonce()
+    signed = web3.eth.account.signTransaction(
+        dict(transfer, nonce=nonce, chainId=tx_manager.chain_id),
+        private_key,
+    )
+    state_db_sqlite.store_transaction(
+        HexBytes(signed.hash).hex(),
+        'claimReward',
+        2,
+        nonce,
+        HexBytes(signed.rawTransaction).hex(),
+        'signed',
+    )
+
+    task = ReconcileTransactions(web3, state_db_sqlite)
+    assert task._run() == {'mined': 1, 'pending': 1}
+    assert state_db_sqlite.get_transactions(1)[0]['tx_hash'] == mined_hash.hex()
+    assert state_db_sqlite.get_transactions(1)[0]['status'] == 'mined'
+    assert state_db_sqlite.get_transactions(2)[0]['status'] == 'pending'
+    assert web3.eth.getBalance(receiver) == 2
+
+    # the rebroadcast transaction is mined now
+    task = ReconcileTransactions(web3, state_db_sqlite)
+    assert task._run() == {'mined': 1}
+    assert state_db_sqlite.get_transactions(statuses=['signed', 'pending']) == []
+
+
+def test_reconciled_transactions_are_tracked(
+        web3,
+        get_random_privkey,
+        get_random_address,
+        send_funds,
+        state_db_sqlite,
+):
+    private_key = get_random_privkey()
+    send_funds(private_key_to_address(private_key))
+    transfer = {'to': get_random_address(), 'value': 1, 'gas': 21000, 'gasPrice': 100}
+    deadline = web3.eth.blockNumber + 100
+
+    # a transaction that was signed, but never sent because the MS crashed
+    nonce = web3.eth.getTransactionCount(private_key_to_address(private_key))
+    signed = web3.eth.account.signTransaction(
+        dict(transfer, nonce=nonce, chainId=int(web3.version.network)),
+        private_key,
+    )
+    tx_hash = HexBytes(signed.hash)
+    state_db_sqlite.store_transaction(
+        tx_hash.hex(),
+        'monitor',
+        1,
+        nonce,
+        HexBytes(signed.rawTransaction).hex(),
+        'signed',
+        deadline,
+    )
+
+    # after the restart
+    tx_manager = TransactionManager(web3, private_key, state_db_sqlite)
+    tracker = ReceiptTracker(web3, state_db_sqlite, tx_manager=tx_manager)
+    task = ReconcileTransactions(web3, state_db_sqlite, tx_manager, tracker)
+    assert task._run() == {'pending': 1}
+    pending = tx_manager.pending[nonce]
+    assert (pending.tx_hash, pending.kind, pending.deadline) == (tx_hash, 'monitor', deadline)
+    assert pending.transaction['gasPrice'] == 100
+    assert tracker.tracked[tx_hash.hex()].deadline == deadline
+
+    # the outbox is updated once it's mined
+    tracker.poll()
+    assert state_db_sqlite.get_transactions(1)[0]['status'] == 'mined'
+    assert tx_manager.pending == {}
@@ -1,6 +1,10 @@
 import gevent
 
-from monitoring_service.tasks.store_monitor_request import StoreMonitorRequest
+from monitoring_service.deposits import DepositCache
+from monitoring_service.nonce_index import NonceIndex
+from monitoring_service.state_db import StateDBSqlite
+from monitoring_service.tasks import StoreMonitorRequest, StoreMonitorRequestBatch
+from raiden_libs.messages import MonitorRequest
 
 
 def test_request_validation(
@@ -8,6 +12,7 @@ def test_request_validation(
         get_monitor_request_for_same_channel,
         state_db_sqlite,
         get_random_address,
+        monitoring_service_contract,
 ):
     def store_successful(mr):
         task = StoreMonitorRequest(web3, state_db_sqlite, mr)
@@ -38,13 +43,125 @@ def test_request_validation(
     # assert not store_successful(mr)
 
     # must fail because no reward is deposited
-    # TODO: enable once we check deposits
-    # mr = get_monitor_request_for_same_channel(user=0, reward_amount=1)
-    # task = StoreMonitorRequest(web3, state_db_sqlite, mr)
-    # task.run()
-    # gevent.joinall([task])
-    # assert len(state_db_sqlite.monitor_requests) == 0
+    mr = get_monitor_request_for_same_channel(user=0, reward_amount=1)
+    task = StoreMonitorRequest(
+        web3,
+        state_db_sqlite,
+        mr,
+        deposit_cache=DepositCache(monitoring_service_contract),
+    )
+    task.run()
+    gevent.joinall([task])
+    assert len(state_db_sqlite.monitor_requests) == 0
 
     # everything ok
     mr = get_monitor_request_for_same_channel(user=0)
     assert store_successful(mr)
+
+
+def test_batch_validation(
+        web3,
+        get_monitor_request_for_same_channel,
+        get_random_monitor_request,
+        state_db_sqlite,
+):
+    invalid = get_monitor_request_for_same_channel(user=0)
+    invalid.non_closing_signature = '0x' + '0' * 130
+    requests = [
+        get_monitor_request_for_same_channel(user=0),
+        invalid,
+        get_monitor_request_for_same_channel(user=1),
+    ]
+    task = StoreMonitorRequestBatch(web3, state_db_sqlite, requests)
+    task.run()
+    gevent.joinall([task])
+    assert task.value == [True, False, True]
+    assert set(state_db_sqlite.monitor_requests) == {
+        (1, requests[0].non_closing_signer),
+        (1, requests[2].non_closing_signer),
+    }
+
+
+def test_stale_requests(
+        web3,
+        get_monitor_request_for_same_channel,
+        state_db_sqlite,
+):
+    nonce_index = NonceIndex()
+
+    def store(mr):
+        task = StoreMonitorRequest(web3, state_db_sqlite, mr, nonce_index=nonce_index)
+        task.run()
+        gevent.joinall([task])
+        return task.value
+
+    mr = get_monitor_request_for_same_channel(user=0)
+    assert store(mr) is True
+    assert len(nonce_index) == 1
+    # the same nonce doesn't replace the stored request
+    assert store(mr) is False
+
+    # within a batch, only the newest request is stored
+    newer = get_monitor_request_for_same_channel(user=0, nonce=2)
+    older = get_monitor_request_for_same_channel(user=0, nonce=1)
+    task = StoreMonitorRequestBatch(
+        web3,
+        state_db_sqlite,
+        [newer, older],
+        nonce_index=nonce_index,
+    )
+    task.run()
+    gevent.joinall([task])
+    assert task.value == [True, False]
+    assert state_db_sqlite.get_latest_nonces() == {(1, mr.non_closing_signer): 2}
+
+
+def test_prepared_transaction_is_committed(
+        web3,
+        get_monitor_request_for_same_channel,
+        get_random_address,
+        monitoring_service_contract,
+        tmpdir,
+):
+    """The request and its prepared monitor() transaction are stored together"""
+    filename = str(tmpdir.join('state.db'))
+    state_db = StateDBSqlite(filename)
+    state_db.setup_db(1, get_random_address(), get_random_address())
+    mr = get_monitor_request_for_same_channel(user=0)
+    task = StoreMonitorRequest(web3, state_db, mr, monitor_contract=monitoring_service_contract)
+    task.run()
+    gevent.joinall([task])
+    assert task.value is True
+
+    # both are visible to another connection
+    other_db = StateDBSqlite(filename)
+    assert list(other_db.monitor_requests) == [(1, mr.non_closing_signer)]
+    assert list(other_db.get_prepared_transactions(1)) == [mr.non_closing_signer]
+
+
+def test_store_without_recovery(
+        web3,
+        get_monitor_request_for_same_channel,
+        state_db_sqlite,
+        monitoring_service_contract,
+        monkeypatch,
+):
+    """Signers that were already recovered aren't recovered again"""
+    mr = get_monitor_request_for_same_channel(user=0)
+    signers = [mr.balance_proof.signer, mr.non_closing_signer, mr.reward_proof_signer]
+
+    def fail(*args, **kwargs):
+        raise AssertionError('signature recovered')
+    monkeypatch.setattr(MonitorRequest, 'non_closing_signer', property(fail))
+    monkeypatch.setattr('monitoring_service.signatures.eth_recover', fail)
+    task = StoreMonitorRequest(
+        web3,
+        state_db_sqlite,
+        mr,
+        monitor_contract=monitoring_service_contract,
+        signers=signers,
+    )
+    task.run()
+    gevent.joinall([task], raise_error=True)
+    assert task.value is True
+    assert list(state_db_sqlite.monitor_requests) == [(1, signers[1])]
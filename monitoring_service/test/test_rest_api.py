@@ -1,8 +1,15 @@
+import json
+
+import gevent
 import requests
 
+from monitoring_service.api.rest import ServiceApi
+from monitoring_service.blockchain import transaction_input
+
 
-def test_rest_api(monitoring_service, rest_api, generate_raiden_client):
+def test_rest_api(monitoring_service, rest_api, generate_raiden_client, deposit_reward):
     c1, c2 = generate_raiden_client(), generate_raiden_client()
+    deposit_reward(c1, 1)
     channel_id = c1.open_channel(c2.address)
     bp = c1.get_balance_proof(
         c2.address,
@@ -22,3 +29,289 @@ def test_rest_api(monitoring_service, rest_api, generate_raiden_client):
             if x['balance_proof']['channel_identifier'] == channel_id
         ],
     ) == 1
+
+
+def test_rest_api_submit(
+        monitoring_service,
+        rest_api,
+        blockchain,
+        generate_raiden_client,
+        deposit_reward,
+        get_random_monitor_request,
+):
+    url = 'http://localhost:5001/api/1/monitor_requests'
+    headers = {'Authorization': 'Bearer test-token'}
+    c1, c2 = generate_raiden_client(), generate_raiden_client()
+    deposit_reward(c1, 1)
+    channel_id = c1.open_channel(c2.address)
+    monitoring_service.open_channels.add(channel_id)
+
+    def monitor_request(nonce):
+        bp = c1.get_balance_proof(c2.address, transferred_amount=nonce, nonce=nonce)
+        return c1.get_monitor_request(c2.address, bp, 1, monitoring_service.address)
+
+    ret = requests.post(url, data=monitor_request(2).serialize_full(), headers=headers)
+    assert ret.status_code == 200
+    assert ret.json() == [{'channel_identifier': channel_id, 'nonce': 2, 'status': 'accepted'}]
+    assert channel_id in monitoring_service.monitor_requests
+
+    # a list of requests gets one result per request
+    unopened = get_random_monitor_request()
+    ret = requests.post(url, json=[
+        monitor_request(2).serialize_data(),
+        monitor_request(1).serialize_data(),
+        unopened.serialize_data(),
+    ], headers=headers)
+    assert [x['status'] for x in ret.json()] == ['duplicate', 'stale', 'pending']
+
+    # authentication
+    data = monitor_request(3).serialize_full()
+    assert requests.post(url, data=data).status_code == 401
+    assert requests.post(url, data=data, headers={
+        'Authorization': 'Bearer wrong',
+    }).status_code == 401
+    client = ServiceApi(monitoring_service, blockchain).flask_app.test_client()
+    assert client.post('/api/1/monitor_requests', data=data).status_code == 403
+
+    # malformed requests
+    assert requests.post(url, data='x', headers=headers).status_code == 400
+    assert requests.post(url, json=[], headers=headers).status_code == 400
+    ret = requests.post(url, json=[json.loads(data), {'reward_amount': 1}], headers=headers)
+    assert ret.status_code == 400
+    assert 'Monitor request 1' in ret.json()['message']
+
+
+def test_rest_api_metrics(monitoring_service, rest_api, get_random_monitor_request):
+    monitoring_service.start()
+    gevent.sleep(0)
+    monitor_request = get_random_monitor_request()
+    monitoring_service.open_channels.add(monitor_request.balance_proof.channel_identifier)
+    monitoring_service.transport.receive_fake_data(monitor_request.serialize_full())
+    requests.get('http://localhost:5001/api/1/monitor_requests')
+
+    ret = requests.get('http://localhost:5001/metrics')
+    assert ret.status_code == 200
+    assert ret.headers['Content-Type'].startswith('text/plain; version=0.0.4')
+    lines = ret.text.splitlines()
+    for metric in (
+        'ms_monitor_requests_received_total',
+        'ms_validation_seconds',
+        'ms_rpc_seconds',
+        'ms_block_lag',
+        'ms_validation_pool_queue_depth',
+        'ms_scheduler_queue_depth',
+        'ms_rate_limiter_signer_allowed',
+        'ms_response_cache_misses',
+    ):
+        assert '# TYPE %s' % metric in ' '.join(lines)
+    assert 'ms_response_cache_misses 1' in lines
+
+
+def test_rest_api_pagination(monitoring_service, rest_api, get_random_monitor_request):
+    url = 'http://localhost:5001/api/1/monitor_requests'
+    requests_by_channel = {}
+    for _ in range(5):
+        monitor_request = get_random_monitor_request()
+        monitoring_service.state_db.store_monitor_request(monitor_request)
+        requests_by_channel[monitor_request.balance_proof.channel_identifier] = monitor_request
+
+    channel_ids = []
+    params = {'limit': 2}
+    pages = 0
+    while True:
+        ret = requests.get(url, params=params)
+        assert ret.status_code == 200
+        assert len(ret.json()) <= 2
+        channel_ids += [x['balance_proof']['channel_identifier'] for x in ret.json()]
+        pages += 1
+        if 'X-Next-Cursor' not in ret.headers:
+            break
+        assert 'rel="next"' in ret.headers['Link']
+        params['cursor'] = ret.headers['X-Next-Cursor']
+    assert pages == 3
+    assert sorted(channel_ids) == sorted(requests_by_channel)
+
+    # filters
+    monitor_request = next(iter(requests_by_channel.values()))
+    ret = requests.get(url, params={
+        'token_network_address': monitor_request.balance_proof.token_network_address,
+        'signer': monitor_request.non_closing_signer,
+    })
+    assert [x['balance_proof']['channel_identifier'] for x in ret.json()] == [
+        monitor_request.balance_proof.channel_identifier,
+    ]
+
+    assert requests.get(url, params={'limit': 0}).status_code == 400
+    assert requests.get(url, params={'cursor': 'x'}).status_code == 400
+    assert requests.get(url, params={'signer': '0x12'}).status_code == 400
+
+
+def test_rest_api_conditional_get(monitoring_service, rest_api, get_random_monitor_request):
+    url = 'http://localhost:5001/api/1/monitor_requests'
+    state_db = monitoring_service.state_db
+    cache = rest_api.response_cache
+    state_db.store_monitor_request(get_random_monitor_request())
+
+    ret = requests.get(url)
+    assert ret.status_code == 200
+    assert len(ret.json()) == 1
+    etag = ret.headers['ETag']
+
+    # unchanged, the state DB isn't queried again
+    queries = []
+    get_monitor_requests = state_db.get_monitor_requests
+    state_db.get_monitor_requests = lambda **kwargs: queries.append(kwargs)
+    ret = requests.get(url, headers={'If-None-Match': etag})
+    assert ret.status_code == 304
+    assert ret.headers['ETag'] == etag
+    ret = requests.get(url)
+    assert ret.status_code == 200
+    assert len(ret.json()) == 1
+    assert queries == []
+    assert cache.hits == 1
+    assert cache.not_modified == 1
+    state_db.get_monitor_requests = get_monitor_requests
+
+    # other queries are cached separately and have their own ETag
+    ret = requests.get(url, params={'limit': 1}, headers={'If-None-Match': etag})
+    assert ret.status_code == 200
+    assert ret.headers['ETag'] != etag
+    assert cache.misses == 2
+
+    # any change invalidates the ETag and the cached responses
+    state_db.store_monitor_request(get_random_monitor_request())
+    ret = requests.get(url, headers={'If-None-Match': etag})
+    assert ret.status_code == 200
+    assert len(ret.json()) == 2
+    assert ret.headers['ETag'] != etag
+    assert cache.stats()['size'] == 1
+
+
+def test_rest_api_channel_lookup(monitoring_service, rest_api, get_random_monitor_request):
+    url = 'http://localhost:5001/api/1'
+    state_db = monitoring_service.state_db
+    monitor_request = get_random_monitor_request()
+    other_request = get_random_monitor_request()
+    for x in (monitor_request, other_request):
+        state_db.store_monitor_request(x)
+    channel_id = monitor_request.balance_proof.channel_identifier
+    signer = monitor_request.non_closing_signer
+
+    for path in ('/monitor_requests/%d' % channel_id, '/monitor_requests/%s' % hex(channel_id)):
+        ret = requests.get(url + path)
+        assert ret.status_code == 200
+        assert ret.json() == [monitor_request.serialize_data()]
+    ret = requests.get(url + '/monitor_requests/%d/%s' % (channel_id, signer))
+    assert ret.json() == monitor_request.serialize_data()
+    ret = requests.get(url + '/monitor_requests/%d/%s' % (
+        channel_id,
+        other_request.non_closing_signer,
+    ))
+    assert ret.status_code == 404
+    assert requests.get(url + '/monitor_requests/%d/0x12' % channel_id).status_code == 400
+    assert requests.get(url + '/monitor_requests/0').status_code == 400
+    assert requests.get(url + '/monitor_requests/abc').status_code == 400
+    # the export isn't taken for a channel id
+    assert requests.get(url + '/monitor_requests/export').status_code == 200
+
+    monitoring_service.open_channels.add(channel_id)
+    monitoring_service.settle_timeouts[channel_id] = 100
+    state_db.store_transaction('0x01', 'monitor', channel_id, 5, '0xaa', 'pending')
+    ret = requests.get(url + '/channels/%d' % channel_id)
+    assert ret.status_code == 200
+    assert ret.json() == {
+        'channel_identifier': channel_id,
+        'open': True,
+        'settle_timeout': 100,
+        'pending_requests': 0,
+        'monitor_requests': [monitor_request.serialize_data()],
+        'transactions': [{'tx_hash': '0x01', 'kind': 'monitor', 'nonce': 5, 'status': 'pending'}],
+    }
+    assert requests.get(url + '/channels/%d' % (channel_id + 1)).status_code == 404
+
+
+def test_rest_api_export(monitoring_service, rest_api, get_random_monitor_request):
+    url = 'http://localhost:5001/api/1/monitor_requests/export'
+    channel_ids = set()
+    for _ in range(3):
+        monitor_request = get_random_monitor_request()
+        monitoring_service.state_db.store_monitor_request(monitor_request)
+        channel_ids.add(monitor_request.balance_proof.channel_identifier)
+
+    for encoding, content_encoding in [
+        ('gzip', 'gzip'),
+        ('identity', None),
+        ('gzip;q=0, identity', None),
+    ]:
+        ret = requests.get(url, headers={'Accept-Encoding': encoding}, stream=True)
+        assert ret.headers['Content-Type'] == 'application/x-ndjson'
+        assert ret.headers.get('Content-Encoding') == content_encoding
+        lines = [json.loads(line) for line in ret.iter_lines()]
+        assert {
+            x['monitor_request']['balance_proof']['channel_identifier'] for x in lines
+        } == channel_ids
+
+    # resume after the first line
+    ret = requests.get(url, params={'cursor': lines[0]['cursor']})
+    assert [json.loads(line) for line in ret.iter_lines()] == lines[1:]
+
+
+def test_rest_api_events(monitoring_service, rest_api, generate_raiden_client, web3):
+    c1, c2 = generate_raiden_client(), generate_raiden_client()
+    c1.open_channel(c2.address)
+    tx_hash = web3.eth.getBlock('latest')['transactions'][-1].hex()
+    tx = web3.eth.getTransaction(tx_hash)
+    monitoring_service.start()
+    gevent.sleep(0)
+    url = 'http://localhost:5001/api/1/events'
+
+    def open_event(channel_id, tx_hash=tx_hash):
+        return {
+            'event': 'ChannelOpened',
+            'args': {'channel_identifier': channel_id, 'settle_timeout': 100},
+            'transactionHash': tx_hash,
+            'blockNumber': tx['blockNumber'],
+            'address': tx['to'],
+        }
+
+    # a single event
+    ret = requests.put(url, json=open_event(1001))
+    assert ret.json() == {'received': 1, 'dispatched': 1}
+    assert 1001 in monitoring_service.open_channels
+
+    # events of unknown transactions are skipped
+    ret = requests.put(url, json=[open_event(1002), open_event(1003, '0x' + '11' * 32)])
+    assert ret.json() == {'received': 2, 'dispatched': 1}
+    assert 1002 in monitoring_service.open_channels
+    assert 1003 not in monitoring_service.open_channels
+
+    # NDJSON stream
+    ret = requests.put(
+        url,
+        data='\n'.join(json.dumps(open_event(x)) for x in (1004, 1005)),
+        headers={'Content-Type': 'application/x-ndjson'},
+    )
+    assert ret.json() == {'received': 2, 'dispatched': 2}
+    assert {1004, 1005} <= monitoring_service.open_channels
+
+    # nothing is dispatched if any event is invalid
+    ret = requests.put(url, json=[open_event(1006), {'event': 'ChannelOpened'}])
+    assert ret.status_code == 400
+    assert 1006 not in monitoring_service.open_channels
+    ret = requests.put(url, json=[dict(open_event(1007), event='Unknown')])
+    assert ret.status_code == 400
+    event = open_event(1008)
+    del event['blockNumber']
+    ret = requests.put(url, json=[open_event(1009), event])
+    assert ret.status_code == 400
+    assert 1009 not in monitoring_service.open_channels
+
+    # events can carry the transaction that emitted them
+    event = dict(open_event(1010, '0x' + '22' * 32), transaction={
+        'input': transaction_input(tx),
+    })
+    ret = requests.put(url, json=event)
+    assert ret.json() == {'received': 1, 'dispatched': 1}
+    assert 1010 in monitoring_service.open_channels
+    ret = requests.put(url, data='not json')
+    assert ret.status_code == 400
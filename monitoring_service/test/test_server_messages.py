@@ -1,7 +1,11 @@
+from monitoring_service.messages import MonitorRequestBatch
+from monitoring_service.metrics import MONITOR_REQUESTS_RECEIVED
 
-def test_bp_dispatch(monitoring_service, generate_raiden_client):
+
+def test_bp_dispatch(monitoring_service, generate_raiden_client, deposit_reward):
     """Test if server accepts an incoming balance proof message"""
     c1, c2 = generate_raiden_client(), generate_raiden_client()
+    deposit_reward(c1, 1)
     channel_id = c1.open_channel(c2.address)
     bp = c1.get_balance_proof(c2.address, transferred_amount=1, nonce=1)
     monitor_request = c1.get_monitor_request(c2.address, bp, 1, monitoring_service.address)
@@ -12,3 +16,109 @@ def test_bp_dispatch(monitoring_service, generate_raiden_client):
     transport.receive_fake_data(monitor_request.serialize_full())
     monitoring_service.wait_tasks()
     assert channel_id in monitoring_service.monitor_requests
+
+
+def test_duplicate_messages(monitoring_service, generate_raiden_client, deposit_reward):
+    """Copies of a message are only validated again if it wasn't stored"""
+    c1, c2 = generate_raiden_client(), generate_raiden_client()
+    channel_id = c1.open_channel(c2.address)
+    bp = c1.get_balance_proof(c2.address, transferred_amount=1, nonce=1)
+    monitor_request = c1.get_monitor_request(c2.address, bp, 1, monitoring_service.address)
+    monitoring_service.start()
+    transport = monitoring_service.transport
+    monitoring_service.open_channels.add(channel_id)
+
+    # rejected, because there's no deposit for the reward
+    transport.receive_fake_data(monitor_request.serialize_full())
+    monitoring_service.wait_tasks()
+    assert channel_id not in monitoring_service.monitor_requests
+
+    deposit_reward(c1, 1)
+    monitoring_service.deposit_cache.refresh()
+    transport.receive_fake_data(monitor_request.serialize_full())
+    monitoring_service.wait_tasks()
+    assert channel_id in monitoring_service.monitor_requests
+
+    transport.receive_fake_data(monitor_request.serialize_full())
+    assert monitoring_service.seen_messages.hits == 1
+    assert monitoring_service.validation_pool.submitted == 2
+
+
+def test_batch_dispatch(monitoring_service, generate_raiden_clients, deposit_reward):
+    """Test if server accepts a batch of monitor requests"""
+    c1, c2, c3 = generate_raiden_clients(3)
+    deposit_reward(c1, 2)
+    channel_ids = [c1.open_channel(c2.address), c1.open_channel(c3.address)]
+    monitor_requests = [
+        c1.get_monitor_request(
+            partner.address,
+            c1.get_balance_proof(partner.address, transferred_amount=1, nonce=1),
+            1,
+            monitoring_service.address,
+        )
+        for partner in (c2, c3)
+    ]
+    monitoring_service.start()
+    monitoring_service.open_channels.update(channel_ids)
+
+    batch = MonitorRequestBatch(monitor_requests + monitor_requests)
+    monitoring_service.transport.receive_fake_data(batch.serialize_full())
+    monitoring_service.wait_tasks()
+    assert all(channel_id in monitoring_service.monitor_requests for channel_id in channel_ids)
+    # the copies were dropped, the rest was validated by a single task
+    assert monitoring_service.seen_messages.hits == 2
+    assert monitoring_service.validation_pool.submitted == 1
+
+
+def test_requests_before_channel_open(
+        monitoring_service,
+        generate_raiden_client,
+        deposit_reward,
+        monkeypatch,
+):
+    """Requests arriving before the ChannelOpened event is confirmed are replayed"""
+    c1, c2 = generate_raiden_client(), generate_raiden_client()
+    deposit_reward(c1, 1)
+    channel_id = c1.open_channel(c2.address)
+    bp = c1.get_balance_proof(c2.address, transferred_amount=1, nonce=1)
+    monitor_request = c1.get_monitor_request(c2.address, bp, 1, monitoring_service.address)
+    monitoring_service.start()
+
+    received = MONITOR_REQUESTS_RECEIVED.get(source='message')
+    monitoring_service.transport.receive_fake_data(monitor_request.serialize_full())
+    monitoring_service.transport.receive_fake_data(monitor_request.serialize_full())
+    monitoring_service.wait_tasks()
+    assert channel_id not in monitoring_service.monitor_requests
+    assert len(monitoring_service.pending_requests) == 1
+    assert MONITOR_REQUESTS_RECEIVED.get(source='message') == received + 2
+    allowed = monitoring_service.signer_rate_limiter.allowed
+
+    # the signer recovered when the request arrived is used
+    def recover(monitor_requests):
+        raise AssertionError('recovered again')
+    monkeypatch.setattr(monitoring_service, 'recover_non_closing_signers', recover)
+    monitoring_service.on_channel_open(
+        {'args': {'channel_identifier': channel_id, 'settle_timeout': 500}},
+        None,
+    )
+    monitoring_service.wait_tasks()
+    assert channel_id in monitoring_service.monitor_requests
+    assert monitoring_service.pending_requests.replayed == 1
+    # replaying is neither counted nor charged to the signer again
+    assert MONITOR_REQUESTS_RECEIVED.get(source='message') == received + 2
+    assert monitoring_service.signer_rate_limiter.allowed == allowed
+
+
+def test_invalid_requests_are_not_held(monitoring_service, generate_raiden_client):
+    """Requests for channels that aren't open yet are only held if they're signed"""
+    c1, c2 = generate_raiden_client(), generate_raiden_client()
+    channel_id = c1.open_channel(c2.address)
+    bp = c1.get_balance_proof(c2.address, transferred_amount=1, nonce=1)
+    monitor_request = c1.get_monitor_request(c2.address, bp, 1, monitoring_service.address)
+    monitor_request.non_closing_signature = '0x' + '00' * 65
+    monitoring_service.start()
+
+    monitoring_service.transport.receive_fake_data(monitor_request.serialize_full())
+    monitoring_service.wait_tasks()
+    assert channel_id not in monitoring_service.open_channels
+    assert len(monitoring_service.pending_requests) == 0
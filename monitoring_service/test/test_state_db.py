@@ -1,3 +1,6 @@
+from monitoring_service.state_db import StateDBSqlite
+
+
 def check_monitor_request(data_sqlite, request_json):
     # check monitor request fields
     fields_to_check = list(request_json.keys())
@@ -40,3 +43,174 @@ def test_requests_by_both_participants(
 
     all_monitor_requests = state_db_sqlite.monitor_requests
     assert len(all_monitor_requests) == 2
+
+
+def test_transaction_outbox(state_db_sqlite):
+    state_db_sqlite.store_transaction('0x01', 'monitor', 1, 5, '0xaa', 'signed')
+    state_db_sqlite.store_transaction('0x02', 'claimReward', 1, 7, '0xbb', 'pending')
+    state_db_sqlite.store_transaction('0x03', 'monitor', 2, 6, '0xcc', 'pending', 100)
+    state_db_sqlite.update_transaction_status('0x01', 'pending')
+
+    pending = state_db_sqlite.get_transactions(statuses=['pending'])
+    assert [tx['tx_hash'] for tx in pending] == ['0x01', '0x03', '0x02']
+    assert pending[0] == {
+        'tx_hash': '0x01',
+        'kind': 'monitor',
+        'channel_identifier': 1,
+        'nonce': 5,
+        'raw_transaction': '0xaa',
+        'status': 'pending',
+        'deadline': None,
+    }
+    assert pending[1]['deadline'] == 100
+    assert [tx['tx_hash'] for tx in state_db_sqlite.get_transactions(1)] == ['0x01', '0x02']
+    assert state_db_sqlite.get_transactions(2, ['mined']) == []
+
+
+def test_migrate(tmpdir, get_random_address):
+    """ Databases created by older versions get the new tables when they're opened """
+    filename = str(tmpdir.join('state.db'))
+    state_db = StateDBSqlite(filename)
+    state_db.setup_db(1, get_random_address(), get_random_address())
+    state_db.conn.executescript(
+        'DROP TABLE `transactions`; DROP TABLE `prepared_transactions`;'
+        'DROP INDEX `monitor_requests_token_network`; DROP INDEX `monitor_requests_signer`;',
+    )
+    state_db.conn.close()
+
+    state_db = StateDBSqlite(filename)
+    state_db.store_transaction('0x01', 'monitor', 1, 5, '0xaa', 'signed')
+    assert [tx['tx_hash'] for tx in state_db.get_transactions(1)] == ['0x01']
+    assert state_db.get_prepared_transactions(1) == {}
+    indexes = state_db.conn.execute(
+        "SELECT name FROM `sqlite_master` WHERE type='index' AND tbl_name='monitor_requests'",
+    ).fetchall()
+    assert {'monitor_requests_token_network', 'monitor_requests_signer'} <= {
+        x['name'] for x in indexes
+    }
+    # migrating again doesn't touch existing data
+    state_db.migrate()
+    assert [tx['tx_hash'] for tx in state_db.get_transactions(1)] == ['0x01']
+
+
+def test_migrate_transaction_deadline(tmpdir, get_random_address):
+    """ Outboxes created before deadlines were recorded get the column """
+    filename = str(tmpdir.join('state.db'))
+    state_db = StateDBSqlite(filename)
+    state_db.setup_db(1, get_random_address(), get_random_address())
+    state_db.conn.executescript(
+        'DROP TABLE `transactions`;'
+        'CREATE TABLE `transactions` (`tx_hash` CHAR(66) NOT NULL PRIMARY KEY,'
+        ' `kind` VARCHAR(32) NOT NULL, `channel_identifier` CHAR(34) NOT NULL,'
+        ' `nonce` INTEGER NOT NULL, `raw_transaction` TEXT NOT NULL,'
+        ' `status` VARCHAR(16) NOT NULL);'
+        "INSERT INTO `transactions` VALUES ('0x01', 'monitor', '0x1', 5, '0xaa', 'pending');",
+    )
+    state_db.conn.close()
+
+    state_db = StateDBSqlite(filename)
+    state_db.store_transaction('0x02', 'monitor', 1, 6, '0xbb', 'signed', 100)
+    assert [tx['deadline'] for tx in state_db.get_transactions(1)] == [None, 100]
+
+
+def test_prepared_transactions(state_db_sqlite, get_random_monitor_request, get_random_address):
+    request = get_random_monitor_request()
+    channel_id = request.balance_proof.channel_identifier
+    state_db_sqlite.store_monitor_request(request)
+    transaction = {'to': get_random_address(), 'data': '0x1234'}
+    state_db_sqlite.store_prepared_transaction(
+        channel_id,
+        request.non_closing_signer,
+        transaction,
+    )
+    assert state_db_sqlite.get_prepared_transactions(channel_id) == {
+        request.non_closing_signer: transaction,
+    }
+
+    state_db_sqlite.delete_monitor_request(channel_id)
+    assert state_db_sqlite.monitor_requests == {}
+    assert state_db_sqlite.get_prepared_transactions(channel_id) == {}
+
+
+def test_store_monitor_requests(state_db_sqlite, get_random_monitor_request, get_random_address):
+    requests = [get_random_monitor_request() for _ in range(3)]
+    transaction = {'to': get_random_address(), 'data': '0x1234'}
+    state_db_sqlite.store_monitor_requests([
+        (request, request.non_closing_signer, transaction if i == 0 else None)
+        for i, request in enumerate(requests)
+    ])
+    assert set(state_db_sqlite.monitor_requests) == {
+        (request.balance_proof.channel_identifier, request.non_closing_signer)
+        for request in requests
+    }
+    assert state_db_sqlite.get_prepared_transactions(
+        requests[0].balance_proof.channel_identifier,
+    ) == {requests[0].non_closing_signer: transaction}
+    assert state_db_sqlite.get_prepared_transactions(
+        requests[1].balance_proof.channel_identifier,
+    ) == {}
+
+
+def test_get_latest_nonces(state_db_sqlite, get_random_monitor_request):
+    request = get_random_monitor_request()
+    state_db_sqlite.store_monitor_request(request)
+    assert state_db_sqlite.get_latest_nonces() == {
+        (request.balance_proof.channel_identifier, request.non_closing_signer):
+            request.balance_proof.nonce,
+    }
+
+
+def test_get_monitor_requests(state_db_sqlite, get_random_monitor_request):
+    requests = [get_random_monitor_request() for _ in range(5)]
+    for request in requests:
+        state_db_sqlite.store_monitor_request(request)
+
+    # page through all requests
+    keys = []
+    after = None
+    while True:
+        page = state_db_sqlite.get_monitor_requests(after=after, limit=2)
+        if len(page) == 0:
+            break
+        keys += [key for key, _ in page]
+        after = page[-1][0]
+    assert sorted(keys) == sorted(
+        (x.balance_proof.channel_identifier, x.non_closing_signer) for x in requests
+    )
+
+    request = requests[0]
+    nonce = request.balance_proof.nonce
+    result = state_db_sqlite.get_monitor_requests(
+        token_network_address=request.balance_proof.token_network_address,
+        non_closing_signer=request.non_closing_signer,
+        min_nonce=nonce,
+        max_nonce=nonce,
+    )
+    assert [x['nonce'] for _, x in result] == [nonce]
+    assert state_db_sqlite.get_monitor_requests(
+        non_closing_signer=request.non_closing_signer,
+        min_nonce=nonce + 1,
+    ) == []
+
+    channel_id = request.balance_proof.channel_identifier
+    assert [key for key, _ in state_db_sqlite.get_monitor_requests(channel_id=channel_id)] == [
+        (channel_id, request.non_closing_signer),
+    ]
+    assert len(state_db_sqlite.get_monitor_requests(min_nonce=0, max_nonce=2 ** 64 - 1)) == 5
+
+
+def test_version(state_db_sqlite, get_random_monitor_request):
+    versions = [state_db_sqlite.version]
+    request = get_random_monitor_request()
+    state_db_sqlite.store_monitor_request(request)
+    versions.append(state_db_sqlite.version)
+    state_db_sqlite.store_monitor_requests([
+        (get_random_monitor_request(), request.non_closing_signer, None),
+    ])
+    versions.append(state_db_sqlite.version)
+    state_db_sqlite.delete_monitor_request(request.balance_proof.channel_identifier)
+    versions.append(state_db_sqlite.version)
+    # reads don't change the version
+    state_db_sqlite.get_monitor_requests()
+    versions.append(state_db_sqlite.version)
+    assert versions == [0, 1, 2, 3, 3]
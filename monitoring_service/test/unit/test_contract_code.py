@@ -0,0 +1,36 @@
+from monitoring_service.contract_code import ContractCodeCache
+
+
+def test_contract_code_cache(
+        web3,
+        contracts_manager,
+        token_network_registry_contract,
+        register_token_network,
+        custom_token,
+        get_random_address,
+        monkeypatch,
+):
+    token_network = register_token_network(custom_token.address)
+    cache = ContractCodeCache(web3, contracts_manager)
+    assert cache.prewarm(token_network_registry_contract.address) == 1
+    assert cache.misses == 1
+
+    # verified token networks don't need any RPC calls
+    get_code_calls = []
+    get_code = web3.eth.getCode
+
+    def counting_get_code(address):
+        get_code_calls.append(address)
+        return get_code(address)
+    monkeypatch.setattr(web3.eth, 'getCode', counting_get_code)
+    assert cache.is_token_network(token_network.address) is True
+    assert get_code_calls == []
+
+    # other contracts are rejected and cached, addresses without code aren't cached
+    assert cache.is_token_network(custom_token.address) is False
+    assert cache.is_token_network(custom_token.address) is False
+    empty_address = get_random_address()
+    assert cache.is_token_network(empty_address) is False
+    assert cache.is_token_network(empty_address) is False
+    assert get_code_calls == [custom_token.address, empty_address, empty_address]
+    assert (cache.hits, cache.misses) == (2, 4)
@@ -0,0 +1,43 @@
+from monitoring_service.costs import CostModel
+from monitoring_service.gas import GasEstimateCache
+from monitoring_service.transactions import TransactionManager
+
+
+def test_cost_model(
+        web3,
+        monitoring_service_contract,
+        get_random_privkey,
+        get_random_address,
+        monkeypatch,
+):
+    tx_manager = TransactionManager(web3, get_random_privkey())
+    monkeypatch.setattr(tx_manager.gas_price_oracle, 'cached_price', lambda: 10)
+
+    # without a token price, everything is profitable
+    cost_model = CostModel(monitoring_service_contract, tx_manager)
+    assert cost_model.is_profitable(0, 'admission') is True
+    assert cost_model.checked == 0
+
+    # default gas limits: (350000 + 210000) * 10 wei, plus 10% margin
+    cost_model = CostModel(monitoring_service_contract, tx_manager, 1000, 0.1)
+    assert cost_model.gas_cost() == 5600000
+    assert cost_model.is_profitable(6160, 'admission') is True
+    assert cost_model.is_profitable(6159, 'admission') is False
+    assert cost_model.is_profitable(1, 'close') is False
+    assert cost_model.stats() == {
+        'enabled': True,
+        'checked': 3,
+        'rejected': {'admission': 1, 'close': 1},
+    }
+
+    # estimates of sent transactions are used once they're cached
+    data = monitoring_service_contract.encodeABI(
+        'claimReward',
+        args=[1] + [get_random_address() for _ in range(3)],
+    )
+    call_shape = GasEstimateCache.call_shape({
+        'to': monitoring_service_contract.address,
+        'data': data,
+    })
+    tx_manager.gas_estimates.estimates[call_shape] = 50000
+    assert cost_model.gas_cost() == 4000000
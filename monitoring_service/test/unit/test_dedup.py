@@ -0,0 +1,65 @@
+import os
+
+from monitoring_service.dedup import BloomFilter, SeenMessageCache, message_digest
+from raiden_libs.messages import Message
+
+
+def test_message_digest(get_monitor_request_for_same_channel):
+    mr = get_monitor_request_for_same_channel(user=0)
+    copy = Message.deserialize(mr.serialize_full())
+    assert message_digest(copy) == message_digest(mr)
+    other = get_monitor_request_for_same_channel(user=0, reward_amount=1)
+    assert message_digest(other) != message_digest(mr)
+
+
+def test_seen_message_cache():
+    cache = SeenMessageCache(max_size=2)
+    a, b, c = os.urandom(16), os.urandom(16), os.urandom(16)
+    assert not cache.seen(a)
+    cache.add(a)
+    assert cache.seen(a)
+
+    # least recently seen digests are evicted
+    cache.add(b)
+    cache.add(c)
+    assert not cache.seen(a)
+    assert cache.seen(b)
+
+    cache.forget(b)
+    assert not cache.seen(b)
+    # confirming is a no-op without a Bloom filter
+    cache.confirm(b)
+    assert not cache.seen(b)
+    assert cache.stats() == {
+        'lookups': 6,
+        'hits': 2,
+        'bloom_hits': 0,
+        'hit_rate': 2 / 6,
+        'size': 1,
+    }
+
+
+def test_seen_message_cache_bloom():
+    cache = SeenMessageCache(max_size=1, bloom_capacity=100)
+    a, b = os.urandom(16), os.urandom(16)
+    cache.add(a)
+    cache.confirm(a)
+    cache.add(b)
+    # evicted from the LRU, but still in the Bloom filter
+    assert cache.seen(a)
+    assert cache.bloom_hits == 1
+
+
+def test_bloom_filter():
+    bloom = BloomFilter(capacity=1000, error_rate=0.01)
+    digests = [os.urandom(16) for _ in range(1000)]
+    for digest in digests:
+        bloom.add(digest)
+    assert all(digest in bloom for digest in digests)
+    false_positives = sum(os.urandom(16) in bloom for _ in range(10000))
+    assert false_positives < 300
+
+    # a full filter is cleared
+    bloom.add(os.urandom(16))
+    assert bloom.count == 1
+    assert sum(digest in bloom for digest in digests) < 50
@@ -0,0 +1,53 @@
+from monitoring_service.deposits import DepositCache
+
+
+def test_deposit_cache(
+        web3,
+        monitoring_service_contract,
+        custom_token,
+        faucet_address,
+        get_random_address,
+        monkeypatch,
+):
+    def deposit(owner, amount):
+        custom_token.functions.mint(amount).transact({'from': faucet_address})
+        custom_token.functions.approve(
+            monitoring_service_contract.address,
+            amount,
+        ).transact({'from': faucet_address})
+        monitoring_service_contract.functions.deposit(
+            owner,
+            amount,
+        ).transact({'from': faucet_address})
+
+    owner, other = get_random_address(), get_random_address()
+    deposit(owner, 10)
+    cache = DepositCache(monitoring_service_contract)
+    cache.refresh()
+    assert cache.deposit(owner) == 10
+    assert cache.deposit(other) == 0
+    assert (cache.hits, cache.misses) == (0, 2)
+
+    # watched owners are looked up without RPC calls...
+    def no_call(*args, **kwargs):
+        raise AssertionError('unexpected RPC call')
+    monkeypatch.setattr(web3.manager, 'request_blocking', no_call)
+    deposits = cache.deposit(owner), cache.deposit(other)
+    monkeypatch.undo()
+    assert deposits == (10, 0)
+    assert cache.hits == 2
+
+    # ...and refreshed together once per block
+    deposit(other, 5)
+    cache.refresh()
+    assert cache.refreshes == 1
+    assert cache.deposit(owner) == 10
+    assert cache.deposit(other) == 5
+    cache.refresh()
+    assert cache.refreshes == 1
+
+    # least recently used owners are dropped
+    cache.max_owners = 2
+    new_owner = get_random_address()
+    cache.deposit(new_owner)
+    assert list(cache.deposits) == [other, new_owner]
@@ -0,0 +1,134 @@
+from types import SimpleNamespace
+
+import pytest
+
+from monitoring_service.gas import GasEstimateCache, GasPriceOracle
+from monitoring_service.receipts import ReceiptTracker
+from monitoring_service.test.mockups import StateDBMock
+from monitoring_service.transactions import TransactionManager
+from raiden_libs.utils import private_key_to_address
+
+
+@pytest.fixture
+def tx_manager(web3, get_random_privkey, send_funds):
+    private_key = get_random_privkey()
+    send_funds(private_key_to_address(private_key))
+    return TransactionManager(web3, private_key, StateDBMock())
+
+
+def test_gas_price_oracle(monkeypatch):
+    web3 = SimpleNamespace(eth=SimpleNamespace(blockNumber=100, gasPrice=1))
+    requested_blocks = []
+
+    def rpc_batch(web3, calls):
+        block_numbers = [int(params[0], 16) for method, params in calls]
+        requested_blocks.extend(block_numbers)
+        # one transaction per block, paying ten times the block number
+        return [{'transactions': [{'gasPrice': n * 10}]} for n in block_numbers]
+    monkeypatch.setattr('monitoring_service.gas.rpc_batch', rpc_batch)
+
+    oracle = GasPriceOracle(web3, percentile=50, history_blocks=10)
+    assert oracle.suggest() == 960
+    assert requested_blocks == list(range(91, 101))
+    # blocks are only fetched once
+    assert oracle.suggest() == 960
+    assert len(requested_blocks) == 10
+    oracle.percentile = 100
+    web3.eth.blockNumber = 102
+    assert oracle.suggest() == 1020
+    assert requested_blocks[10:] == [101, 102]
+    # the cached price is only refreshed by updates
+    web3.eth.blockNumber = 103
+    assert oracle.cached_price() == 1020
+    assert len(requested_blocks) == 12
+    oracle.update(103)
+    assert oracle.cached_price() == 1030
+
+    oracle.max_gas_price = 500
+    assert oracle.suggest() == 500
+    assert oracle.replacement_price(300) == 500
+    assert oracle.replacement_price(500) is None
+
+
+def test_gas_estimate_cache(web3, tx_manager, get_random_address):
+    cache = GasEstimateCache(web3, margin=1.5)
+    transaction = {'from': tx_manager.address, 'to': get_random_address(), 'value': 1}
+    assert cache.estimate(transaction) == 31500
+    assert cache.estimate(transaction) == 31500
+    assert (cache.hits, cache.misses) == (1, 1)
+
+    # a call that can't be estimated falls back to the default and isn't cached
+    failing_call = {'from': get_random_address(), 'to': get_random_address(), 'value': 10 ** 30}
+    assert cache.estimate(failing_call, default=12345) == 12345
+    assert GasEstimateCache.call_shape(failing_call) not in cache.estimates
+    with pytest.raises(Exception):
+        cache.estimate(failing_call)
+
+
+def test_escalate_deadline_critical_transaction(
+        web3,
+        tx_manager,
+        get_random_address,
+        monkeypatch,
+):
+    state_db = tx_manager.state_db
+    tracker = ReceiptTracker(web3, state_db, tx_manager=tx_manager, escalation_blocks=2)
+    tracker.poll()
+    current_block = web3.eth.blockNumber
+    with monkeypatch.context() as m:
+        # the node accepts the transaction, but never mines it
+        m.setattr(web3.eth, 'sendRawTransaction', lambda raw_transaction: None)
+        tx_hash = tx_manager.send_transaction(
+            {'to': get_random_address(), 'value': 1, 'gas': 21000, 'gasPrice': 100},
+            kind='monitor',
+            channel_id=1,
+        )
+    result = tracker.track(tx_hash, deadline=current_block + 100)
+
+    # not stuck for long enough yet
+    tracker.escalate(current_block + 1)
+    assert tracker.escalations == 0
+    tracker.escalate(current_block + 2)
+    assert tracker.escalations == 1
+    # only the replacement is escalated further
+    assert [x.deadline for x in tracker.tracked.values()] == [None, current_block + 100]
+
+    tracker.poll()
+    receipt = result.get(timeout=0)
+    assert receipt['transactionHash'] != tx_hash
+    assert tracker.tracked == {}
+    assert web3.eth.getTransaction(receipt['transactionHash'])['gasPrice'] > 100
+    # mined transactions are not pending anymore
+    assert tx_manager.pending == {}
+    statuses = {tx['tx_hash']: tx['status'] for tx in state_db.get_transactions(1)}
+    assert statuses == {
+        tx_hash.hex(): 'replaced',
+        receipt['transactionHash'].hex(): 'mined',
+    }
+
+
+def test_rejected_replacement_is_retried(web3, tx_manager, get_random_address, monkeypatch):
+    tracker = ReceiptTracker(web3, tx_manager=tx_manager, escalation_blocks=2)
+    current_block = web3.eth.blockNumber
+
+    def underpriced(raw_transaction):
+        raise ValueError('replacement transaction underpriced')
+    with monkeypatch.context() as m:
+        m.setattr(web3.eth, 'sendRawTransaction', lambda raw_transaction: None)
+        tx_hash = tx_manager.send_transaction(
+            {'to': get_random_address(), 'value': 1, 'gas': 21000, 'gasPrice': 100},
+        )
+        tracker.track(tx_hash, deadline=current_block + 100)
+        m.setattr(web3.eth, 'sendRawTransaction', underpriced)
+        assert tx_manager.replace_transaction(tx_hash) is None
+        tracker.escalate(current_block + 2)
+
+    # the original is still pending and escalated again later
+    assert tx_manager.is_pending(tx_hash)
+    assert tracker.escalations == 0
+    [tracked] = tracker.tracked.values()
+    assert tracked.deadline == current_block + 100
+    assert tracked.sent_block == current_block + 2
+    tracker.escalate(current_block + 4)
+    assert tracker.escalations == 1
+    assert not tx_manager.is_pending(tx_hash)
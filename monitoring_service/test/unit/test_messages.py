@@ -0,0 +1,41 @@
+import json
+
+from monitoring_service.messages import MonitorRequestBatch, intercept_batches
+from raiden_libs.messages import MonitorRequest
+from raiden_libs.test.mocks.dummy_transport import DummyTransport
+
+
+def test_monitor_request_batch(get_random_monitor_request):
+    requests = [get_random_monitor_request() for _ in range(3)]
+    batch = MonitorRequestBatch(requests)
+    data = batch.serialize_full()
+    assert json.loads(data)['message_type'] == 'MonitorRequestBatch'
+
+    deserialized = MonitorRequestBatch.deserialize(data)
+    assert [x.serialize_data() for x in deserialized.monitor_requests] == [
+        x.serialize_data() for x in requests
+    ]
+
+
+def test_intercept_batches(get_random_monitor_request):
+    transport = DummyTransport()
+    messages, batches = [], []
+    transport.add_message_callback(messages.append)
+    intercept_batches(transport, batches.append)
+
+    request = get_random_monitor_request()
+    transport.receive_fake_data(MonitorRequestBatch([request]).serialize_full())
+    assert messages == []
+    assert len(batches) == 1
+
+    # other messages are handled by the transport
+    transport.receive_fake_data(request.serialize_full())
+    assert len(messages) == 1 and isinstance(messages[0], MonitorRequest)
+
+    # invalid batches are dropped
+    transport.receive_fake_data(json.dumps({
+        'message_type': 'MonitorRequestBatch',
+        'monitor_requests': [],
+    }))
+    transport.receive_fake_data('{"message_type": "MonitorRequestBatch"')
+    assert len(batches) == 1 and len(messages) == 1
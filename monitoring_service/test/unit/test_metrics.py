@@ -0,0 +1,89 @@
+from monitoring_service.metrics import (
+    Counter,
+    Gauge,
+    Histogram,
+    MetricsRegistry,
+    render,
+    rpc_metrics_middleware,
+    stats_gauges,
+)
+
+
+def test_render():
+    counter = Counter('requests_total', 'Requests', ['method'])
+    counter.inc(method='get')
+    counter.inc(2, method='get')
+    counter.inc(method='say "hi"\n')
+    gauge = Gauge('depth', 'Queue depth')
+    gauge.set(7)
+    histogram = Histogram('latency_seconds', 'Latency', buckets=(0.1, 1.0))
+    histogram.observe(0.05)
+    histogram.observe(0.1)
+    histogram.observe(0.5)
+    histogram.observe(3)
+
+    assert render([counter, gauge, histogram]) == (
+        '# HELP requests_total Requests\n'
+        '# TYPE requests_total counter\n'
+        'requests_total{method="get"} 3\n'
+        'requests_total{method="say \\"hi\\"\\n"} 1\n'
+        '# HELP depth Queue depth\n'
+        '# TYPE depth gauge\n'
+        'depth 7\n'
+        '# HELP latency_seconds Latency\n'
+        '# TYPE latency_seconds histogram\n'
+        'latency_seconds_bucket{le="0.1"} 2\n'
+        'latency_seconds_bucket{le="1.0"} 3\n'
+        'latency_seconds_bucket{le="+Inf"} 4\n'
+        'latency_seconds_sum 3.65\n'
+        'latency_seconds_count 4\n'
+    )
+
+
+def test_registry():
+    registry = MetricsRegistry()
+    counter = registry.counter('events_total', 'Events')
+    assert registry.metrics == {'events_total': counter}
+    try:
+        registry.gauge('events_total', 'Events')
+        assert False, 'Registered the same name twice'
+    except AssertionError as e:
+        assert 'already registered' in str(e)
+
+
+def test_histogram_time():
+    histogram = Histogram('duration_seconds', 'Duration', ['kind'])
+    with histogram.time(kind='a'):
+        pass
+    assert histogram.get(kind='a').count == 1
+    assert histogram.get(kind='b').count == 0
+
+
+def test_stats_gauges():
+    gauges = stats_gauges('ms_cache', {
+        'hits': 3,
+        'enabled': True,
+        'latency': None,
+        'rejected': {'close': 2},
+    })
+    assert [x.name for x in gauges] == ['ms_cache_enabled', 'ms_cache_hits', 'ms_cache_rejected']
+    assert 'ms_cache_enabled 1\n' in render(gauges)
+    assert 'ms_cache_rejected{key="close"} 2\n' in render(gauges)
+
+
+def test_rpc_metrics_middleware():
+    from monitoring_service.metrics import RPC_ERRORS, RPC_REQUESTS
+
+    def make_request(method, params):
+        if method == 'eth_fail':
+            return {'error': 'failed'}
+        return {'result': params}
+
+    middleware = rpc_metrics_middleware(make_request, None)
+    requests = RPC_REQUESTS.get(method='eth_fail')
+    errors = RPC_ERRORS.get(method='eth_fail')
+    assert middleware('eth_ok', [1]) == {'result': [1]}
+    middleware('eth_fail', [])
+    assert RPC_REQUESTS.get(method='eth_fail') == requests + 1
+    assert RPC_ERRORS.get(method='eth_fail') == errors + 1
+    assert RPC_ERRORS.get(method='eth_ok') == 0
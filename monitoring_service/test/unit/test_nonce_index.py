@@ -0,0 +1,27 @@
+from monitoring_service.nonce_index import NonceIndex
+from monitoring_service.test.mockups import StateDBMock
+
+
+def test_nonce_index(get_random_monitor_request):
+    request = get_random_monitor_request()
+    balance_proof = request.balance_proof
+    state_db = StateDBMock()
+    state_db.store_monitor_request(request)
+
+    index = NonceIndex()
+    index.load(state_db)
+    assert len(index) == 1
+    channel_id, signer = balance_proof.channel_identifier, request.non_closing_signer
+    assert index.is_stale(channel_id, signer, balance_proof.nonce)
+    assert not index.is_stale(channel_id, signer, balance_proof.nonce + 1)
+    # the partner's requests are indexed separately
+    assert not index.is_stale(channel_id, balance_proof.signer, balance_proof.nonce)
+
+    # nonces never decrease
+    index.update(channel_id, signer, balance_proof.nonce + 5)
+    index.update(channel_id, signer, balance_proof.nonce + 1)
+    assert index.is_stale(channel_id, signer, balance_proof.nonce + 5)
+
+    index.remove_channel(channel_id)
+    assert not index.is_stale(channel_id, signer, balance_proof.nonce)
+    assert index.stats() == {'entries': 0, 'stale': 2}
@@ -0,0 +1,37 @@
+from monitoring_service.pending import PendingBuffer
+
+
+def test_pending_buffer():
+    now = [0.0]
+    buffer = PendingBuffer(ttl=10, max_keys=2, max_items_per_key=2, clock=lambda: now[0])
+    assert buffer.add(1, 'a', 'A') is True
+    assert buffer.add(1, 'a', 'A') is False
+    buffer.add(1, 'b', 'B')
+    assert buffer.count(1) == 2
+    assert buffer.count(2) == 0
+    # the oldest item of a key is evicted
+    buffer.add(1, 'c', 'C')
+    assert buffer.pop(1) == ['B', 'C']
+    assert buffer.pop(1) == []
+
+    # the least recently used key is evicted
+    buffer.add(1, 'a', 'A')
+    buffer.add(2, 'a', 'A')
+    buffer.add(3, 'a', 'A')
+    assert buffer.pop(1) == []
+    assert len(buffer) == 2
+
+    # keys expire ttl seconds after their last item was added
+    now[0] = 5
+    buffer.add(3, 'b', 'B')
+    now[0] = 12
+    assert buffer.pop(2) == []
+    assert buffer.pop(3) == ['A', 'B']
+    assert buffer.stats() == {
+        'keys': 0,
+        'items': 0,
+        'buffered': 7,
+        'replayed': 4,
+        'expired': 1,
+        'evicted': 2,
+    }
@@ -0,0 +1,21 @@
+from monitoring_service.rate_limit import RateLimiter
+
+
+def test_rate_limiter():
+    now = [0.0]
+    limiter = RateLimiter('test', rate=2, burst=3, max_keys=2, clock=lambda: now[0])
+
+    assert [limiter.allow('a') for _ in range(4)] == [True, True, True, False]
+    # other keys have their own bucket
+    assert limiter.allow('b') is True
+
+    # tokens are refilled at the given rate, up to the burst size
+    now[0] = 0.5
+    assert [limiter.allow('a') for _ in range(2)] == [True, False]
+    now[0] = 100
+    assert [limiter.allow('a') for _ in range(4)] == [True, True, True, False]
+    assert limiter.stats() == {'allowed': 8, 'dropped': 3, 'keys': 2}
+
+    # least recently seen keys are forgotten
+    limiter.allow('c')
+    assert list(limiter.buckets) == ['a', 'c']
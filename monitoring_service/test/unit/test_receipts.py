@@ -0,0 +1,90 @@
+import gevent
+import pytest
+
+from monitoring_service import receipts
+from monitoring_service.exceptions import ReceiptTrackerStopped
+from monitoring_service.receipts import ReceiptTracker
+from monitoring_service.test.mockups import StateDBMock
+from monitoring_service.transactions import TransactionManager
+from raiden_libs.utils import private_key_to_address
+
+
+def test_receipt_tracker(web3, get_random_privkey, get_random_address, send_funds):
+    private_key = get_random_privkey()
+    send_funds(private_key_to_address(private_key))
+    state_db = StateDBMock()
+    tx_manager = TransactionManager(web3, private_key, state_db)
+    tracker = ReceiptTracker(web3, state_db, poll_interval=0.01)
+    tracker.poll()
+
+    tx_hashes = [
+        tx_manager.send_transaction(
+            {'to': get_random_address(), 'value': 1, 'gas': 21000, 'gasPrice': 1},
+            kind='transfer',
+            channel_id=1,
+        )
+        for _ in range(5)
+    ]
+    waiting = [gevent.spawn(tracker.wait, tx_hash) for tx_hash in tx_hashes]
+    gevent.sleep(0)
+    assert tracker.stats()['tracked'] == 5
+
+    tracker.start()
+    gevent.joinall(waiting, timeout=5, raise_error=True)
+    assert [g.value['transactionHash'] for g in waiting] == tx_hashes
+    # all receipts are fetched in one batch
+    assert tracker.stats()['batches'] == 1
+    assert tracker.stats()['mined'] == 5
+    assert all(x.blocks >= 1 for x in tracker.latencies)
+    assert all(tx['status'] == 'mined' for tx in state_db.get_transactions(1))
+
+    # stopping wakes up tasks waiting for a transaction that is never mined
+    waiting = gevent.spawn(tracker.wait, '0x' + '00' * 32)
+    gevent.sleep(0)
+    tracker.stop()
+    with pytest.raises(ReceiptTrackerStopped):
+        waiting.get(timeout=1)
+    tracker.join(timeout=1)
+
+
+def test_track_before_first_poll(web3):
+    tracker = ReceiptTracker(web3)
+    current_block = web3.eth.blockNumber
+    tracker.track('0x' + '00' * 32, deadline=current_block + 100)
+    [tracked] = tracker.tracked.values()
+    assert tracked.sent_block == current_block
+    assert tracked.tracked_block == current_block
+
+
+def test_failed_poll_is_retried(
+        web3,
+        get_random_privkey,
+        get_random_address,
+        send_funds,
+        monkeypatch,
+):
+    private_key = get_random_privkey()
+    send_funds(private_key_to_address(private_key))
+    tx_manager = TransactionManager(web3, private_key)
+    tracker = ReceiptTracker(web3, poll_interval=0.01)
+    tx_hash = tx_manager.send_transaction(
+        {'to': get_random_address(), 'value': 1, 'gas': 21000, 'gasPrice': 1},
+    )
+    result = tracker.track(tx_hash)
+    get_transaction_receipts = receipts.get_transaction_receipts
+    calls = []
+
+    def fail_once(web3, tx_hashes):
+        calls.append(tx_hashes)
+        if len(calls) == 1:
+            raise ValueError('node unavailable')
+        return get_transaction_receipts(web3, tx_hashes)
+    monkeypatch.setattr(receipts, 'get_transaction_receipts', fail_once)
+
+    # the tracker keeps running and fetches the receipts of the same block again
+    tracker.start()
+    assert result.get(timeout=5)['transactionHash'] == tx_hash
+    assert len(calls) == 2
+    assert not tracker.dead
+    tracker.stop()
+    tracker.join(timeout=1)
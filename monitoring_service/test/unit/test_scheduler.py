@@ -0,0 +1,57 @@
+import gevent
+import gevent.event
+
+from monitoring_service.scheduler import TransactionScheduler
+
+
+def test_scheduler_orders_by_deadline_and_reward():
+    release = gevent.event.Event()
+    started = []
+
+    def task(name):
+        def run():
+            started.append(name)
+            release.wait()
+        return gevent.Greenlet(run)
+
+    current_block = 100
+    scheduler = TransactionScheduler(1, lambda: current_block)
+    scheduler.schedule(task('first'), 1, 1000, 1)
+    scheduler.schedule(task('late'), 2, 500, 1)
+    scheduler.schedule(task('urgent'), 3, 200, 1)
+    scheduler.schedule(task('urgent-rich'), 4, 200, 10)
+    scheduler.schedule(task('missed'), 5, 50, 100)
+
+    assert [x['channel_identifier'] for x in scheduler.pending()] == [5, 4, 3, 2]
+    assert scheduler.pending()[1] == {
+        'channel_identifier': 4,
+        'settle_block': 200,
+        'remaining_blocks': 100,
+        'reward_amount': 10,
+    }
+
+    release.set()
+    scheduler.join()
+    assert started == ['first', 'urgent-rich', 'urgent', 'late']
+    assert scheduler.missed_deadlines == 1
+    assert scheduler.completed == 4
+    assert scheduler.queue_depth == 0
+
+
+def test_scheduler_without_head():
+    release = gevent.event.Event()
+    scheduler = TransactionScheduler(1, lambda: None)
+    scheduler.schedule(gevent.Greenlet(release.wait), 1, 1000, 1)
+    scheduler.schedule(gevent.Greenlet(release.wait), 2, 50, 1)
+
+    assert scheduler.pending() == [{
+        'channel_identifier': 2,
+        'settle_block': 50,
+        'remaining_blocks': None,
+        'reward_amount': 1,
+    }]
+
+    release.set()
+    scheduler.join()
+    assert scheduler.missed_deadlines == 0
+    assert scheduler.completed == 2
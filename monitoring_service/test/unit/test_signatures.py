@@ -0,0 +1,44 @@
+import gevent
+
+from monitoring_service.signatures import (
+    SignatureRecoveryPool,
+    monitor_request_signed_data,
+    non_closing_signed_data,
+    recover_signers,
+)
+
+
+def test_signature_recovery_pool(get_monitor_request_for_same_channel):
+    monitor_requests = [get_monitor_request_for_same_channel(user=i % 2) for i in range(10)]
+    monitor_requests[3].reward_proof_signature = '0x' + '0' * 130
+    expected = [
+        [mr.balance_proof.signer, mr.non_closing_signer, mr.reward_proof_signer]
+        for mr in monitor_requests
+        if mr is not monitor_requests[3]
+    ]
+
+    pool = SignatureRecoveryPool(workers=2, batch_size=8)
+    try:
+        greenlets = [
+            gevent.spawn(pool.recover, monitor_request_signed_data(mr))
+            for mr in monitor_requests
+        ]
+        gevent.joinall(greenlets, timeout=60, raise_error=True)
+    finally:
+        pool.shutdown()
+
+    signers = [g.value for g in greenlets]
+    assert signers[3][2] is None
+    del signers[3]
+    assert signers == expected
+    # requests of all greenlets are recovered in 30 / 8 batches
+    assert pool.batches == 4
+    assert pool.recovered == 30
+
+    # without workers, recovery is done inline
+    inline_pool = SignatureRecoveryPool()
+    assert inline_pool.recover(monitor_request_signed_data(monitor_requests[0])) == expected[0]
+    assert inline_pool.recover([non_closing_signed_data(monitor_requests[0])]) == [
+        monitor_requests[0].non_closing_signer,
+    ]
+    assert recover_signers([(b'data', b'\x00' * 65)]) == [None]
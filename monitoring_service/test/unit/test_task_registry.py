@@ -0,0 +1,71 @@
+import gevent
+import gevent.event
+import pytest
+
+from monitoring_service.task_registry import TaskRegistry
+from monitoring_service.validation_pool import ValidationPool
+
+
+def test_task_registry():
+    release = gevent.event.Event()
+    registry = TaskRegistry()
+    assert registry.join(timeout=0) is True
+
+    def fail():
+        raise ValueError('task failed')
+
+    registry.start(gevent.Greenlet(lambda: release.wait() and 'ok'))
+    failing_task = gevent.Greenlet(fail)
+    # don't let the failing task end up in the hub's error handler
+    failing_task.link_exception(lambda task: None)
+    registry.start(failing_task)
+    assert len(registry) == 2
+    gevent.sleep(0)
+    assert registry.join(timeout=0) is False
+
+    release.set()
+    assert registry.join(timeout=1) is True
+    assert len(registry) == 0
+    assert (registry.started, registry.completed, registry.failed) == (2, 1, 1)
+
+    results = sorted(registry.results, key=lambda r: r.successful)
+    assert [r.successful for r in results] == [False, True]
+    assert isinstance(results[0].value, ValueError)
+    assert results[1].value == 'ok'
+    assert all(r.latency >= 0 for r in results)
+
+
+@pytest.mark.parametrize('pool_size', [1, 3])
+def test_task_registry_waits_for_queued_tasks(pool_size):
+    registry = TaskRegistry()
+    pool = ValidationPool(pool_size, 100, task_registry=registry)
+    tasks = [gevent.Greenlet(gevent.sleep, 0.001) for _ in range(10)]
+    for task in tasks:
+        pool.submit(task)
+
+    assert registry.join(timeout=1) is True
+    assert all(task.ready() for task in tasks)
+    assert registry.completed == 10
+
+
+def test_task_registry_coalesces_tasks_by_key():
+    release = gevent.event.Event()
+    registry = TaskRegistry()
+    first = gevent.Greenlet(release.wait)
+    assert registry.coalesce('key', first) is first
+    # not started yet, but already in flight
+    assert registry.coalesce('key', gevent.Greenlet(release.wait)) is first
+    registry.start(first)
+    assert registry.coalesce('key', gevent.Greenlet(release.wait)) is first
+    assert registry.coalesced == 2
+
+    release.set()
+    registry.join()
+    assert registry.keyed == {}
+    second = gevent.Greenlet(release.wait)
+    assert registry.coalesce('key', second) is second
+
+    # a task that is never started (e.g. missed deadline) frees the key when killed
+    second.kill(block=False)
+    gevent.sleep(0)
+    assert registry.keyed == {}
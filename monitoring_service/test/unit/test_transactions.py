@@ -0,0 +1,110 @@
+import gevent
+import pytest
+
+from monitoring_service.transactions import TransactionManager
+from raiden_libs.utils import private_key_to_address
+
+
+@pytest.fixture
+def tx_manager(web3, get_random_privkey, send_funds):
+    private_key = get_random_privkey()
+    send_funds(private_key_to_address(private_key))
+    return TransactionManager(web3, private_key)
+
+
+def value_transfer(web3, to):
+    return {
+        'to': to,
+        'value': 1,
+        'gas': 21000,
+        'gasPrice': web3.eth.gasPrice,
+    }
+
+
+def test_concurrent_transactions(web3, tx_manager, get_random_address):
+    receiver = get_random_address()
+    start_nonce = web3.eth.getTransactionCount(tx_manager.address)
+    greenlets = [
+        gevent.spawn(tx_manager.send_transaction, value_transfer(web3, receiver))
+        for _ in range(10)
+    ]
+    gevent.joinall(greenlets, raise_error=True)
+
+    assert len(set(g.value for g in greenlets)) == 10
+    assert sorted(tx_manager.pending) == list(range(start_nonce, start_nonce + 10))
+    assert web3.eth.getTransactionCount(tx_manager.address) == start_nonce + 10
+    assert web3.eth.getBalance(receiver) == 10
+
+    tx_manager.resync()
+    assert tx_manager.pending == {}
+    assert tx_manager.next_nonce == start_nonce + 10
+
+
+def test_failed_transaction_releases_nonce(web3, tx_manager, get_random_address, monkeypatch):
+    receiver = get_random_address()
+    start_nonce = web3.eth.getTransactionCount(tx_manager.address)
+
+    def fail(raw_transaction):
+        raise ValueError('node unavailable')
+    with monkeypatch.context() as m:
+        m.setattr(web3.eth, 'sendRawTransaction', fail)
+        with pytest.raises(ValueError):
+            tx_manager.send_transaction(value_transfer(web3, receiver))
+    assert tx_manager.released_nonces == [start_nonce]
+
+    # the next transaction fills the gap
+    tx_manager.send_transaction(value_transfer(web3, receiver))
+    assert list(tx_manager.pending) == [start_nonce]
+    assert web3.eth.getTransactionCount(tx_manager.address) == start_nonce + 1
+
+
+def test_already_known_transaction(web3, tx_manager, get_random_address, monkeypatch):
+    receiver = get_random_address()
+    start_nonce = web3.eth.getTransactionCount(tx_manager.address)
+    send_raw_transaction = web3.eth.sendRawTransaction
+
+    def already_known(raw_transaction):
+        send_raw_transaction(raw_transaction)
+        raise ValueError('already known')
+    with monkeypatch.context() as m:
+        m.setattr(web3.eth, 'sendRawTransaction', already_known)
+        tx_hash = tx_manager.send_transaction(value_transfer(web3, receiver))
+
+    # the transaction is not sent a second time
+    assert tx_manager.released_nonces == []
+    assert tx_manager.pending[start_nonce].tx_hash == tx_hash
+    assert web3.eth.getTransactionCount(tx_manager.address) == start_nonce + 1
+    assert web3.eth.getBalance(receiver) == 1
+
+
+def test_failed_transaction_gap_is_filled(web3, tx_manager, get_random_address, monkeypatch):
+    receiver = get_random_address()
+    start_nonce = web3.eth.getTransactionCount(tx_manager.address)
+    send_raw_transaction = web3.eth.sendRawTransaction
+    calls = []
+
+    def send(raw_transaction):
+        calls.append(raw_transaction)
+        if len(calls) == 1:
+            # the next transaction is sent in the meantime
+            gevent.sleep(0.01)
+            raise ValueError('node unavailable')
+        if len(calls) == 2:
+            # eth-tester rejects nonce gaps, so this one is only pretended to be sent
+            return None
+        return send_raw_transaction(raw_transaction)
+    with monkeypatch.context() as m:
+        m.setattr(web3.eth, 'sendRawTransaction', send)
+        failing = gevent.spawn(tx_manager.send_transaction, value_transfer(web3, receiver))
+        gevent.sleep(0)
+        tx_manager.send_transaction(value_transfer(web3, receiver))
+        with pytest.raises(ValueError):
+            failing.get()
+
+    # the released nonce is used for a transfer to ourselves right away
+    assert len(calls) == 3
+    assert tx_manager.released_nonces == []
+    assert sorted(tx_manager.pending) == [start_nonce, start_nonce + 1]
+    assert tx_manager.pending[start_nonce].kind == 'fill'
+    assert web3.eth.getTransactionCount(tx_manager.address) == start_nonce + 1
+    assert web3.eth.getBalance(receiver) == 0
@@ -0,0 +1,76 @@
+import json
+
+import pytest
+from hexbytes import HexBytes
+from web3 import HTTPProvider, Web3
+
+from monitoring_service import utils
+
+TX_HASH = '0x' + '11' * 32
+
+
+@pytest.fixture
+def http_web3(monkeypatch):
+    """Web3 with an HTTP provider, answering batches with `http_web3.responses`"""
+    web3 = Web3(HTTPProvider('http://localhost:8545'))
+    web3.requests = []
+
+    def make_post_request(endpoint_uri, data, **kwargs):
+        payload = json.loads(data)
+        web3.requests.append(payload)
+        # nodes don't have to keep the order of the batch
+        return json.dumps([
+            dict(web3.responses[x['id']], jsonrpc='2.0', id=x['id'])
+            for x in reversed(payload)
+        ]).encode()
+    monkeypatch.setattr(utils, 'make_post_request', make_post_request)
+    return web3
+
+
+def test_rpc_batch_http(http_web3):
+    http_web3.responses = [
+        {'result': '0x10'},
+        {'result': {
+            'transactionHash': TX_HASH,
+            'blockHash': '0x' + '22' * 32,
+            'blockNumber': '0x5',
+            'transactionIndex': '0x0',
+            'from': '0x' + 'aa' * 20,
+            'to': '0x' + 'bb' * 20,
+            'cumulativeGasUsed': '0x5208',
+            'gasUsed': '0x5208',
+            'contractAddress': None,
+            'logs': [],
+            'status': '0x1',
+        }},
+        {'result': None},
+    ]
+    block_number, receipt, missing = utils.rpc_batch(http_web3, [
+        ('eth_blockNumber', []),
+        ('eth_getTransactionReceipt', [TX_HASH]),
+        ('eth_getTransactionReceipt', [TX_HASH]),
+    ])
+    assert len(http_web3.requests) == 1
+    assert [x['method'] for x in http_web3.requests[0]] == [
+        'eth_blockNumber',
+        'eth_getTransactionReceipt',
+        'eth_getTransactionReceipt',
+    ]
+    # results are formatted like web3's own
+    assert block_number == 16
+    assert receipt['blockNumber'] == 5
+    assert receipt['status'] == 1
+    assert receipt['transactionHash'] == HexBytes(TX_HASH)
+    assert missing is None
+
+    http_web3.responses = http_web3.responses[1:]
+    assert utils.get_transaction_receipts(http_web3, [TX_HASH])[0]['gasUsed'] == 21000
+
+
+def test_rpc_batch_http_error(http_web3):
+    http_web3.responses = [
+        {'result': '0x10'},
+        {'error': {'code': -32000, 'message': 'node unavailable'}},
+    ]
+    with pytest.raises(ValueError):
+        utils.rpc_batch(http_web3, [('eth_blockNumber', []), ('eth_gasPrice', [])])
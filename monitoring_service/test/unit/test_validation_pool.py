@@ -0,0 +1,132 @@
+import gevent
+import gevent.event
+
+from monitoring_service.validation_pool import OverflowPolicy, ValidationPool
+
+
+def blocked_task(release: gevent.event.Event, value=None):
+    return gevent.Greenlet(lambda: release.wait() and value)
+
+
+def test_pool_limits_concurrency():
+    release = gevent.event.Event()
+    pool = ValidationPool(2, 10)
+    tasks = [blocked_task(release, i) for i in range(5)]
+    for task in tasks:
+        assert pool.submit(task) is True
+    gevent.sleep(0)
+
+    assert pool.in_flight == 2
+    assert pool.queue_depth == 3
+    assert pool.max_queue_depth == 3
+
+    release.set()
+    pool.join()
+    assert pool.queue_depth == 0
+    assert pool.in_flight == 0
+    assert pool.completed == 5
+    assert [task.value for task in tasks] == [0, 1, 2, 3, 4]
+
+
+def test_pool_drop_oldest():
+    release = gevent.event.Event()
+    pool = ValidationPool(1, 2, OverflowPolicy.DROP_OLDEST)
+    tasks = [blocked_task(release, i) for i in range(5)]
+    for task in tasks:
+        assert pool.submit(task) is True
+
+    assert pool.dropped == 2
+    assert list(pool.queue) == tasks[3:]
+    release.set()
+    pool.join()
+    assert pool.completed == 3
+    assert tasks[1].ready() is False and tasks[2].ready() is False
+
+
+def test_pool_drop_newest():
+    release = gevent.event.Event()
+    pool = ValidationPool(1, 2, OverflowPolicy.DROP_NEWEST)
+    tasks = [blocked_task(release, i) for i in range(5)]
+    results = [pool.submit(task) for task in tasks]
+
+    assert results == [True, True, True, False, False]
+    assert pool.dropped == 2
+    assert list(pool.queue) == tasks[1:3]
+    release.set()
+    pool.join()
+    assert pool.completed == 3
+
+
+def test_pool_block():
+    release = gevent.event.Event()
+    pool = ValidationPool(1, 1, OverflowPolicy.BLOCK)
+    tasks = [blocked_task(release, i) for i in range(3)]
+    pool.submit(tasks[0])
+    pool.submit(tasks[1])
+
+    # the third submission blocks until there's space in the queue
+    submitter = gevent.spawn(pool.submit, tasks[2])
+    gevent.sleep(0.01)
+    assert submitter.ready() is False
+
+    release.set()
+    submitter.join()
+    assert submitter.value is True
+    pool.join()
+    assert pool.dropped == 0
+    assert pool.completed == 3
+
+
+def test_pool_supersedes_queued_task():
+    release = gevent.event.Event()
+    pool = ValidationPool(1, 10)
+    tasks = [blocked_task(release, i) for i in range(5)]
+    pool.submit(tasks[0], key='a')
+    pool.submit(tasks[1], key='a')
+    pool.submit(tasks[2], key='b')
+    pool.submit(tasks[3], key='a')
+    pool.submit(tasks[4])
+
+    # the running task isn't superseded, only the queued one
+    assert list(pool.queue) == [tasks[3], tasks[2], tasks[4]]
+    assert pool.superseded == 1
+    release.set()
+    pool.join()
+    assert pool.completed == 4
+    assert tasks[1].ready() is False
+    assert pool.queued_keys == {} and pool.task_keys == {}
+
+
+def test_pool_on_discard():
+    release = gevent.event.Event()
+    discarded = []
+    pool = ValidationPool(1, 1, OverflowPolicy.DROP_NEWEST, on_discard=discarded.append)
+    tasks = [blocked_task(release, i) for i in range(4)]
+    pool.submit(tasks[0])
+    pool.submit(tasks[1], key='a')
+    pool.submit(tasks[2], key='a')
+    pool.submit(tasks[3])
+    assert discarded == [tasks[1], tasks[3]]
+    release.set()
+    pool.join()
+
+
+def test_pool_keeps_higher_version():
+    release = gevent.event.Event()
+    discarded = []
+    pool = ValidationPool(1, 10, on_discard=discarded.append)
+    tasks = [blocked_task(release, i) for i in range(4)]
+    pool.submit(tasks[0])
+    assert pool.submit(tasks[1], key='a', version=5) is True
+    # an older version doesn't replace the queued one
+    assert pool.submit(tasks[2], key='a', version=3) is False
+    assert list(pool.queue) == [tasks[1]]
+    assert pool.submit(tasks[3], key='a', version=7) is True
+    assert list(pool.queue) == [tasks[3]]
+    assert discarded == [tasks[2], tasks[1]]
+    assert pool.superseded == 2
+
+    release.set()
+    pool.join()
+    assert pool.completed == 2
+    assert pool.task_versions == {}
@@ -1,59 +1,144 @@
+import itertools
 import json
 import logging
+import os
 import random
 
 import gevent
 import requests
+from eth_abi import encode_abi
+from eth_utils import encode_hex, function_abi_to_4byte_selector
 
+from monitoring_service.constants import DEFAULT_SETTLE_TIMEOUT
 from monitoring_service.tools.random_channel import RandomChannelDB
 from raiden_contracts.constants import ChannelEvent
+from raiden_contracts.contract_manager import ContractManager, contracts_precompiled_path
 
 log = logging.getLogger(__name__)
 
 API_PATH = '/api/1/events'
+# number of events sent in one request
+DEFAULT_BATCH_SIZE = 20
+
+
+def encode_contract_call(contract_abi: list, function_name: str, args: list) -> str:
+    """Call data of a contract function call"""
+    function_abi = next(
+        x for x in contract_abi
+        if x['type'] == 'function' and x['name'] == function_name
+    )
+    arg_types = [x['type'] for x in function_abi['inputs']]
+    return encode_hex(function_abi_to_4byte_selector(function_abi) + encode_abi(arg_types, args))
+
+
+def make_event(
+    name: str,
+    args: dict,
+    token_network_address: str,
+    block_number: int,
+    call_data: str,
+) -> dict:
+    """Event in the format of the blockchain listener. The events don't come
+    from real transactions, so the call data of their transaction is included."""
+    return {
+        'event': name,
+        'args': args,
+        'transactionHash': '0x' + os.urandom(32).hex(),
+        'blockNumber': block_number,
+        'address': token_network_address,
+        'transaction': {'input': call_data},
+    }
 
 
 class EventGenerator(gevent.Greenlet):
-    def __init__(self, host: str, seed: int) -> None:
+    def __init__(
+        self,
+        host: str,
+        seed: int,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        token_network_address: str = None,
+    ) -> None:
         super().__init__()
         self.db = RandomChannelDB(seed)
         self.uri = host + API_PATH
         self.headers = {'Content-Type': 'application/json'}
         self.is_running = gevent.event.Event()
+        self.batch_size = batch_size
+        self.events: list = []
+        self.token_network_address = token_network_address or self.db.get_random_address()
+        self.token_network_abi = ContractManager(
+            contracts_precompiled_path(),
+        ).get_contract_abi('TokenNetwork')
+        self.channel_ids = itertools.count(1)
+        # every event is emitted in a block of its own
+        self.block_numbers = itertools.count(1)
+
+    def make_event(self, name: str, args: dict, function_name: str, call_args: list) -> dict:
+        return make_event(
+            name,
+            args,
+            self.token_network_address,
+            next(self.block_numbers),
+            encode_contract_call(self.token_network_abi, function_name, call_args),
+        )
 
     def create_channel(self):
-        channel_data = self.db.new_channel()
-        self.put_event(
+        channel = self.db.new_channel()
+        channel['channel_identifier'] = next(self.channel_ids)
+        self.put_event(self.make_event(
+            ChannelEvent.OPENED,
             {
-                'name': ChannelEvent.OPENED,
-                'data': channel_data,
+                'channel_identifier': channel['channel_identifier'],
+                'participant1': channel['participant1'],
+                'participant2': channel['participant2'],
+                'settle_timeout': DEFAULT_SETTLE_TIMEOUT,
             },
-        )
+            'openChannel',
+            [channel['participant1'], channel['participant2'], DEFAULT_SETTLE_TIMEOUT],
+        ))
 
     def put_event(self, event):
-        while self.is_running.is_set():
-            try:
-                requests.put(self.uri, data=json.dumps(event), headers=self.headers)
-            except requests.exceptions.ConnectionError as e:
-                log.warn("Can't POST to %s: %s" % (self.uri, str(e)))
-            finally:
-                return
-            gevent.sleep(1)
+        """Queue an event, events are sent once a batch is full"""
+        self.events.append(event)
+        if len(self.events) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        """Send all queued events in one request"""
+        events, self.events = self.events, []
+        if len(events) == 0:
+            return
+        try:
+            requests.put(self.uri, data=json.dumps(events), headers=self.headers)
+        except requests.exceptions.ConnectionError as e:
+            log.warn("Can't PUT to %s: %s" % (self.uri, str(e)))
 
     def delete_channel(self):
         if len(self.db.channel_db) == 0:
             return {}
         channel = random.choice(self.db.channel_db)
         self.db.channel_db.remove(channel)
-        self.put_event(
+        self.put_event(self.make_event(
+            ChannelEvent.CLOSED,
             {
-                'name': ChannelEvent.CLOSED,
-                'data': channel,
+                'channel_identifier': channel['channel_identifier'],
+                'closing_participant': channel['participant1'],
+                'nonce': channel['nonce'],
             },
-        )
+            'closeChannel',
+            [
+                channel['channel_identifier'],
+                channel['participant2'],
+                os.urandom(32),
+                channel['nonce'],
+                os.urandom(32),
+                os.urandom(65),
+            ],
+        ))
 
     def stop(self):
         self.is_running.clear()
+        self.flush()
 
     def _run(self):
         self.is_running.set()
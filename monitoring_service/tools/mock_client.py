@@ -4,10 +4,10 @@ import random
 import click
 import gevent
 
-from monitoring_service.messages import BalanceProof
 from monitoring_service.tools.eventgen import EventGenerator
 from monitoring_service.tools.random_channel import SeededRandomizer, use_random_state
 from monitoring_service.transport import MatrixTransport
+from raiden_libs.messages import BalanceProof
 
 log = logging.getLogger(__name__)
 
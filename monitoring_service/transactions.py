@@ -0,0 +1,391 @@
+import heapq
+import logging
+from enum import Enum
+from typing import Dict, List, NamedTuple, Optional
+
+import gevent.lock
+import rlp
+from eth_account.internal.transactions import Transaction
+from eth_utils import to_checksum_address
+from hexbytes import HexBytes
+from web3 import Web3
+
+from monitoring_service.gas import GasEstimateCache, GasPriceOracle
+from monitoring_service.state_db import StateDB
+from raiden_libs.types import ChannelIdentifier
+from raiden_libs.utils import private_key_to_address
+
+log = logging.getLogger(__name__)
+
+# substrings of node errors which mean that the transaction is already in the pool
+KNOWN_TRANSACTION_ERRORS = (
+    'known transaction',
+    'already known',
+)
+# substrings of node errors which mean that our local nonce is out of sync
+NONCE_ERRORS = (
+    'nonce too low',
+    'nonce is too low',
+)
+# substrings of node errors which mean that another transaction with the same
+# nonce and a similar gas price is already in the pool
+UNDERPRICED_ERRORS = (
+    'replacement transaction underpriced',
+)
+
+
+class TransactionStatus(str, Enum):
+    """Status of a transaction in the outbox"""
+    SIGNED = 'signed'
+    PENDING = 'pending'
+    MINED = 'mined'
+    FAILED = 'failed'
+    REPLACED = 'replaced'
+
+
+class PendingTransaction(NamedTuple):
+    nonce: int
+    tx_hash: HexBytes
+    raw_transaction: HexBytes
+    transaction: Dict
+    kind: Optional[str] = None
+    channel_id: Optional[ChannelIdentifier] = None
+    deadline: Optional[int] = None
+
+
+class TransactionManager:
+    """Signs and broadcasts transactions for a single account.
+
+    Nonces are assigned locally, so any number of greenlets can submit
+    transactions at the same time without racing on (or waiting for) the
+    node's transaction count. If a transaction can't be broadcast, its nonce
+    is reused by the next transaction so no gap is left behind. If later
+    transactions are already pending, the gap is filled right away by a
+    transfer to ourselves. Whenever the node rejects a nonce, the local
+    state is resynced with the node.
+
+    If a `state_db` is given, transactions sent on behalf of a channel are
+    recorded in its outbox before they are broadcast.
+
+    Missing gas prices are taken from the `gas_price_oracle`, missing gas
+    limits from a cache of gas estimates.
+    """
+    def __init__(
+        self,
+        web3: Web3,
+        private_key: str,
+        state_db: StateDB = None,
+        gas_price_oracle: GasPriceOracle = None,
+    ) -> None:
+        self.web3 = web3
+        self.state_db = state_db
+        self.gas_price_oracle = gas_price_oracle or GasPriceOracle(web3)
+        self.gas_estimates = GasEstimateCache(web3)
+        self.private_key = private_key
+        self.address = private_key_to_address(private_key)
+        self.chain_id = int(web3.version.network)
+        self.lock = gevent.lock.Semaphore()
+        self.next_nonce: Optional[int] = None
+        # nonces that were assigned, but never made it to the node
+        self.released_nonces: List[int] = []
+        # nonce => transaction sent, but not known to be mined yet
+        self.pending: Dict[int, PendingTransaction] = {}
+
+    def send_transaction(
+        self,
+        transaction: Dict,
+        kind: str = None,
+        channel_id: ChannelIdentifier = None,
+        gas_limit: int = None,
+        deadline: int = None,
+    ) -> HexBytes:
+        """Assign a nonce to `transaction`, sign it and broadcast it.
+        If the node rejects the nonce, resync and try once more.
+
+        `gas_limit` is used if the transaction has no gas limit and the gas
+        can't be estimated. The `deadline` block is recorded in the outbox."""
+        transaction = self.fill_gas(transaction, gas_limit)
+        try:
+            return self._send_transaction(transaction, kind, channel_id, deadline)
+        except Exception as e:
+            # a new transaction colliding with one in the pool means the nonce is used
+            if not (is_nonce_error(e) or is_underpriced_error(e)):
+                raise
+            log.warning('Nonce rejected by the node (%s), resyncing' % e)
+            self.resync()
+            return self._send_transaction(transaction, kind, channel_id, deadline)
+
+    def _send_transaction(
+        self,
+        transaction: Dict,
+        kind: Optional[str],
+        channel_id: Optional[ChannelIdentifier],
+        deadline: Optional[int],
+    ) -> HexBytes:
+        nonce = self.reserve_nonce()
+        transaction = dict(transaction, nonce=nonce, chainId=self.chain_id)
+        transaction.pop('from', None)
+        signed = self.web3.eth.account.signTransaction(transaction, self.private_key)
+        tx_hash = HexBytes(signed.hash)
+        state_db = self.state_db if channel_id is not None else None
+        if state_db is not None:
+            state_db.store_transaction(
+                tx_hash.hex(),
+                kind or '',
+                channel_id,
+                nonce,
+                HexBytes(signed.rawTransaction).hex(),
+                TransactionStatus.SIGNED.value,
+                deadline,
+            )
+        try:
+            self.web3.eth.sendRawTransaction(signed.rawTransaction)
+        except Exception as e:
+            # the node already has this very transaction, so it was broadcast
+            if not is_known_transaction_error(e):
+                self.release_nonce(nonce)
+                if state_db is not None:
+                    state_db.update_transaction_status(
+                        tx_hash.hex(),
+                        TransactionStatus.FAILED.value,
+                    )
+                raise
+        if state_db is not None:
+            state_db.update_transaction_status(tx_hash.hex(), TransactionStatus.PENDING.value)
+        self.pending[nonce] = PendingTransaction(
+            nonce,
+            tx_hash,
+            signed.rawTransaction,
+            transaction,
+            kind,
+            channel_id,
+            deadline,
+        )
+        log.debug('Sent transaction %s (nonce=%d)' % (tx_hash.hex(), nonce))
+        return tx_hash
+
+    def fill_gas(self, transaction: Dict, gas_limit: int = None) -> Dict:
+        """Fill in the gas price and gas limit if they're missing"""
+        transaction = dict(transaction)
+        if 'gasPrice' not in transaction:
+            transaction['gasPrice'] = self.gas_price_oracle.suggest()
+        if 'gas' not in transaction:
+            transaction['gas'] = self.gas_estimates.estimate(
+                dict(transaction, **{'from': self.address}),
+                default=gas_limit,
+            )
+        return transaction
+
+    def replace_transaction(self, tx_hash: HexBytes) -> Optional[HexBytes]:
+        """Replace a pending transaction by the same transaction paying a
+        higher gas price (replace-by-fee). Returns the hash of the replacement,
+        or None if the transaction isn't pending anymore or its price can't
+        be raised (in which case it stays pending)."""
+        tx_hash = HexBytes(tx_hash)
+        pending = next((x for x in self.pending.values() if x.tx_hash == tx_hash), None)
+        if pending is None:
+            return None
+        gas_price = self.gas_price_oracle.replacement_price(pending.transaction['gasPrice'])
+        if gas_price is None:
+            log.warning('Gas price of %s is already at the maximum' % tx_hash.hex())
+            return None
+        transaction = dict(pending.transaction, gasPrice=gas_price)
+        signed = self.web3.eth.account.signTransaction(transaction, self.private_key)
+        new_tx_hash = HexBytes(signed.hash)
+        state_db = self.state_db if pending.channel_id is not None else None
+        if state_db is not None:
+            state_db.store_transaction(
+                new_tx_hash.hex(),
+                pending.kind or '',
+                pending.channel_id,
+                pending.nonce,
+                HexBytes(signed.rawTransaction).hex(),
+                TransactionStatus.SIGNED.value,
+                pending.deadline,
+            )
+        try:
+            self.web3.eth.sendRawTransaction(signed.rawTransaction)
+        except Exception as e:
+            if not is_known_transaction_error(e):
+                if state_db is not None:
+                    state_db.update_transaction_status(
+                        new_tx_hash.hex(),
+                        TransactionStatus.FAILED.value,
+                    )
+                if is_nonce_error(e):
+                    # the original transaction has been mined in the meantime
+                    return None
+                if is_underpriced_error(e):
+                    log.warning(
+                        'Replacement of %s rejected by the node: %s' % (tx_hash.hex(), e),
+                    )
+                    return None
+                raise
+        if state_db is not None:
+            state_db.update_transaction_status(
+                tx_hash.hex(),
+                TransactionStatus.REPLACED.value,
+            )
+            state_db.update_transaction_status(
+                new_tx_hash.hex(),
+                TransactionStatus.PENDING.value,
+            )
+        self.pending[pending.nonce] = pending._replace(
+            tx_hash=new_tx_hash,
+            raw_transaction=signed.rawTransaction,
+            transaction=transaction,
+        )
+        log.info(
+            'Replaced transaction %s with %s (nonce=%d, gas price=%d)' %
+            (tx_hash.hex(), new_tx_hash.hex(), pending.nonce, gas_price),
+        )
+        return new_tx_hash
+
+    def resume_transaction(self, tx: Dict) -> None:
+        """Keep track of a pending outbox record `tx` sent before a restart, so
+        that it can be replaced"""
+        raw_transaction = HexBytes(tx['raw_transaction'])
+        decoded = rlp.decode(raw_transaction, Transaction)
+        transaction = {
+            'to': to_checksum_address(decoded.to),
+            'value': decoded.value,
+            'gas': decoded.gas,
+            'gasPrice': decoded.gasPrice,
+            'data': HexBytes(decoded.data).hex(),
+            'nonce': decoded.nonce,
+            'chainId': self.chain_id,
+        }
+        with self.lock:
+            self.pending[tx['nonce']] = PendingTransaction(
+                tx['nonce'],
+                HexBytes(tx['tx_hash']),
+                raw_transaction,
+                transaction,
+                tx['kind'],
+                tx['channel_identifier'],
+                tx['deadline'],
+            )
+            if self.next_nonce is not None:
+                self.next_nonce = max(self.next_nonce, tx['nonce'] + 1)
+
+    def is_pending(self, tx_hash: HexBytes) -> bool:
+        """Whether `tx_hash` is the latest version of a pending transaction"""
+        tx_hash = HexBytes(tx_hash)
+        return any(x.tx_hash == tx_hash for x in self.pending.values())
+
+    def forget_transaction(self, tx_hash: HexBytes) -> None:
+        """Stop keeping track of a transaction that has been mined"""
+        tx_hash = HexBytes(tx_hash)
+        for nonce, pending in list(self.pending.items()):
+            if pending.tx_hash == tx_hash:
+                del self.pending[nonce]
+
+    def reserve_nonce(self) -> int:
+        """Return a nonce for a new transaction. Gaps left by failed transactions
+        are filled first."""
+        with self.lock:
+            if len(self.released_nonces) > 0:
+                return heapq.heappop(self.released_nonces)
+            if self.next_nonce is None:
+                self.next_nonce = self.web3.eth.getTransactionCount(self.address, 'pending')
+            nonce = self.next_nonce
+            self.next_nonce += 1
+            return nonce
+
+    def release_nonce(self, nonce: int) -> None:
+        """Give back a nonce of a transaction that was never broadcast. Pending
+        transactions with higher nonces can't be mined until the gap is
+        filled, so in that case it's filled right away."""
+        heapq.heappush(self.released_nonces, nonce)
+        if any(x > nonce for x in self.pending):
+            self.fill_nonce_gap(nonce)
+
+    def fill_nonce_gap(self, nonce: int) -> None:
+        """Use a released nonce for a zero-value transfer to ourselves"""
+        with self.lock:
+            if nonce not in self.released_nonces:
+                # already reused by another transaction
+                return
+            self.released_nonces.remove(nonce)
+            heapq.heapify(self.released_nonces)
+        transaction = {
+            'to': self.address,
+            'value': 0,
+            'gas': 21000,
+            'gasPrice': self.gas_price_oracle.cached_price(),
+            'nonce': nonce,
+            'chainId': self.chain_id,
+        }
+        signed = self.web3.eth.account.signTransaction(transaction, self.private_key)
+        try:
+            self.web3.eth.sendRawTransaction(signed.rawTransaction)
+        except Exception as e:
+            if not is_known_transaction_error(e):
+                log.error('Could not fill the gap at nonce %d: %s' % (nonce, e))
+                heapq.heappush(self.released_nonces, nonce)
+                return
+        tx_hash = HexBytes(signed.hash)
+        self.pending[nonce] = PendingTransaction(
+            nonce,
+            tx_hash,
+            signed.rawTransaction,
+            transaction,
+            'fill',
+        )
+        log.info('Filled the gap at nonce %d with %s' % (nonce, tx_hash.hex()))
+
+    def resync(self) -> None:
+        """Reload nonce state from the node. Pending transactions that were mined
+        (or replaced) are forgotten, the ones dropped by the node are rebroadcast."""
+        with self.lock:
+            node_nonce = self.web3.eth.getTransactionCount(self.address, 'pending')
+            self.check_pending()
+            self.released_nonces = [n for n in self.released_nonces if n >= node_nonce]
+            heapq.heapify(self.released_nonces)
+            local_nonce = max(self.pending) + 1 if len(self.pending) > 0 else 0
+            self.next_nonce = max(node_nonce, local_nonce)
+
+    def check_pending(self) -> None:
+        """Handle transactions that are stuck or were replaced"""
+        mined_nonce = self.web3.eth.getTransactionCount(self.address, 'latest')
+        for nonce, pending in sorted(self.pending.items()):
+            if nonce < mined_nonce:
+                # mined - either this transaction or one that replaced it
+                del self.pending[nonce]
+                continue
+            if self.web3.eth.getTransaction(pending.tx_hash) is None:
+                log.warning(
+                    'Transaction %s (nonce=%d) was dropped by the node, rebroadcasting' %
+                    (pending.tx_hash.hex(), nonce),
+                )
+                try:
+                    self.web3.eth.sendRawTransaction(pending.raw_transaction)
+                except Exception as e:
+                    if not (
+                        is_nonce_error(e) or
+                        is_underpriced_error(e) or
+                        is_known_transaction_error(e)
+                    ):
+                        raise
+
+
+def is_nonce_error(error: Exception) -> bool:
+    message = str(error).lower()
+    return any(x in message for x in NONCE_ERRORS)
+
+
+def is_underpriced_error(error: Exception) -> bool:
+    message = str(error).lower()
+    return any(x in message for x in UNDERPRICED_ERRORS)
+
+
+def receipt_status(receipt: Dict) -> TransactionStatus:
+    """Outbox status of a mined transaction"""
+    if receipt.get('status', 1) == 1:
+        return TransactionStatus.MINED
+    return TransactionStatus.FAILED
+
+
+def is_known_transaction_error(error: Exception) -> bool:
+    message = str(error).lower()
+    return any(x in message for x in KNOWN_TRANSACTION_ERRORS)
@@ -1,7 +1,14 @@
+import json
+from typing import Any, List, Optional, Sequence, Tuple
+
 from eth_utils import is_checksum_address, to_checksum_address
-from web3 import Web3
+from hexbytes import HexBytes
+from web3 import HTTPProvider, Web3
+from web3.middleware import pythonic_middleware
+from web3.utils.request import make_post_request
 from web3.utils.transactions import wait_for_transaction_receipt
 
+from monitoring_service.metrics import RPC_REQUESTS, RPC_SECONDS
 from raiden_libs.private_contract import PrivateContract
 from raiden_libs.utils import private_key_to_address
 
@@ -66,3 +73,53 @@ def register_service(
     # check if MS is really registered
     wait_for_transaction_receipt(web3, tx)
     return bundle_contract.functions.deposits(service_address).call() > 0
+
+
+def rpc_batch(web3: Web3, calls: Sequence[Tuple[str, list]]) -> List[Any]:
+    """Send many JSON-RPC requests in a single batch and return the results
+    in the same order. `calls` is a list of (method, params) tuples. Results
+    are formatted the way web3 formats them (e.g. quantities as integers).
+
+    Batching is only possible with an HTTP provider, other providers fall back
+    to sending the requests one by one."""
+    if len(calls) == 0:
+        return []
+    provider = web3.providers[0]
+    if not isinstance(provider, HTTPProvider):
+        return [web3.manager.request_blocking(method, params) for method, params in calls]
+
+    payload = [
+        {'jsonrpc': '2.0', 'method': method, 'params': params, 'id': i}
+        for i, (method, params) in enumerate(calls)
+    ]
+    for method, _ in calls:
+        RPC_REQUESTS.inc(method=method)
+    with RPC_SECONDS.time(method='batch'):
+        response = make_post_request(
+            provider.endpoint_uri,
+            json.dumps(payload).encode(),
+            **provider.get_request_kwargs(),
+        )
+    results = sorted(json.loads(response), key=lambda result: result['id'])
+    for result in results:
+        if 'error' in result:
+            raise ValueError(result['error'])
+    return [
+        format_result(web3, method, params, result)
+        for (method, params), result in zip(calls, results)
+    ]
+
+
+def format_result(web3: Web3, method: str, params: list, response: dict) -> Any:
+    """Apply web3's result formatters to the raw `response` of a request"""
+    make_request = pythonic_middleware(lambda method, params: response, web3)
+    return make_request(method, params)['result']
+
+
+def get_transaction_receipts(web3: Web3, tx_hashes: Sequence[str]) -> List[Optional[dict]]:
+    """Fetch receipts of many transactions at once. Receipts of transactions
+    that are not mined yet are None."""
+    return rpc_batch(web3, [
+        ('eth_getTransactionReceipt', [HexBytes(tx_hash).hex()])
+        for tx_hash in tx_hashes
+    ])
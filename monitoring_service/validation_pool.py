@@ -0,0 +1,180 @@
+import logging
+from collections import deque
+from enum import Enum
+from typing import Callable, Deque, Dict, Hashable
+
+import gevent
+import gevent.event
+import gevent.pool
+
+from monitoring_service.task_registry import TaskRegistry
+
+log = logging.getLogger(__name__)
+
+
+class OverflowPolicy(str, Enum):
+    """What to do with a new task when the validation queue is full"""
+    DROP_OLDEST = 'drop-oldest'
+    DROP_NEWEST = 'drop-newest'
+    BLOCK = 'block'
+
+
+class ValidationPool:
+    """Runs validation tasks on a fixed number of greenlets.
+
+    Tasks that can't be started right away are kept in a bounded FIFO queue.
+    When the queue is full, `overflow_policy` decides whether the oldest queued
+    task is dropped, the new task is dropped, or the caller (i.e. the transport)
+    is blocked until there is room in the queue.
+
+    Tasks can be submitted with a key (e.g. channel and participant) and a
+    version (e.g. the balance proof nonce). A new task replaces a queued task
+    with the same key, since only the newest one is worth validating. A task
+    with a lower version than the queued one is discarded instead.
+
+    `on_discard` is called with every task that is dropped or superseded,
+    i.e. that will never run.
+
+    Queued tasks are started from the completion callback of a finished task,
+    so the pool doesn't need a greenlet of its own.
+    """
+    def __init__(
+        self,
+        size: int,
+        queue_size: int,
+        overflow_policy: OverflowPolicy = OverflowPolicy.DROP_OLDEST,
+        task_registry: TaskRegistry = None,
+        on_discard: Callable[[gevent.Greenlet], None] = None,
+    ) -> None:
+        assert size > 0
+        assert queue_size >= 0
+        self.size = size
+        self.queue_size = queue_size
+        self.overflow_policy = OverflowPolicy(overflow_policy)
+        self.task_registry = task_registry
+        self.on_discard = on_discard
+        self.pool = gevent.pool.Pool(size)
+        self.queue: Deque[gevent.Greenlet] = deque()
+        # key => queued task, and the other way round
+        self.queued_keys: Dict[Hashable, gevent.Greenlet] = {}
+        self.task_keys: Dict[gevent.Greenlet, Hashable] = {}
+        # queued task => its version
+        self.task_versions: Dict[gevent.Greenlet, int] = {}
+        self.not_full = gevent.event.Event()
+        self.not_full.set()
+
+        # metrics
+        self.submitted = 0
+        self.dropped = 0
+        self.superseded = 0
+        self.completed = 0
+        self.max_queue_depth = 0
+
+    @property
+    def queue_depth(self) -> int:
+        """Number of tasks waiting for a free worker"""
+        return len(self.queue)
+
+    @property
+    def in_flight(self) -> int:
+        """Number of tasks currently running"""
+        return len(self.pool)
+
+    def submit(self, task: gevent.Greenlet, key: Hashable = None, version: int = None) -> bool:
+        """Start `task` or queue it until a worker is free. If a task with the
+        same `key` is queued, the one with the higher `version` is kept.
+        Returns False if the task was dropped because the queue is full or
+        because a newer version is queued."""
+        self.submitted += 1
+        while True:
+            if key is not None and key in self.queued_keys:
+                queued = self.queued_keys[key]
+                queued_version = self.task_versions.get(queued)
+                self.superseded += 1
+                if version is not None and queued_version is not None and \
+                        version < queued_version:
+                    log.debug('Queued %s supersedes %s' % (queued, task))
+                    if self.on_discard is not None:
+                        self.on_discard(task)
+                    return False
+                self.queue[self.queue.index(queued)] = task
+                del self.task_keys[queued]
+                self.task_versions.pop(queued, None)
+                self.queued_keys[key] = task
+                self.task_keys[task] = key
+                if version is not None:
+                    self.task_versions[task] = version
+                log.debug('%s supersedes queued %s' % (task, queued))
+                if self.on_discard is not None:
+                    self.on_discard(queued)
+                return True
+            if self.pool.free_count() > 0 and len(self.queue) == 0:
+                self._start(task)
+                return True
+            if len(self.queue) < self.queue_size:
+                self.queue.append(task)
+                if key is not None:
+                    self.queued_keys[key] = task
+                    self.task_keys[task] = key
+                    if version is not None:
+                        self.task_versions[task] = version
+                self.max_queue_depth = max(self.max_queue_depth, len(self.queue))
+                return True
+
+            if self.overflow_policy == OverflowPolicy.DROP_NEWEST or self.queue_size == 0:
+                self._drop(task)
+                return False
+            elif self.overflow_policy == OverflowPolicy.DROP_OLDEST:
+                self._drop(self._pop_queued())
+            else:
+                self.not_full.clear()
+                self.not_full.wait()
+
+    def join(self, timeout: float = None) -> None:
+        """Wait until the queue is drained and all running tasks are finished"""
+        with gevent.Timeout(timeout, False):
+            while len(self.queue) > 0 or len(self.pool) > 0:
+                self.pool.join()
+
+    def stats(self) -> dict:
+        return {
+            'queue_depth': self.queue_depth,
+            'max_queue_depth': self.max_queue_depth,
+            'in_flight': self.in_flight,
+            'submitted': self.submitted,
+            'dropped': self.dropped,
+            'superseded': self.superseded,
+            'completed': self.completed,
+        }
+
+    def _start(self, task: gevent.Greenlet) -> None:
+        self.pool.start(task)
+        # link before the registry, so that a queued task is started before
+        # the registry can consider itself idle
+        task.rawlink(self._on_task_done)
+        if self.task_registry is not None:
+            self.task_registry.track(task)
+
+    def _pop_queued(self) -> gevent.Greenlet:
+        task = self.queue.popleft()
+        key = self.task_keys.pop(task, None)
+        if key is not None:
+            del self.queued_keys[key]
+        self.task_versions.pop(task, None)
+        return task
+
+    def _drop(self, task: gevent.Greenlet) -> None:
+        self.dropped += 1
+        log.warning(
+            'Validation queue full (%d tasks), dropping %s (policy=%s)' %
+            (len(self.queue), task, self.overflow_policy.value),
+        )
+        if self.on_discard is not None:
+            self.on_discard(task)
+
+    def _on_task_done(self, task: gevent.Greenlet) -> None:
+        self.completed += 1
+        if len(self.queue) > 0 and self.pool.free_count() > 0:
+            self._start(self._pop_queued())
+        if len(self.queue) < self.queue_size:
+            self.not_full.set()